@@ -0,0 +1,113 @@
+"""Admission control for inference requests: a concurrency cap with a bounded queue.
+
+At most max_in_flight requests run inference at once. Up to max_queue
+more wait in FIFO order, each until its own deadline (queue_timeout_ms
+after it arrived). A request that finds the queue full is rejected at
+once, and one whose deadline passes while queued is rejected when it
+expires. Either way the server answers 503 instead of letting every
+request slow down together.
+
+A finishing request hands its slot directly to the oldest waiter, so
+waiters never race each other for a freed slot.
+"""
+import collections
+import os
+import threading
+import time
+
+
+class Overloaded(Exception):
+    """The request was shed; reason is 'queue_full' or 'timeout'"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Server overloaded ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('event', 'granted')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=4, max_queue=64, queue_timeout_ms=500.0, retry_after=1):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.retry_after = retry_after
+        self._reset()
+        # Held locks and queued threads do not survive fork(); start each worker empty
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+        self._in_flight = 0
+        self.admitted = 0
+        self.queued = 0
+        self._admitted_from_queue = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+    def acquire(self):
+        """Wait for an inference slot; returns seconds spent queued or raises Overloaded"""
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self.admitted += 1
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                self.shed_queue_full += 1
+                raise Overloaded('queue_full', self.retry_after)
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+            self.queued += 1
+
+        started = time.perf_counter()
+        waiter.event.wait(self.queue_timeout)
+        waited = time.perf_counter() - started
+        with self._lock:
+            # A slot handed over just as the deadline passed still counts as admitted
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                self.shed_timeout += 1
+                raise Overloaded('timeout', self.retry_after)
+            self.admitted += 1
+            self._admitted_from_queue += 1
+            self._queue_wait_total += waited
+            self._queue_wait_max = max(self._queue_wait_max, waited)
+        return waited
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # The slot passes straight to the oldest waiter; in-flight stays the same
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            waited = self._admitted_from_queue
+            return {
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "queue_timeout_ms": self.queue_timeout * 1000,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "shed": self.shed_queue_full + self.shed_timeout,
+                "shed_queue_full": self.shed_queue_full,
+                "shed_timeout": self.shed_timeout,
+                "mean_queue_wait_ms": round(self._queue_wait_total / waited * 1000, 3) if waited else 0,
+                "max_queue_wait_ms": round(self._queue_wait_max * 1000, 3),
+            }
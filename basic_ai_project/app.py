@@ -1,40 +1,466 @@
-from flask import Flask, request, render_template, jsonify
-import joblib
+import time
+STARTUP_BEGAN = time.perf_counter()
+
+from flask import Flask, Response, g, request, render_template, jsonify, stream_with_context
+from flask import before_render_template, template_rendered
+import click
+import codecs
+import hmac
 import numpy as np
 import os
-from sklearn.metrics import accuracy_score
-from sklearn.datasets import load_iris
-from sklearn.model_selection import train_test_split
+from admission import AdmissionController, Overloaded
+from audit_log import AuditLog
+from batching import MicroBatcher
+from drift import DRIFT_BASELINE_PATH, DriftMonitor
+from evaluation import EvaluationCache
+from fast_tree import CompiledTree
+from features import (FEATURE_NAMES, csv_feature_order, is_csv_header,
+                      parse_csv_block, parse_csv_rows, parse_feature_rows, validate_feature_ranges)
+from metrics import MetricsRegistry
+from parallel_inference import ParallelPredictor
+from model_registry import MODEL_REGISTRY_PATH, ModelRegistry, UnknownModel
+from model_store import ModelStore
+from neighbors import REFERENCE_SET_PATH
+from prediction_cache import PredictionCache
+from profiler import RequestProfiler, collapsed_stacks, merge_stacks, pstats_dump
+from shadow import ShadowScorer
+from wire_format import (JSON_MIMETYPE, RESPONSE_MIMETYPES, WireFormatError, decode_request,
+                         encode_probabilities, is_binary_mimetype)
+
+IMPORTS_DONE = time.perf_counter()
 
 app = Flask(__name__)
 
+MODEL_PATH = 'model.pkl'
+TARGET_NAMES_PATH = 'target_names.pkl'
+ARRAY_MODEL_PATH = 'model_arrays.joblib'
+BINARY_MODEL_PATH = 'model.iristree'
+
+# Known samples, used by /api/test and to warm freshly loaded models
+TEST_SAMPLES = {
+    'setosa': [5.1, 3.5, 1.4, 0.2],
+    'versicolor': [7.0, 3.2, 4.7, 1.4],
+    'virginica': [6.3, 3.3, 6.0, 2.5]
+}
+
+MAX_BATCH_ROWS = 100000
+
+# /api/score_csv reads the upload in blocks and scores it this many rows at a time
+STREAM_CHUNK_ROWS = int(os.environ.get('IRIS_STREAM_CHUNK_ROWS', '10000'))
+STREAM_READ_BYTES = 1024 * 1024
+
+# Opt-in micro-batching: concurrent /predict calls share one predict_proba call
+MICRO_BATCH_ENABLED = os.environ.get('IRIS_MICRO_BATCH', '0') == '1'
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('IRIS_MICRO_BATCH_MAX_SIZE', '32'))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('IRIS_MICRO_BATCH_MAX_WAIT_MS', '2'))
+
+# Opt-in admission control: at most N inference requests run at once, a bounded queue
+# waits up to the timeout each, and everything beyond that gets 503 with Retry-After
+ADMISSION_ENABLED = os.environ.get('IRIS_ADMISSION', '0') == '1'
+# A micro-batched /predict holds its slot while it waits for its batch, so with micro-batching
+# on, the default admits enough requests for one batch to be scored while the next one fills
+ADMISSION_DEFAULT_IN_FLIGHT = os.cpu_count() or 1
+if MICRO_BATCH_ENABLED:
+    ADMISSION_DEFAULT_IN_FLIGHT = max(ADMISSION_DEFAULT_IN_FLIGHT, 2 * MICRO_BATCH_MAX_SIZE)
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('IRIS_ADMISSION_MAX_IN_FLIGHT', str(ADMISSION_DEFAULT_IN_FLIGHT)))
+ADMISSION_MAX_QUEUE = int(os.environ.get('IRIS_ADMISSION_MAX_QUEUE', '64'))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.environ.get('IRIS_ADMISSION_QUEUE_TIMEOUT_MS', '500'))
+ADMISSION_RETRY_AFTER = int(os.environ.get('IRIS_ADMISSION_RETRY_AFTER', '1'))
+# Endpoints that run inference and therefore go through admission control. A streamed
+# /api/score_csv keeps its slot until its response has been sent
+ADMISSION_ENDPOINTS = {'predict', 'api_test', 'api_predict_batch', 'api_neighbors', 'api_score_csv'}
+
+# Batches of at least 2 * IRIS_BATCH_MIN_ROWS_PER_THREAD rows are split into row chunks scored
+# on a shared pool of IRIS_BATCH_THREADS threads; worth it for forests and boosted models,
+# whose per-row cost is far above a single tree's. 1 scores every batch on the request thread
+BATCH_THREADS = int(os.environ.get('IRIS_BATCH_THREADS', str(os.cpu_count() or 1)))
+BATCH_MIN_ROWS_PER_THREAD = int(os.environ.get('IRIS_BATCH_MIN_ROWS_PER_THREAD', '5000'))
+
+# Serve predictions from a flattened copy of the tree instead of sklearn
+FAST_TREE_ENABLED = os.environ.get('IRIS_FAST_TREE', '1') == '1'
+
+# Hot reload: poll model.pkl every N seconds (0 disables) and keep N old versions for rollback
+MODEL_WATCH_INTERVAL = float(os.environ.get('IRIS_MODEL_WATCH_INTERVAL', '0'))
+MODEL_HISTORY = int(os.environ.get('IRIS_MODEL_HISTORY', '3'))
+
+# 'pickle' unpickles model.pkl in every process; 'mmap' memory-maps the flattened tree
+# from model_arrays.joblib (written by main.py) so prefork workers share its pages;
+# 'binary' reads model.iristree with NumPy alone, keeping sklearn and joblib off startup
+SERVING_MODE = os.environ.get('IRIS_SERVING_MODE', 'pickle')
+SERVING_MODEL_PATHS = {'pickle': MODEL_PATH, 'mmap': ARRAY_MODEL_PATH, 'binary': BINARY_MODEL_PATH}
+
+# Serve /api/neighbors from a KD-tree over the training rows (reference_set.npz). Each model
+# builds its tree on its first /api/neighbors request, since the build imports sklearn
+NEIGHBORS_ENABLED = os.environ.get('IRIS_NEIGHBORS', '1') == '1'
+NEIGHBORS_DEFAULT_K = int(os.environ.get('IRIS_NEIGHBORS_DEFAULT_K', '5'))
+NEIGHBORS_MAX_K = int(os.environ.get('IRIS_NEIGHBORS_MAX_K', '50'))
+NEIGHBORS_MAX_ROWS = int(os.environ.get('IRIS_NEIGHBORS_MAX_ROWS', '10000'))
+
+# Count /predict and /api/predict_batch inputs into per-feature histograms and score them
+# against the training baseline (drift_baseline.json) over the last 1-2 windows of rows
+DRIFT_MONITOR_ENABLED = os.environ.get('IRIS_DRIFT_MONITOR', '1') == '1'
+DRIFT_WINDOW_ROWS = int(os.environ.get('IRIS_DRIFT_WINDOW', '10000'))
+DRIFT_MIN_ROWS = int(os.environ.get('IRIS_DRIFT_MIN_ROWS', '100'))
+
+# Opt-in audit log of every served prediction, written in batches by a background thread
+# to SQLite (or JSON lines when the path ends in .jsonl)
+AUDIT_LOG_ENABLED = os.environ.get('IRIS_AUDIT_LOG', '0') == '1'
+AUDIT_LOG_PATH = os.environ.get('IRIS_AUDIT_LOG_PATH', 'audit_log.sqlite3')
+AUDIT_LOG_BATCH_ROWS = int(os.environ.get('IRIS_AUDIT_LOG_BATCH_ROWS', '1000'))
+AUDIT_LOG_FLUSH_MS = float(os.environ.get('IRIS_AUDIT_LOG_FLUSH_MS', '200'))
+AUDIT_LOG_MAX_PENDING = int(os.environ.get('IRIS_AUDIT_LOG_MAX_PENDING', '100000'))
+AUDIT_LOG_BLOCK_MS = float(os.environ.get('IRIS_AUDIT_LOG_BLOCK_MS', '50'))
+
+# Named, versioned models published with `python main.py publish NAME` under models/<name>/<version>/.
+# A request picks one with ?model=name[@version] or an X-Iris-Model header; without either it
+# gets the default model above. Loaded registry models share an LRU capped by approximate memory
+MODEL_REGISTRY_DIR = os.environ.get('IRIS_MODEL_REGISTRY', MODEL_REGISTRY_PATH)
+MODEL_CACHE_MB = float(os.environ.get('IRIS_MODEL_CACHE_MB', '256'))
+# Endpoints that honour the model selection
+MODEL_SELECT_ENDPOINTS = {'predict', 'api_test', 'api_accuracy', 'api_predict_batch', 'api_score_csv',
+                          'api_neighbors'}
+
+# Opt-in shadow mode: a sampled fraction of default-model traffic is also scored, off the request
+# path, by this registry model (name[@version]), recording agreement and latency
+SHADOW_MODEL = os.environ.get('IRIS_SHADOW_MODEL', '')
+SHADOW_SAMPLE_RATE = float(os.environ.get('IRIS_SHADOW_SAMPLE_RATE', '0.1'))
+SHADOW_MAX_QUEUE = int(os.environ.get('IRIS_SHADOW_MAX_QUEUE', '1000'))
+
+# Opt-in request profiler: a sampled fraction of requests, plus any admin request sending
+# X-Iris-Profile: 1, run under a sampling profiler; the last N profiles are kept for download
+PROFILER_ENABLED = os.environ.get('IRIS_PROFILE', '0') == '1'
+PROFILER_SAMPLE_RATE = float(os.environ.get('IRIS_PROFILE_SAMPLE_RATE', '0.01'))
+PROFILER_INTERVAL_MS = float(os.environ.get('IRIS_PROFILE_INTERVAL_MS', '1'))
+PROFILER_KEEP = int(os.environ.get('IRIS_PROFILE_KEEP', '50'))
+
+# Load the model at import (1) or on the first request that needs it (0)
+MODEL_PRELOAD = os.environ.get('IRIS_MODEL_PRELOAD', '1') == '1'
+# Compute the /api/accuracy report while warming a model instead of on first request
+EVALUATION_PRELOAD = os.environ.get('IRIS_EVALUATION_PRELOAD', '0') == '1'
+
+# Admin endpoints require this token in X-Admin-Token; without it they are loopback-only
+ADMIN_TOKEN = os.environ.get('IRIS_ADMIN_TOKEN')
+
+# Optional LRU cache of predictions keyed by features rounded to N decimals
+PREDICTION_CACHE_ENABLED = os.environ.get('IRIS_PREDICTION_CACHE', '0') == '1'
+PREDICTION_CACHE_SIZE = int(os.environ.get('IRIS_PREDICTION_CACHE_SIZE', '10000'))
+PREDICTION_CACHE_TTL = float(os.environ.get('IRIS_PREDICTION_CACHE_TTL', '300'))
+PREDICTION_CACHE_PRECISION = int(os.environ.get('IRIS_PREDICTION_CACHE_PRECISION', '2'))
+
+# Evaluation report, computed once per model artifact
+evaluation_cache = EvaluationCache()
+
+def warm_evaluation(snapshot):
+    evaluation_cache.get(snapshot.model, snapshot.target_names, snapshot.fingerprint)
+
 # Load the trained model and target names
-try:
-    model = joblib.load('model.pkl')
-    target_names = joblib.load('target_names.pkl')
-    print("✅ Model loaded successfully!")
-except FileNotFoundError:
+store = ModelStore(SERVING_MODEL_PATHS[SERVING_MODE],
+                   TARGET_NAMES_PATH,
+                   artifact=SERVING_MODE,
+                   fast_tree=FAST_TREE_ENABLED,
+                   warm_rows=list(TEST_SAMPLES.values()),
+                   warm=warm_evaluation if EVALUATION_PRELOAD else None,
+                   history=MODEL_HISTORY,
+                   reference_path=REFERENCE_SET_PATH if NEIGHBORS_ENABLED else None)
+if not MODEL_PRELOAD:
+    store.defer()
+    print("⏳ Model loading deferred until the first prediction")
+elif store.load_initial():
+    print(f"✅ Model loaded successfully! (version {store.current.version})")
+else:
     print("❌ Model files not found. Please run main.py first to train the model.")
-    model = None
-    target_names = None
+MODEL_LOADED = time.perf_counter()
+
+if MODEL_WATCH_INTERVAL > 0:
+    store.watch(MODEL_WATCH_INTERVAL)
+
+registry = ModelRegistry(MODEL_REGISTRY_DIR,
+                         max_bytes=int(MODEL_CACHE_MB * 1024 * 1024),
+                         model_filename=os.path.basename(SERVING_MODEL_PATHS[SERVING_MODE]),
+                         target_names_filename=os.path.basename(TARGET_NAMES_PATH),
+                         artifact=SERVING_MODE,
+                         fast_tree=FAST_TREE_ENABLED,
+                         warm_rows=list(TEST_SAMPLES.values()),
+                         neighbors=NEIGHBORS_ENABLED)
+
+prediction_cache = None
+if PREDICTION_CACHE_ENABLED:
+    prediction_cache = PredictionCache(max_entries=PREDICTION_CACHE_SIZE,
+                                       ttl_seconds=PREDICTION_CACHE_TTL,
+                                       precision=PREDICTION_CACHE_PRECISION)
+
+# Per-thread counters and histograms, served in Prometheus format from /metrics
+metrics = MetricsRegistry()
+metrics.describe('iris_http_requests_total', 'counter', 'HTTP requests by route, method and status')
+metrics.describe('iris_http_request_errors_total', 'counter', 'HTTP requests that returned a 5xx status')
+metrics.describe('iris_http_request_duration_seconds', 'histogram', 'HTTP request latency by route')
+metrics.describe('iris_http_requests_in_flight', 'gauge', 'HTTP requests currently being served')
+metrics.describe('iris_model_inference_seconds', 'histogram', 'Time spent in model predict/predict_proba calls')
+metrics.describe('iris_template_render_seconds', 'histogram', 'Time spent rendering Jinja templates')
+metrics.describe('iris_admission_queue_seconds', 'histogram', 'Time admitted requests waited for an inference slot')
+metrics.describe('iris_admission_shed_total', 'counter', 'Requests rejected with 503 by admission control')
+metrics.describe('iris_audit_records_total', 'counter', 'Predictions written to the audit log')
+metrics.describe('iris_audit_dropped_total', 'counter', 'Predictions dropped because the audit buffer was full')
+metrics.describe('iris_audit_flush_seconds', 'histogram', 'Time spent writing one audit log batch')
+metrics.describe('iris_shadow_rows_total', 'counter', 'Rows scored by the shadow model, by agreement with the served model')
+metrics.describe('iris_shadow_dropped_total', 'counter', 'Sampled requests not shadowed because the queue was full')
+metrics.describe('iris_shadow_inference_seconds', 'histogram', 'Time the shadow model spent scoring one sample')
+
+def observe_inference(call, seconds):
+    metrics.observe('iris_model_inference_seconds', (('call', call),), seconds)
+
+def record_audit_flush(seconds, rows):
+    metrics.observe('iris_audit_flush_seconds', (), seconds)
+    metrics.inc('iris_audit_records_total', amount=rows)
+
+audit_log = None
+if AUDIT_LOG_ENABLED:
+    audit_log = AuditLog(AUDIT_LOG_PATH, max_batch_rows=AUDIT_LOG_BATCH_ROWS,
+                         flush_interval_ms=AUDIT_LOG_FLUSH_MS, max_pending_rows=AUDIT_LOG_MAX_PENDING,
+                         block_ms=AUDIT_LOG_BLOCK_MS, on_flush=record_audit_flush)
+
+def record_shadow_score(seconds, rows, agreed):
+    metrics.observe('iris_shadow_inference_seconds', (), seconds)
+    metrics.inc('iris_shadow_rows_total', (('result', 'agree'),), agreed)
+    if rows > agreed:
+        metrics.inc('iris_shadow_rows_total', (('result', 'disagree'),), rows - agreed)
+
+shadow_scorer = None
+if SHADOW_MODEL:
+    try:
+        registry.resolve(SHADOW_MODEL)
+        shadow_scorer = ShadowScorer(lambda: registry.get(SHADOW_MODEL), sample_rate=SHADOW_SAMPLE_RATE,
+                                     max_queue=SHADOW_MAX_QUEUE, on_score=record_shadow_score)
+    except UnknownModel as e:
+        print(f"⚠️ Shadow mode disabled: {e}")
+
+def record_scored(endpoint, active, X, predictions, confidence, seconds):
+    """Hand served rows to the audit log, and a sample of default-model traffic to the shadow model"""
+    if audit_log is not None and not audit_log.record_many(endpoint, active.version, X, predictions, confidence):
+        metrics.inc('iris_audit_dropped_total', (('endpoint', endpoint),), len(X))
+    if shadow_scorer is not None and active is store.current and shadow_scorer.sample():
+        if not shadow_scorer.submit(X, predictions, seconds):
+            metrics.inc('iris_shadow_dropped_total')
+
+drift_monitor = None
+if DRIFT_MONITOR_ENABLED:
+    try:
+        drift_monitor = DriftMonitor(DRIFT_BASELINE_PATH, window_rows=DRIFT_WINDOW_ROWS,
+                                     min_rows=DRIFT_MIN_ROWS)
+    except FileNotFoundError:
+        print(f"⚠️ Drift monitoring disabled: {DRIFT_BASELINE_PATH} not found (run main.py)")
+
+admission = None
+if ADMISSION_ENABLED:
+    admission = AdmissionController(max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+                                    max_queue=ADMISSION_MAX_QUEUE,
+                                    queue_timeout_ms=ADMISSION_QUEUE_TIMEOUT_MS,
+                                    retry_after=ADMISSION_RETRY_AFTER)
+
+request_profiler = None
+if PROFILER_ENABLED:
+    request_profiler = RequestProfiler(sample_rate=PROFILER_SAMPLE_RATE, interval_ms=PROFILER_INTERVAL_MS,
+                                       max_profiles=PROFILER_KEEP)
+
+parallel_predictor = ParallelPredictor(threads=BATCH_THREADS, min_rows_per_thread=BATCH_MIN_ROWS_PER_THREAD)
+
+batcher = None
+if MICRO_BATCH_ENABLED:
+    batcher = MicroBatcher(max_batch_size=MICRO_BATCH_MAX_SIZE,
+                           max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+                           on_flush=lambda seconds, size: observe_inference('micro_batch', seconds))
+
+# Phase timings for this process; `flask --app app startup-report` gives a per-module breakdown
+STARTUP_TIMINGS = {
+    "imports_ms": round((IMPORTS_DONE - STARTUP_BEGAN) * 1000, 1),
+    "model_load_ms": round((MODEL_LOADED - IMPORTS_DONE) * 1000, 1),
+    "ready_ms": round((time.perf_counter() - STARTUP_BEGAN) * 1000, 1),
+    "model_preload": MODEL_PRELOAD,
+    "evaluation_preload": EVALUATION_PRELOAD,
+}
+
+def iter_csv_chunks(stream, chunk_rows):
+    """Read a CSV body block by block, yielding text of at most chunk_rows lines.
+
+    Only one block and one chunk are held at a time, so memory stays flat
+    however large the upload is. Blank lines are kept, so line numbers
+    carry through to parse_csv_block.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    partial = ''
+    lines = []
+    while True:
+        block = stream.read(STREAM_READ_BYTES)
+        lines += (partial + decoder.decode(block, final=not block)).split('\n')
+        # The last piece of a block may be half a line; keep it for the next block.
+        # At the end it is the text after the final newline, if there is any.
+        partial = lines.pop()
+        if not block and partial:
+            lines.append(partial)
+        while len(lines) >= chunk_rows or (not block and lines):
+            yield '\n'.join(lines[:chunk_rows]) + '\n'
+            del lines[:chunk_rows]
+        if not block:
+            break
+
+def predict_single(engine, features):
+    """Class probabilities for one sample, coalesced by the micro-batcher when enabled"""
+    if batcher is not None:
+        return batcher.submit(engine, features)
+    started = time.perf_counter()
+    if isinstance(engine, CompiledTree):
+        probabilities = engine.predict_proba_one(features)
+        observe_inference('predict_proba_one', time.perf_counter() - started)
+    else:
+        probabilities = engine.predict_proba(features.reshape(1, -1))[0]
+        observe_inference('predict_proba', time.perf_counter() - started)
+    return probabilities
+
+def predict_rows(engine, X):
+    """Class probabilities for a batch, split across the inference pool when it is large"""
+    return parallel_predictor.predict_proba(engine, X)
+
+def cached_predict_single(active, features):
+    """predict_single behind the prediction cache, when it is enabled"""
+    # The cache holds one model version at a time, so registry models bypass it
+    if prediction_cache is None or active is not store.current:
+        return predict_single(active.engine, features)
+    features = prediction_cache.quantize(features)
+    probabilities = prediction_cache.get(active.version, features)
+    if probabilities is None:
+        probabilities = predict_single(active.engine, features)
+        prediction_cache.put(active.version, features, probabilities)
+    return probabilities
+
+def admin_allowed():
+    """Check the admin token, or restrict to loopback when no token is configured"""
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+# Registered first, so a profile also covers the other request hooks
+@app.before_request
+def start_profile():
+    if request_profiler is None:
+        return None
+    requested = request.headers.get('X-Iris-Profile') == '1' and admin_allowed()
+    if requested or request_profiler.sample():
+        g.profile = request_profiler.start(request.method, request.path, request.endpoint,
+                                           'requested' if requested else 'sampled')
+    return None
+
+@app.after_request
+def add_profile_header(response):
+    profile = g.get('profile')
+    if profile is not None:
+        profile.status = response.status_code
+        response.headers['X-Iris-Profile-Id'] = str(profile.id)
+    return response
+
+@app.teardown_request
+def stop_profile(exc):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        request_profiler.stop(profile, profile.status if exc is None else 500)
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.inc('iris_http_requests_in_flight')
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = (('method', request.method), ('route', route))
+        metrics.observe('iris_http_request_duration_seconds', labels, time.perf_counter() - started)
+        metrics.inc('iris_http_requests_total', labels + (('status', str(response.status_code)),))
+        if response.status_code >= 500:
+            metrics.inc('iris_http_request_errors_total', labels)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if g.pop('request_started', None) is not None:
+        metrics.inc('iris_http_requests_in_flight', amount=-1)
+
+@app.before_request
+def admit_request():
+    if admission is None or request.endpoint not in ADMISSION_ENDPOINTS:
+        return None
+    try:
+        waited = admission.acquire()
+    except Overloaded as e:
+        metrics.inc('iris_admission_shed_total', (('reason', e.reason),))
+        response = jsonify({"error": str(e), "reason": e.reason})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    g.admitted = True
+    metrics.observe('iris_admission_queue_seconds', (), waited)
+    return None
+
+@app.teardown_request
+def release_admission(exc):
+    if g.pop('admitted', False):
+        admission.release()
+
+@app.before_request
+def select_model():
+    """Load the registry model named by ?model= or X-Iris-Model for this request"""
+    if request.endpoint not in MODEL_SELECT_ENDPOINTS:
+        return None
+    spec = request.args.get('model') or request.headers.get('X-Iris-Model')
+    if not spec:
+        return None
+    try:
+        g.model = registry.get(spec)
+    except UnknownModel as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": f"Could not load model {spec!r}: {e}"}), 500
+    return None
+
+@app.after_request
+def add_model_version_header(response):
+    active = g.get('model')
+    if active is not None:
+        response.headers['X-Iris-Model-Version'] = active.version
+    return response
+
+def request_model():
+    """The snapshot serving this request: the selected registry model, else the default"""
+    active = g.get('model')
+    return active if active is not None else store.current
+
+def start_template_timer(sender, template, context, **extra):
+    g.template_started = time.perf_counter()
+
+def record_template_render(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    if started is not None:
+        metrics.observe('iris_template_render_seconds', (('template', template.name),),
+                        time.perf_counter() - started)
+
+before_render_template.connect(start_template_timer, app)
+template_rendered.connect(record_template_render, app)
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/predict', methods=['POST'])
-def predict():
-    if model is None:
-        return render_template('result.html', 
-                             prediction="Error: Model not loaded. Please train the model first.",
-                             error=True)
-    
+def classify_form(active, form):
+    """Validate the four form fields and classify them; returns result.html's context"""
     try:
         # Get form data
-        sepal_length = float(request.form['sepal_length'])
-        sepal_width = float(request.form['sepal_width'])
-        petal_length = float(request.form['petal_length'])
-        petal_width = float(request.form['petal_width'])
+        sepal_length = float(form['sepal_length'])
+        sepal_width = float(form['sepal_width'])
+        petal_length = float(form['petal_length'])
+        petal_width = float(form['petal_width'])
+        if drift_monitor is not None:
+            # Before validation, so a surge of out-of-range inputs shows up as drift too
+            drift_monitor.observe_one((sepal_length, sepal_width, petal_length, petal_width))
 
         # Validate input ranges (basic validation)
         if not (4.0 <= sepal_length <= 8.0):
@@ -47,100 +473,450 @@ def predict():
             raise ValueError("Petal width should be between 0.1 and 2.5 cm")
 
         # Prepare input for prediction
-        features = np.array([[sepal_length, sepal_width, petal_length, petal_width]])
-
-        # Make prediction
-        prediction = model.predict(features)
-        predicted_class = target_names[prediction[0]]
+        features = np.array([sepal_length, sepal_width, petal_length, petal_width])
 
-        # Get prediction probabilities if available
-        try:
-            probabilities = model.predict_proba(features)[0]
-            confidence = max(probabilities) * 100
-        except:
-            confidence = None
+        # Make prediction; the label is the argmax of the class probabilities
+        started = time.perf_counter()
+        probabilities = cached_predict_single(active, features)
+        seconds = time.perf_counter() - started
+        predicted_class = active.target_names[active.engine.classes_[probabilities.argmax()]]
+        confidence = max(probabilities) * 100
+        record_scored('predict', active, [features], [predicted_class], [confidence], seconds)
 
-        return render_template('result.html', 
-                             prediction=predicted_class,
-                             confidence=confidence,
-                             input_values={
-                                 'sepal_length': sepal_length,
-                                 'sepal_width': sepal_width,
-                                 'petal_length': petal_length,
-                                 'petal_width': petal_width
-                             })
+        return dict(prediction=predicted_class,
+                    confidence=confidence,
+                    input_values={
+                        'sepal_length': sepal_length,
+                        'sepal_width': sepal_width,
+                        'petal_length': petal_length,
+                        'petal_width': petal_width
+                    })
 
     except ValueError as e:
-        return render_template('result.html', 
-                             prediction=f"Input Error: {str(e)}", 
-                             error=True)
+        return dict(prediction=f"Input Error: {str(e)}", error=True)
     except Exception as e:
-        return render_template('result.html', 
-                             prediction=f"Prediction Error: {str(e)}", 
-                             error=True)
+        return dict(prediction=f"Prediction Error: {str(e)}", error=True)
 
-@app.route('/api/test', methods=['GET'])
-def api_test():
-    """API endpoint to test the model with sample data"""
-    if model is None:
-        return jsonify({"error": "Model not loaded"}), 500
-    
-    # Test samples
-    test_samples = {
-        'setosa': [5.1, 3.5, 1.4, 0.2],
-        'versicolor': [7.0, 3.2, 4.7, 1.4],
-        'virginica': [6.3, 3.3, 6.0, 2.5]
-    }
-    
+def classify_test_samples(active):
+    """Classify TEST_SAMPLES and report whether each came out as its own species"""
     results = {}
-    for species, features in test_samples.items():
-        prediction = model.predict([features])
-        predicted_class = target_names[prediction[0]]
+    for species, features in TEST_SAMPLES.items():
+        started = time.perf_counter()
+        probabilities = cached_predict_single(active, np.array(features))
+        seconds = time.perf_counter() - started
+        predicted_class = active.target_names[active.engine.classes_[probabilities.argmax()]]
+        record_scored('api_test', active, [features], [predicted_class], [probabilities.max() * 100], seconds)
         results[species] = {
             'input': features,
             'predicted': predicted_class,
             'correct': predicted_class.lower() == species
         }
+    return results
+
+def health_status():
+    """Body of the /health response"""
+    active = store.current
+    return {
+        "status": "healthy",
+        "model_loaded": active is not None,
+        "target_names_loaded": active is not None and active.target_names is not None,
+        "model_version": active.version if active is not None else None,
+        "model": store.status(),
+        "micro_batching": batcher is not None,
+        "prediction_cache": prediction_cache is not None,
+        "admission": admission.stats() if admission is not None else None,
+        "drift_monitor": drift_monitor is not None,
+        "audit_log": audit_log.stats() if audit_log is not None else None,
+        "shadow": shadow_scorer is not None,
+        "profiler": request_profiler.stats() if request_profiler is not None else None,
+        "fast_tree": active is not None and isinstance(active.engine, CompiledTree),
+        "batch_inference": parallel_predictor.stats(),
+        "startup": STARTUP_TIMINGS
+    }
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    # Machine clients posting raw float32 or MessagePack get the batch API's response
+    if is_binary_mimetype(request.mimetype):
+        return api_predict_batch()
+    active = request_model()
+    if active is None:
+        return render_template('result.html', 
+                             prediction="Error: Model not loaded. Please train the model first.",
+                             error=True)
+    return render_template('result.html', **classify_form(active, request.form))
+
+@app.route('/api/test', methods=['GET'])
+def api_test():
+    """API endpoint to test the model with sample data"""
+    active = request_model()
+    if active is None:
+        return jsonify({"error": "Model not loaded"}), 500
     
-    return jsonify(results)
+    return jsonify(classify_test_samples(active))
 
 @app.route('/api/accuracy', methods=['GET'])
 def api_accuracy():
     """API endpoint to get model accuracy"""
-    if model is None:
+    active = request_model()
+    if active is None:
         return jsonify({"error": "Model not loaded"}), 500
     
     try:
-        # Load iris dataset for testing
-        iris = load_iris()
-        X = iris.data
-        y = iris.target
-        
-        # Split data (same as training)
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-        
-        # Get predictions
-        y_pred = model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
-        
-        return jsonify({
-            "accuracy": round(accuracy * 100, 2),
-            "test_samples": int(len(X_test)),
-            "correct_predictions": int(sum(y_pred == y_test)),
-            "model_type": "Decision Tree Classifier"
-        })
+        report, etag = evaluation_cache.get(active.model, active.target_names, active.fingerprint)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    response = jsonify(report)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/predict_batch', methods=['POST'])
+def api_predict_batch():
+    """API endpoint to classify many samples with a single model call"""
+    active = request_model()
+    if active is None:
+        return jsonify({"error": "Model not loaded"}), 500
+
+    X = rows = None
+    if request.mimetype == 'text/csv':
+        rows = parse_csv_rows(request.get_data(as_text=True))
+    elif is_binary_mimetype(request.mimetype):
+        try:
+            X, rows = decode_request(request.mimetype, request.get_data(), len(FEATURE_NAMES))
+        except WireFormatError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        payload = request.get_json(silent=True)
+        rows = payload.get('instances') if isinstance(payload, dict) else payload
+        if not isinstance(rows, list):
+            return jsonify({"error": "Expected a JSON list of rows or {\"instances\": [...]}"}), 400
+
+    if len(X if X is not None else rows) > MAX_BATCH_ROWS:
+        return jsonify({"error": f"Batch too large, maximum is {MAX_BATCH_ROWS} rows"}), 413
+
+    errors = {}
+    if X is None:
+        X, errors = parse_feature_rows(rows)
+    if drift_monitor is not None:
+        drift_monitor.observe(X)
+    valid, range_errors = validate_feature_ranges(X)
+    for i, messages in range_errors.items():
+        errors.setdefault(i, messages)
+
+    n_rows = len(X)
+    response_type = request.accept_mimetypes.best_match(RESPONSE_MIMETYPES, default=JSON_MIMETYPE)
+    if response_type != JSON_MIMETYPE:
+        classes = active.target_names[active.engine.classes_]
+        probabilities = np.full((n_rows, len(classes)), np.nan, dtype=np.float32)
+        if valid.any():
+            started = time.perf_counter()
+            # Skip the boolean-mask copy when every row is valid
+            probabilities[valid] = predict_rows(active.engine, X if valid.all() else X[valid])
+            seconds = time.perf_counter() - started
+            observe_inference('predict_proba', seconds)
+            scored = probabilities[valid]
+            record_scored('api_predict_batch', active, X[valid], classes[scored.argmax(axis=1)],
+                          scored.max(axis=1) * 100, seconds)
+        try:
+            body = encode_probabilities(probabilities, response_type, classes, valid, errors)
+        except WireFormatError as e:
+            return jsonify({"error": str(e)}), 406
+        return Response(body, mimetype=response_type, headers={
+            'X-Iris-Shape': f'{n_rows},{len(classes)}',
+            'X-Iris-Classes': ','.join(str(name) for name in classes),
+            'X-Iris-Valid-Rows': str(int(valid.sum())),
+        })
+
+    predictions = np.full(n_rows, None, dtype=object)
+    confidence = np.full(n_rows, None, dtype=object)
+    if valid.any():
+        # One predict_proba call for the whole matrix; labels are its argmax
+        started = time.perf_counter()
+        probabilities = predict_rows(active.engine, X[valid])
+        seconds = time.perf_counter() - started
+        observe_inference('predict_proba', seconds)
+        predictions[valid] = active.target_names[active.engine.classes_[probabilities.argmax(axis=1)]]
+        confidence[valid] = np.round(probabilities.max(axis=1) * 100, 2)
+        record_scored('api_predict_batch', active, X[valid], predictions[valid], confidence[valid], seconds)
+
+    return jsonify({
+        "count": n_rows,
+        "valid": int(valid.sum()),
+        "predictions": predictions.tolist(),
+        "confidence": confidence.tolist(),
+        "errors": [{"row": i, "errors": errors[i]} for i in sorted(errors)]
+    })
+
+@app.route('/api/score_csv', methods=['POST'])
+def api_score_csv():
+    """Score a CSV upload of any size chunk by chunk, streaming the results back as CSV"""
+    active = request_model()
+    if active is None:
+        return jsonify({"error": "Model not loaded"}), 500
+
+    def generate():
+        yield 'row,prediction,confidence,error\n'
+        offset = 0
+        order = None
+        for i, text in enumerate(iter_csv_chunks(request.stream, STREAM_CHUNK_ROWS)):
+            if i == 0:
+                first, _, rest = text.partition('\n')
+                if is_csv_header(first.split(',')):
+                    order = csv_feature_order(first.split(','))
+                    text = rest
+            if not text:
+                continue
+
+            # Blank and malformed lines come back as error rows, so row numbers match the input
+            X, errors = parse_csv_block(text, order)
+            valid, range_errors = validate_feature_ranges(X)
+            for j, messages in range_errors.items():
+                errors.setdefault(j, messages)
+
+            labels = np.full(len(X), '', dtype=object)
+            confidence = np.full(len(X), '', dtype=object)
+            if valid.any():
+                started = time.perf_counter()
+                probabilities = predict_rows(active.engine, X[valid])
+                seconds = time.perf_counter() - started
+                observe_inference('predict_proba', seconds)
+                labels[valid] = active.target_names[active.engine.classes_[probabilities.argmax(axis=1)]]
+                confidence[valid] = [f"{value:.2f}" for value in probabilities.max(axis=1) * 100]
+                record_scored('api_score_csv', active, X[valid], labels[valid], probabilities.max(axis=1) * 100,
+                              seconds)
+
+            # Malformed rows are reported inline, in their place in the output
+            lines = [f"{offset + j},{label},{conf},\n" for j, (label, conf) in enumerate(zip(labels, confidence))]
+            for j, messages in errors.items():
+                message = '; '.join(messages).replace('"', '""')
+                lines[j] = f'{offset + j},,,"{message}"\n'
+            yield ''.join(lines)
+            offset += len(X)
+
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    if g.pop('admitted', False):
+        # teardown_request runs before a streamed body is sent, so release the slot on close instead
+        response.call_on_close(admission.release)
+    return response
+
+@app.route('/api/neighbors', methods=['POST'])
+def api_neighbors():
+    """API endpoint returning the k nearest training samples to each row, with its prediction"""
+    active = request_model()
+    if active is None:
+        return jsonify({"error": "Model not loaded"}), 500
+    if active.neighbors is None:
+        return jsonify({"error": "Nearest-sample index not available; "
+                                 "retrain with main.py to write reference_set.npz"}), 503
+
+    payload = request.get_json(silent=True)
+    rows = payload.get('instances') if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        return jsonify({"error": "Expected a JSON list of rows or {\"instances\": [...]}"}), 400
+    if len(rows) > NEIGHBORS_MAX_ROWS:
+        return jsonify({"error": f"Batch too large, maximum is {NEIGHBORS_MAX_ROWS} rows"}), 413
+    k = payload.get('k', NEIGHBORS_DEFAULT_K) if isinstance(payload, dict) else NEIGHBORS_DEFAULT_K
+    k = request.args.get('k', k)
+    try:
+        k = int(k)
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer"}), 400
+    if not 1 <= k <= NEIGHBORS_MAX_K:
+        return jsonify({"error": f"k must be between 1 and {NEIGHBORS_MAX_K}"}), 400
+
+    X, errors = parse_feature_rows(rows)
+    valid, range_errors = validate_feature_ranges(X)
+    for i, messages in range_errors.items():
+        errors.setdefault(i, messages)
+
+    results = [None] * len(X)
+    query_seconds = 0.0
+    if valid.any():
+        index = active.neighbors
+        started = time.perf_counter()
+        distances, indices = index.query(X[valid], k)
+        query_seconds = time.perf_counter() - started
+        observe_inference('neighbors', query_seconds)
+
+        started = time.perf_counter()
+        probabilities = predict_rows(active.engine, X[valid])
+        seconds = time.perf_counter() - started
+        observe_inference('predict_proba', seconds)
+        predictions = active.target_names[active.engine.classes_[probabilities.argmax(axis=1)]]
+        confidence = np.round(probabilities.max(axis=1) * 100, 2)
+        record_scored('api_neighbors', active, X[valid], predictions, confidence, seconds)
+
+        labels = index.labels(indices).tolist()
+        features = index.X[indices].tolist()
+        distances = np.round(distances, 4).tolist()
+        indices = indices.tolist()
+        for j, i in enumerate(np.flatnonzero(valid)):
+            results[i] = {
+                "prediction": str(predictions[j]),
+                "confidence": float(confidence[j]),
+                "neighbors": [
+                    {"row": row, "distance": distance, "species": str(label), "features": values}
+                    for row, distance, label, values
+                    in zip(indices[j], distances[j], labels[j], features[j])
+                ],
+            }
+
+    return jsonify({
+        "count": len(X),
+        "valid": int(valid.sum()),
+        "k": k,
+        "reference_rows": len(active.neighbors),
+        "query_ms": round(query_seconds * 1000, 3),
+        "results": results,
+        "errors": [{"row": i, "errors": errors[i]} for i in sorted(errors)]
+    })
+
+@app.route('/api/batching/stats', methods=['GET'])
+def api_batching_stats():
+    """API endpoint exposing micro-batching queue depth and batch sizes"""
+    if batcher is None:
+        return jsonify({"enabled": False})
+    stats = batcher.stats(reset=request.args.get('reset') == '1')
+    stats["enabled"] = True
+    return jsonify(stats)
+
+@app.route('/api/drift', methods=['GET'])
+def api_drift():
+    """API endpoint scoring recent inputs against the training distribution (?histograms=1 for counts)"""
+    if drift_monitor is None:
+        return jsonify({"enabled": False})
+    report = drift_monitor.report(histograms=request.args.get('histograms') == '1')
+    report["enabled"] = True
+    return jsonify(report)
+
+@app.route('/api/models', methods=['GET'])
+def api_models():
+    """API endpoint listing the default model, published registry models and the loaded-model cache"""
+    active = store.current
+    return jsonify({
+        "default": active.describe() if active is not None else None,
+        "published": registry.models(),
+        "cache": registry.stats(),
+    })
+
+@app.route('/api/shadow/stats', methods=['GET'])
+def api_shadow_stats():
+    """API endpoint comparing the shadow model with the served model on sampled traffic"""
+    if shadow_scorer is None:
+        return jsonify({"enabled": False})
+    stats = shadow_scorer.stats()
+    stats["enabled"] = True
+    stats["model"] = SHADOW_MODEL
+    return jsonify(stats)
+
+@app.route('/api/audit/stats', methods=['GET'])
+def api_audit_stats():
+    """API endpoint exposing audit log buffer depth, flushes, backpressure and drops"""
+    if audit_log is None:
+        return jsonify({"enabled": False})
+    stats = audit_log.stats()
+    stats["enabled"] = True
+    return jsonify(stats)
+
+@app.route('/api/admission/stats', methods=['GET'])
+def api_admission_stats():
+    """API endpoint exposing admission control in-flight, queue and shed counters"""
+    if admission is None:
+        return jsonify({"enabled": False})
+    stats = admission.stats()
+    stats["enabled"] = True
+    return jsonify(stats)
+
+@app.route('/api/cache/stats', methods=['GET'])
+def api_cache_stats():
+    """API endpoint exposing prediction cache hit/miss/eviction counters"""
+    if prediction_cache is None:
+        return jsonify({"enabled": False})
+    stats = prediction_cache.stats()
+    stats["enabled"] = True
+    return jsonify(stats)
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Load model.pkl in the background, warm it and swap it in (?wait=1 to block)"""
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if request.args.get('wait') != '1':
+        started = store.reload_in_background()
+        return jsonify({"reload_started": started, "model": store.status()}), 202
+    try:
+        snapshot = store.reload()
+    except Exception as e:
+        return jsonify({"error": f"Reload failed, previous model kept: {e}"}), 500
+    return jsonify({"reloaded": snapshot is not None, "model": store.status()})
+
+@app.route('/admin/rollback', methods=['POST'])
+def admin_rollback():
+    """Reactivate the previously active model version"""
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if store.rollback() is None:
+        return jsonify({"error": "No previous model version to roll back to"}), 409
+    return jsonify({"rolled_back": True, "model": store.status()})
+
+def profile_response(stacks, name):
+    """Sampled stacks as collapsed text (default) or, with ?format=pstats, a pstats file"""
+    if request.args.get('format') == 'pstats':
+        return Response(pstats_dump(stacks), mimetype='application/octet-stream',
+                        headers={'Content-Disposition': f'attachment; filename={name}.pstats'})
+    return Response(collapsed_stacks(stacks), mimetype='text/plain')
+
+@app.route('/admin/profiles', methods=['GET'])
+def admin_profiles():
+    """List the kept request profiles, newest first (?endpoint= to filter)"""
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if request_profiler is None:
+        return jsonify({"enabled": False})
+    profiles = request_profiler.profiles(request.args.get('endpoint'))
+    stats = request_profiler.stats()
+    stats.update(enabled=True, profiles=[profile.summary() for profile in profiles])
+    return jsonify(stats)
+
+@app.route('/admin/profiles/<int:profile_id>', methods=['GET'])
+def admin_profile(profile_id):
+    """Download one profile as collapsed stacks, or ?format=pstats"""
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    profile = request_profiler.get(profile_id) if request_profiler is not None else None
+    if profile is None:
+        return jsonify({"error": f"No profile {profile_id}"}), 404
+    return profile_response(profile.stacks, f'profile-{profile_id}')
+
+@app.route('/admin/profiles/merged', methods=['GET'])
+def admin_profiles_merged():
+    """Every kept profile (?endpoint= to filter) merged into one, as collapsed stacks or ?format=pstats"""
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if request_profiler is None:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    endpoint = request.args.get('endpoint')
+    return profile_response(merge_stacks(request_profiler.profiles(endpoint)),
+                            f'profiles-{endpoint or "all"}')
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics endpoint"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    status = {
-        "status": "healthy",
-        "model_loaded": model is not None,
-        "target_names_loaded": target_names is not None
-    }
-    return jsonify(status)
+    return jsonify(health_status())
+
+@app.cli.command('startup-report', context_settings={'ignore_unknown_options': True})
+@click.argument('args', nargs=-1, type=click.UNPROCESSED)
+def startup_report_command(args):
+    """Measure cold start and import time per module in a fresh process."""
+    from startup_report import main
+    main(list(args))
 
 if __name__ == '__main__':
     print("🌸 Starting Iris Flower Classifier Web App...")
@@ -149,5 +925,19 @@ if __name__ == '__main__':
     print("🔗 API endpoints available:")
     print("   - /api/test (GET) - Test with sample data")
     print("   - /api/accuracy (GET) - Get model accuracy")
+    print("   - /api/predict_batch (POST) - Classify a JSON or CSV batch")
+    print("   - /api/score_csv (POST) - Stream-score a CSV upload of any size")
+    print("   - /api/neighbors (POST) - Nearest training samples for each row")
+    print("   - /api/batching/stats (GET) - Micro-batching statistics")
+    print("   - /api/cache/stats (GET) - Prediction cache statistics")
+    print("   - /api/admission/stats (GET) - Admission control statistics")
+    print("   - /api/drift (GET) - Feature drift against the training distribution")
+    print("   - /api/audit/stats (GET) - Audit log statistics")
+    print("   - /api/models (GET) - Published models and the loaded-model cache")
+    print("   - /api/shadow/stats (GET) - Shadow model agreement and latency")
+    print("   - /admin/reload (POST) - Hot-reload model.pkl")
+    print("   - /admin/rollback (POST) - Roll back to the previous model")
+    print("   - /admin/profiles (GET) - Sampled request profiles (collapsed stacks or pstats)")
+    print("   - /metrics (GET) - Prometheus metrics")
     print("   - /health (GET) - Health check")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,264 @@
+"""ASGI entry point: the classifier API served from an event loop.
+
+Connections live on the event loop, so a thousand mostly idle clients
+cost a thousand coroutines rather than a thousand threads. Inference,
+evaluation and template rendering run on a small bounded thread pool;
+routing, body parsing and JSON encoding stay on the loop.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+
+The model store, caches, metrics and validation are the ones defined in
+app.py, so every IRIS_* setting applies unchanged.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import render_template
+from werkzeug.http import parse_etags, quote_etag
+from werkzeug.security import safe_join
+
+import app as web
+
+# Inference is sub-millisecond, so a few threads keep up with many connections
+INFERENCE_THREADS = int(os.environ.get('IRIS_ASGI_INFERENCE_THREADS', str(min(4, os.cpu_count() or 1))))
+# Jobs handed to the pool at once; further requests wait on the loop
+MAX_PENDING = int(os.environ.get('IRIS_ASGI_MAX_PENDING', '256'))
+MAX_FORM_BYTES = 64 * 1024
+
+
+class BoundedExecutor:
+    """A thread pool that accepts at most max_pending jobs at a time"""
+
+    def __init__(self, threads, max_pending):
+        self.threads = threads
+        self.max_pending = max_pending
+        self.pending = 0
+        self._pool = None
+        self._slots = None
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='iris-inference')
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    async def run(self, func, *args):
+        # Servers that skip the lifespan protocol start the pool on first use
+        self.start()
+        async with self._slots:
+            self.pending += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+            finally:
+                self.pending -= 1
+
+    def stats(self):
+        return {"threads": self.threads, "max_pending": self.max_pending, "pending": self.pending}
+
+
+executor = BoundedExecutor(INFERENCE_THREADS, MAX_PENDING)
+
+
+def _environ(scope):
+    """Just enough of a WSGI environ for Flask's url_for in templates"""
+    headers = dict(scope['headers'])
+    host, port = scope.get('server') or ('localhost', 80)
+    return {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': host,
+        'SERVER_PORT': str(port),
+        'HTTP_HOST': headers.get(b'host', f'{host}:{port}'.encode()).decode('latin-1'),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+    }
+
+
+def _render(scope, template, context):
+    with web.app.request_context(_environ(scope)):
+        return render_template(template, **context)
+
+
+def _render_prediction(scope, active, form):
+    return _render(scope, 'result.html', web.classify_form(active, form))
+
+
+async def _current_model():
+    # A deferred store loads on first access; keep that off the loop
+    if web.store.deferred:
+        return await executor.run(lambda: web.store.current)
+    return web.store.current
+
+
+async def _read_body(receive, limit):
+    """The whole request body, or None when it exceeds limit bytes"""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _html(body, status=200):
+    return status, body.encode(), 'text/html; charset=utf-8', []
+
+
+def _json(payload, status=200, headers=()):
+    # Same compact, key-sorted encoding as Flask's jsonify
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+    return status, body, 'application/json', list(headers)
+
+
+async def home(scope, receive):
+    return _html(await executor.run(_render, scope, 'index.html', {}))
+
+
+async def predict(scope, receive):
+    body = await _read_body(receive, MAX_FORM_BYTES)
+    if body is None:
+        return _json({"error": f"Form body larger than {MAX_FORM_BYTES} bytes"}, 413)
+    form = {name: values[0] for name, values in urllib.parse.parse_qs(body.decode('latin-1')).items()}
+    active = await _current_model()
+    if active is None:
+        context = {"prediction": "Error: Model not loaded. Please train the model first.", "error": True}
+        return _html(await executor.run(_render, scope, 'result.html', context))
+    return _html(await executor.run(_render_prediction, scope, active, form))
+
+
+async def api_test(scope, receive):
+    active = await _current_model()
+    if active is None:
+        return _json({"error": "Model not loaded"}, 500)
+    return _json(await executor.run(web.classify_test_samples, active))
+
+
+async def api_accuracy(scope, receive):
+    active = await _current_model()
+    if active is None:
+        return _json({"error": "Model not loaded"}, 500)
+    try:
+        report, etag = await executor.run(web.evaluation_cache.get, active.model,
+                                          active.target_names, active.fingerprint)
+    except Exception as e:
+        return _json({"error": str(e)}, 500)
+
+    headers = [(b'etag', quote_etag(etag).encode()), (b'cache-control', b'no-cache')]
+    if_none_match = dict(scope['headers']).get(b'if-none-match')
+    if if_none_match is not None and parse_etags(if_none_match.decode('latin-1')).contains(etag):
+        return 304, b'', None, headers
+    return _json(report, headers=headers)
+
+
+async def metrics_endpoint(scope, receive):
+    return 200, web.metrics.render().encode(), 'text/plain; version=0.0.4; charset=utf-8', []
+
+
+async def health_check(scope, receive):
+    if web.store.deferred:
+        status = await executor.run(web.health_status)
+    else:
+        status = web.health_status()
+    status["asgi"] = executor.stats()
+    return _json(status)
+
+
+def _read_static(filename):
+    """Contents of a file under app.static_folder, or None if there is no such file"""
+    path = safe_join(web.app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+async def static_file(scope, receive):
+    """The stylesheet and other files the templates link with url_for('static', ...)"""
+    filename = scope['path'][len(STATIC_PREFIX):]
+    body = await executor.run(_read_static, filename)
+    if body is None:
+        return _json({"error": "Not found"}, 404)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if content_type.startswith('text/'):
+        content_type += '; charset=utf-8'
+    return 200, body, content_type, []
+
+
+STATIC_PREFIX = web.app.static_url_path + '/'
+
+# path -> (method, handler)
+ROUTES = {
+    '/': ('GET', home),
+    '/predict': ('POST', predict),
+    '/api/test': ('GET', api_test),
+    '/api/accuracy': ('GET', api_accuracy),
+    '/metrics': ('GET', metrics_endpoint),
+    '/health': ('GET', health_check),
+}
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            executor.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        raise NotImplementedError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    started = time.perf_counter()
+    method, path = scope['method'], scope['path']
+    route = ROUTES.get(path)
+    if route is None and path.startswith(STATIC_PREFIX):
+        # One route label for every static file keeps the metrics bounded
+        route, path = ('GET', static_file), 'static'
+    web.metrics.inc('iris_http_requests_in_flight')
+    try:
+        if route is None:
+            path = 'unmatched'
+            status, body, content_type, headers = _json({"error": "Not found"}, 404)
+        elif method != route[0] and not (method == 'HEAD' and route[0] == 'GET'):
+            status, body, content_type, headers = _json({"error": "Method not allowed"}, 405,
+                                                        [(b'allow', route[0].encode())])
+        else:
+            status, body, content_type, headers = await route[1](scope, receive)
+
+        if content_type is not None:
+            headers.append((b'content-type', content_type.encode()))
+        if status != 304:
+            headers.append((b'content-length', str(len(body)).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b'' if method == 'HEAD' else body})
+    finally:
+        web.metrics.inc('iris_http_requests_in_flight', amount=-1)
+
+    labels = (('method', method), ('route', path))
+    web.metrics.observe('iris_http_request_duration_seconds', labels, time.perf_counter() - started)
+    web.metrics.inc('iris_http_requests_total', labels + (('status', str(status)),))
+    if status >= 500:
+        web.metrics.inc('iris_http_request_errors_total', labels)
@@ -0,0 +1,248 @@
+"""Append-only audit log of served predictions, written by a background thread.
+
+Request threads only append a reference to their results to an
+in-memory buffer. A writer thread flushes the buffer when
+max_batch_rows rows are waiting or when the oldest has waited
+flush_interval_ms. Each flush is one bulk write: a single executemany
+transaction for SQLite, or one write() of JSON lines.
+
+The buffer is bounded by max_pending_rows. A request that finds it full
+waits up to block_ms for the writer to catch up (backpressure), then
+drops its records and counts them. Pending records are flushed when the
+process exits.
+"""
+import atexit
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from features import FEATURE_NAMES
+
+COLUMNS = ('ts', 'endpoint', 'model_version', *FEATURE_NAMES, 'prediction', 'confidence')
+
+
+class SQLiteSink:
+    """predictions table in WAL mode; triggers reject UPDATE and DELETE.
+
+    synchronous=FULL syncs every commit to disk. Batching is what keeps
+    that affordable: one sync per flush instead of one per prediction.
+    """
+
+    def __init__(self, path):
+        # Opened on the writer thread, which is the only one that uses it
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=FULL')
+        feature_columns = ''.join(f'{name} REAL, ' for name in FEATURE_NAMES)
+        self._db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS predictions (
+                id INTEGER PRIMARY KEY, ts REAL NOT NULL, endpoint TEXT NOT NULL,
+                model_version TEXT, {feature_columns}prediction TEXT NOT NULL, confidence REAL);
+            CREATE TRIGGER IF NOT EXISTS predictions_no_update BEFORE UPDATE ON predictions
+                BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+            CREATE TRIGGER IF NOT EXISTS predictions_no_delete BEFORE DELETE ON predictions
+                BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+        """)
+        self._insert = (f"INSERT INTO predictions ({', '.join(COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(COLUMNS))})")
+
+    def write(self, rows):
+        with self._db:
+            self._db.executemany(self._insert, rows)
+
+    def close(self):
+        self._db.close()
+
+
+class JsonLinesSink:
+    """One JSON object per line, appended with O_APPEND and synced per flush"""
+
+    def __init__(self, path):
+        self._file = open(path, 'a', encoding='utf-8')
+        # Lines are formatted directly: floats are finite (validated), so repr() is valid JSON,
+        # and the few distinct strings (endpoint, version, class) are escaped once each
+        self._line = ('{{"ts": {!r}, "endpoint": {}, "model_version": {}, '
+                      + ''.join(f'"{name}": {{!r}}, ' for name in FEATURE_NAMES)
+                      + '"prediction": {}, "confidence": {!r}}}\n')
+        self._quoted = {}
+
+    def _quote(self, value):
+        quoted = self._quoted.get(value)
+        if quoted is None:
+            quoted = self._quoted[value] = json.dumps(value)
+        return quoted
+
+    def write(self, rows):
+        line, quote = self._line.format, self._quote
+        self._file.write(''.join(
+            line(ts, quote(endpoint), quote(version), *values, quote(prediction), confidence)
+            for ts, endpoint, version, *values, prediction, confidence in rows))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def open_sink(path):
+    return JsonLinesSink(path) if path.endswith('.jsonl') else SQLiteSink(path)
+
+
+class AuditLog:
+    def __init__(self, path, max_batch_rows=1000, flush_interval_ms=200.0,
+                 max_pending_rows=100000, block_ms=50.0, on_flush=None):
+        self.path = path
+        self.max_batch_rows = max_batch_rows
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending_rows = max_pending_rows
+        self.block_timeout = block_ms / 1000.0
+        self.on_flush = on_flush
+        # Fail at startup, not on the writer thread, if the log cannot be opened
+        open_sink(path).close()
+        self._start()
+        # The writer thread does not survive fork(); each worker gets its own
+        os.register_at_fork(after_in_child=self._start)
+        atexit.register(self.close)
+
+    def _start(self):
+        self._cond = threading.Condition()
+        self._pending = []
+        self._pending_rows = 0
+        self._oldest = None
+        self._closing = False
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self.write_errors = 0
+        self.last_error = None
+        self.last_flush_ms = 0.0
+        self.max_pending_seen = 0
+        self._writer = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._writer.start()
+
+    def record(self, endpoint, model_version, features, prediction, confidence):
+        """Log one prediction; returns False if it had to be dropped"""
+        return self._submit((time.time(), endpoint, model_version, [list(features)], [prediction],
+                             [confidence]), 1)
+
+    def record_many(self, endpoint, model_version, X, predictions, confidence):
+        """Log the rows of a scored batch; returns False if they had to be dropped"""
+        if not len(X):
+            return True
+        # The arrays are only referenced here; the writer turns them into rows
+        return self._submit((time.time(), endpoint, model_version, X, predictions, confidence), len(X))
+
+    def _submit(self, item, n_rows):
+        with self._cond:
+            if self._closing:
+                self.dropped += n_rows
+                return False
+            if self._pending and self._pending_rows + n_rows > self.max_pending_rows:
+                started = time.perf_counter()
+                self.blocked += 1
+                self._cond.wait_for(lambda: (not self._pending or self._closing or
+                                             self._pending_rows + n_rows <= self.max_pending_rows),
+                                    self.block_timeout)
+                self.blocked_seconds += time.perf_counter() - started
+                if self._closing or (self._pending and
+                                     self._pending_rows + n_rows > self.max_pending_rows):
+                    self.dropped += n_rows
+                    return False
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(item)
+            self._pending_rows += n_rows
+            self.max_pending_seen = max(self.max_pending_seen, self._pending_rows)
+            if len(self._pending) == 1 or self._pending_rows >= self.max_batch_rows:
+                self._cond.notify_all()
+        return True
+
+    def _take(self):
+        """Block until a flush is due; returns (items, rows), or None once closed and drained"""
+        with self._cond:
+            while True:
+                if self._pending and (self._closing or self._pending_rows >= self.max_batch_rows):
+                    break
+                if self._pending:
+                    remaining = self._oldest + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                elif self._closing:
+                    return None
+                else:
+                    self._cond.wait()
+            items, rows = self._pending, self._pending_rows
+            self._pending, self._pending_rows = [], 0
+            # Wake producers waiting for room
+            self._cond.notify_all()
+            return items, rows
+
+    @staticmethod
+    def _rows(items):
+        for ts, endpoint, version, X, predictions, confidence in items:
+            columns = np.asarray(X, dtype=float).T.tolist()
+            confidence = np.round(np.asarray(confidence, dtype=float), 4).tolist()
+            yield from zip(itertools.repeat(ts), itertools.repeat(endpoint), itertools.repeat(version),
+                           *columns, map(str, predictions), confidence)
+
+    def _run(self):
+        sink = open_sink(self.path)
+        try:
+            while True:
+                taken = self._take()
+                if taken is None:
+                    return
+                items, n_rows = taken
+                started = time.perf_counter()
+                try:
+                    sink.write(self._rows(items))
+                except Exception as e:
+                    with self._cond:
+                        self.write_errors += 1
+                        self.dropped += n_rows
+                        self.last_error = f"{type(e).__name__}: {e}"
+                    continue
+                seconds = time.perf_counter() - started
+                with self._cond:
+                    self.written += n_rows
+                    self.flushes += 1
+                    self.last_flush_ms = seconds * 1000
+                if self.on_flush is not None:
+                    self.on_flush(seconds, n_rows)
+        finally:
+            sink.close()
+
+    def close(self, timeout=10.0):
+        """Flush everything still pending and stop the writer"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._writer.is_alive() and self._writer is not threading.current_thread():
+            self._writer.join(timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "path": self.path,
+                "pending_rows": self._pending_rows,
+                "max_pending_rows": self.max_pending_rows,
+                "max_pending_seen": self.max_pending_seen,
+                "written": self.written,
+                "dropped": self.dropped,
+                "flushes": self.flushes,
+                "mean_flush_rows": round(self.written / self.flushes, 1) if self.flushes else 0,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "blocked": self.blocked,
+                "blocked_ms": round(self.blocked_seconds * 1000, 3),
+                "write_errors": self.write_errors,
+                "last_error": self.last_error,
+                "closed": self._closing,
+            }
@@ -0,0 +1,125 @@
+"""Micro-batching of concurrent single-row predictions.
+
+Requests submitted from many threads are queued and flushed together into
+one predict_proba call, either when max_batch_size rows are waiting or
+when the oldest row has waited max_wait_ms. Each row carries the model it
+was submitted against, so a batch that straddles a model reload is split
+into one call per model.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(self, max_batch_size=32, max_wait_ms=2.0, on_flush=None):
+        self.max_batch_size = max_batch_size
+        self.on_flush = on_flush
+        self.max_wait = max_wait_ms / 1000.0
+        self._start()
+        # The worker thread does not survive fork(); prefork servers get a fresh one per worker
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._rows = 0
+        self._flush_full = 0
+        self._flush_timeout = 0
+        self._max_batch = 0
+        self._batch_sizes = [0] * (self.max_batch_size + 1)
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def submit(self, model, features, timeout=None):
+        """Queue one feature row for model and block until its probability row is ready"""
+        future = Future()
+        self._queue.put((model, np.asarray(features, dtype=float), time.perf_counter(), future))
+        return future.result(timeout)
+
+    def _collect(self):
+        """Block for the first row, then gather more until the batch is full or stale"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            by_model = {}
+            for item in batch:
+                by_model.setdefault(id(item[0]), []).append(item)
+            for items in by_model.values():
+                self._flush(items)
+            self._record(batch, started)
+
+    def _flush(self, items):
+        model = items[0][0]
+        started = time.perf_counter()
+        try:
+            probabilities = model.predict_proba(np.vstack([row for _, row, _, _ in items]))
+            if self.on_flush is not None:
+                self.on_flush(time.perf_counter() - started, len(items))
+        except Exception as e:
+            for _, _, _, future in items:
+                future.set_exception(e)
+        else:
+            for (_, _, _, future), row in zip(items, probabilities):
+                future.set_result(row)
+
+    def _record(self, batch, started):
+        size = len(batch)
+        waits = [started - queued_at for _, _, queued_at, _ in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += size
+            if size >= self.max_batch_size:
+                self._flush_full += 1
+            else:
+                self._flush_timeout += 1
+            self._max_batch = max(self._max_batch, size)
+            self._batch_sizes[size] += 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self, reset=False):
+        """Queue depth and batch-size figures for tuning throughput vs latency"""
+        with self._stats_lock:
+            stats = {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "rows": self._rows,
+                "mean_batch_size": round(self._rows / self._batches, 2) if self._batches else 0,
+                "max_observed_batch_size": self._max_batch,
+                "flushed_full": self._flush_full,
+                "flushed_on_timeout": self._flush_timeout,
+                "batch_size_histogram": {
+                    str(size): count for size, count in enumerate(self._batch_sizes) if count
+                },
+                "mean_queue_wait_ms": round(self._wait_total / self._rows * 1000, 3) if self._rows else 0,
+                "max_queue_wait_ms": round(self._wait_max * 1000, 3),
+            }
+            if reset:
+                self._reset_stats()
+        return stats
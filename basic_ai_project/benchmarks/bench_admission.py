@@ -0,0 +1,155 @@
+"""Overload the threaded server with and without admission control.
+
+Starts the app under werkzeug's thread-per-connection server twice, once
+as is and once with IRIS_ADMISSION=1, and drives /api/predict_batch from
+more concurrent clients than it can serve. Clients send back to back and
+wait --shed-pause seconds (the Retry-After value) after a 503.
+Reports served requests/sec, the latency of successful requests and how
+many were shed.
+
+    python benchmarks/bench_admission.py
+    python benchmarks/bench_admission.py --clients 50 200 800 --max-in-flight 2 --queue 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from bench_asgi import WSGI_SERVER, free_port, raise_fd_limit, read_response, wait_until_ready  # noqa: E402
+from features import FEATURE_NAMES, FEATURE_RANGES  # noqa: E402
+
+
+def build_request(rows):
+    rng = np.random.default_rng(0)
+    X = np.round(rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(rows, len(FEATURE_NAMES))), 1)
+    body = json.dumps(X.tolist()).encode()
+    head = (f'POST /api/predict_batch HTTP/1.1\r\nHost: localhost\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n')
+    return head.encode() + body
+
+
+async def client(port, payload, deadline, args, result):
+    writer = None
+    try:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port),
+                                                        args.timeout)
+            writer.write(payload)
+            status, keep_alive = await asyncio.wait_for(read_response(reader), args.timeout)
+            elapsed = time.perf_counter() - t0
+            if not keep_alive:
+                writer.close()
+                writer = None
+            if status == 503:
+                result["shed"].append(elapsed)
+                await asyncio.sleep(args.shed_pause)
+            elif status == 200:
+                result["ok"].append(elapsed)
+            else:
+                result["errors"] += 1
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+        result["dropped"] += 1
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def drive(port, clients, payload, args):
+    result = {"ok": [], "shed": [], "errors": 0, "dropped": 0}
+    deadline = time.perf_counter() + args.duration
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, payload, deadline, args, result) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    ok_ms = np.asarray(result["ok"]) * 1000
+    summary = {
+        "clients": clients,
+        "served": len(ok_ms),
+        "served_rps": round(len(ok_ms) / elapsed, 1),
+        "shed": len(result["shed"]),
+        "errors": result["errors"],
+        "dropped": result["dropped"],
+    }
+    if len(ok_ms):
+        p50, p99 = np.percentile(ok_ms, [50, 99])
+        summary.update(p50_ms=round(float(p50), 1), p99_ms=round(float(p99), 1),
+                       max_ms=round(float(ok_ms.max()), 1))
+    if result["shed"]:
+        summary["shed_p99_ms"] = round(float(np.percentile(np.asarray(result["shed"]) * 1000, 99)), 1)
+    return summary
+
+
+def run(admission, clients, payload, args):
+    env = dict(os.environ, IRIS_ADMISSION='1' if admission else '0',
+               IRIS_ADMISSION_MAX_IN_FLIGHT=str(args.max_in_flight),
+               IRIS_ADMISSION_MAX_QUEUE=str(args.queue),
+               IRIS_ADMISSION_QUEUE_TIMEOUT_MS=str(args.queue_timeout_ms))
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-c', WSGI_SERVER, str(port), str(clients * 2)],
+                               cwd=PROJECT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(port, process)
+        summary = asyncio.run(drive(port, clients, payload, args))
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/admission/stats', timeout=args.timeout) as r:
+            stats = json.load(r)
+        if stats["enabled"]:
+            summary.update(queue_wait_mean_ms=stats["mean_queue_wait_ms"],
+                           queue_wait_max_ms=stats["max_queue_wait_ms"],
+                           shed_queue_full=stats["shed_queue_full"], shed_timeout=stats["shed_timeout"])
+        return summary
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p99 under overload with and without admission control")
+    parser.add_argument('--clients', type=int, nargs='+', default=[8, 64, 256, 1024])
+    parser.add_argument('--rows', type=int, default=1000, help="rows per /api/predict_batch request")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--max-in-flight', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--queue', type=int, default=16)
+    parser.add_argument('--queue-timeout-ms', type=float, default=200)
+    parser.add_argument('--shed-pause', type=float, default=1.0,
+                        help="client back-off after a 503 (the server's Retry-After)")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    raise_fd_limit(max(args.clients) + 256)
+    payload = build_request(args.rows)
+    results = []
+    for clients in args.clients:
+        for admission in (False, True):
+            summary = run(admission, clients, payload, args)
+            summary["admission"] = admission
+            results.append(summary)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.rows}-row batches, {args.duration:.0f}s; admission: {args.max_in_flight} in flight, "
+          f"queue {args.queue}, {args.queue_timeout_ms:.0f} ms deadline")
+    print(f"{'clients':>7} {'admission':>9} {'served/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'shed':>7} {'dropped':>7} {'queue max ms':>12}")
+    for r in results:
+        print(f"{r['clients']:>7} {'on' if r['admission'] else 'off':>9} {r['served_rps']:>9.1f} "
+              f"{r.get('p50_ms', float('nan')):>8.1f} {r.get('p99_ms', float('nan')):>8.1f} "
+              f"{r.get('max_ms', float('nan')):>8.1f} {r['shed']:>7} {r['dropped']:>7} "
+              f"{r.get('queue_wait_max_ms', float('nan')):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Compare model artifact formats by size and cold load time.
+
+Each format is loaded through model_store.load_snapshot in fresh
+interpreters, so the time includes every import the format needs
+(sklearn and joblib for the pickle, NumPy only for the binary artifact).
+
+    python benchmarks/bench_artifact_load.py
+    python benchmarks/bench_artifact_load.py --runs 10 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# format -> artifact path (target_names.pkl is read too for the pickle format)
+FORMATS = {
+    'pickle': 'model.pkl',
+    'mmap': 'model_arrays.joblib',
+    'binary': 'model.iristree',
+}
+
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from model_store import load_snapshot
+snapshot = load_snapshot(sys.argv[1], 'target_names.pkl', artifact=sys.argv[2])
+loaded = time.perf_counter()
+snapshot.engine.predict_proba([[5.1, 3.5, 1.4, 0.2]])
+print(json.dumps({
+    "load_ms": (loaded - started) * 1000,
+    "first_prediction_ms": (time.perf_counter() - loaded) * 1000,
+    "sklearn_imported": 'sklearn' in sys.modules,
+    "joblib_imported": 'joblib' in sys.modules,
+}))
+"""
+
+
+def measure(fmt, runs):
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, FORMATS[fmt], fmt],
+                                cwd=PROJECT_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Loading {FORMATS[fmt]} failed:\n{result.stderr[-2000:]}")
+        samples.append(json.loads(result.stdout.splitlines()[-1]))
+    size = os.path.getsize(os.path.join(PROJECT_DIR, FORMATS[fmt]))
+    if fmt == 'pickle':
+        size += os.path.getsize(os.path.join(PROJECT_DIR, 'target_names.pkl'))
+    return {
+        "path": FORMATS[fmt],
+        "size_bytes": size,
+        "load_ms": round(statistics.median(s["load_ms"] for s in samples), 2),
+        "first_prediction_ms": round(statistics.median(s["first_prediction_ms"] for s in samples), 3),
+        "sklearn_imported": samples[0]["sklearn_imported"],
+        "joblib_imported": samples[0]["joblib_imported"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model artifact size and cold load time")
+    parser.add_argument('--runs', type=int, default=5, help="fresh processes per format")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    results = {}
+    for fmt, path in FORMATS.items():
+        if not os.path.exists(os.path.join(PROJECT_DIR, path)):
+            print(f"⚠️ Skipping {fmt}: {path} not found (run python main.py export)")
+            continue
+        results[fmt] = measure(fmt, args.runs)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'format':<8} {'artifact':<22} {'bytes':>7} {'load ms':>9} {'1st pred ms':>12} {'sklearn':>8}")
+    for fmt, r in results.items():
+        print(f"{fmt:<8} {r['path']:<22} {r['size_bytes']:>7,} {r['load_ms']:>9.2f} "
+              f"{r['first_prediction_ms']:>12.3f} {'yes' if r['sklearn_imported'] else 'no':>8}")
+
+
+if __name__ == '__main__':
+    main()
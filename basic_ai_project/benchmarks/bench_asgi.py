@@ -0,0 +1,250 @@
+"""Compare the threaded WSGI server with the ASGI app at high concurrency.
+
+Starts each server in its own process, opens --clients connections at
+once from a single asyncio client, and has every client send requests
+back to back for --duration seconds, reconnecting whenever the server
+closes the connection. Reports connections established, requests/sec,
+latency percentiles, and the server's peak thread count and RSS.
+
+    python benchmarks/bench_asgi.py
+    python benchmarks/bench_asgi.py --clients 1000 --endpoint predict --duration 15
+
+The ASGI side needs uvicorn (pip install uvicorn).
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import ENDPOINTS  # noqa: E402
+
+# app.run() equivalent: werkzeug's thread-per-connection server, minus request logging
+WSGI_SERVER = """
+import sys
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, make_server
+from app import app
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+BaseWSGIServer.request_queue_size = int(sys.argv[2])
+make_server('127.0.0.1', int(sys.argv[1]), app, threaded=True, request_handler=QuietHandler).serve_forever()
+"""
+
+SERVERS = {
+    'wsgi': lambda port, backlog: [sys.executable, '-c', WSGI_SERVER, str(port), str(backlog)],
+    'asgi': lambda port, backlog: [sys.executable, '-m', 'uvicorn', 'asgi:application',
+                                   '--port', str(port), '--backlog', str(backlog),
+                                   '--log-level', 'warning', '--no-access-log'],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def raise_fd_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def proc_status(pid):
+    """(threads, rss_mib) for a live process, from /proc"""
+    threads = rss_kib = 0
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                threads = int(line.split()[1])
+            elif line.startswith('VmRSS:'):
+                rss_kib = int(line.split()[1])
+    return threads, rss_kib / 1024
+
+
+def wait_until_ready(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as s:
+                s.sendall(b'GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+                if s.recv(12).startswith(b'HTTP/1.1 200'):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+def build_request(name):
+    method, path, body, headers = ENDPOINTS[name]
+    body = (body or '').encode()
+    lines = [f'{method} {path} HTTP/1.1', 'Host: localhost', f'Content-Length: {len(body)}']
+    lines += [f'{key}: {value}' for key, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head[9:12])
+    length, keep_alive = 0, True
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'connection' and value.strip().lower() == b'close':
+            keep_alive = False
+    if length:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def client(port, payload, start, deadline, timeout, result):
+    def connect():
+        return asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+
+    try:
+        reader, writer = await connect()
+    except (OSError, asyncio.TimeoutError):
+        result["connect_failures"] += 1
+        return
+    result["connected"] += 1
+    await start.wait()
+    try:
+        while time.perf_counter() < deadline[0]:
+            t0 = time.perf_counter()
+            if writer is None:
+                # The server closed the last connection; reconnecting is part of the latency
+                reader, writer = await connect()
+                result["reconnects"] += 1
+            writer.write(payload)
+            status, keep_alive = await asyncio.wait_for(read_response(reader), timeout)
+            result["latencies"].append(time.perf_counter() - t0)
+            result["errors"] += status >= 500
+            if not keep_alive:
+                writer.close()
+                writer = None
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+        result["dropped"] += 1
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def drive(port, pid, clients, duration, endpoint, timeout):
+    result = {"connected": 0, "connect_failures": 0, "reconnects": 0, "dropped": 0, "errors": 0,
+              "latencies": []}
+    payload = build_request(endpoint)
+    start = asyncio.Event()
+    deadline = [float('inf')]
+    peak = [0, 0.0]
+
+    async def sample_server():
+        while True:
+            threads, rss = proc_status(pid)
+            peak[0], peak[1] = max(peak[0], threads), max(peak[1], rss)
+            await asyncio.sleep(0.2)
+
+    sampler = asyncio.create_task(sample_server())
+    connect_started = time.perf_counter()
+    tasks = [asyncio.create_task(client(port, payload, start, deadline, timeout, result))
+             for _ in range(clients)]
+    # Every client connects before any starts sending, so all are open at once
+    while result["connected"] + result["connect_failures"] < clients:
+        await asyncio.sleep(0.01)
+    connect_seconds = time.perf_counter() - connect_started
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+
+    latencies_ms = np.asarray(result["latencies"]) * 1000
+    summary = {
+        "clients": clients,
+        "connected": result["connected"],
+        "connect_failures": result["connect_failures"],
+        "connect_seconds": round(connect_seconds, 2),
+        "reconnects": result["reconnects"],
+        "dropped": result["dropped"],
+        "requests": len(latencies_ms),
+        "errors": result["errors"],
+        "rps": round(len(latencies_ms) / elapsed, 1),
+        "server_peak_threads": peak[0],
+        "server_peak_rss_mib": round(peak[1], 1),
+    }
+    if len(latencies_ms):
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        summary.update(p50_ms=round(float(p50), 2), p95_ms=round(float(p95), 2),
+                       p99_ms=round(float(p99), 2), max_ms=round(float(latencies_ms.max()), 2))
+    return summary
+
+
+def run_server(kind, args):
+    port = free_port()
+    process = subprocess.Popen(SERVERS[kind](port, args.clients * 2), cwd=PROJECT_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(port, process)
+        return asyncio.run(drive(port, process.pid, args.clients, args.duration,
+                                 args.endpoint, args.timeout))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WSGI vs ASGI at high concurrency")
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument('--clients', type=int, default=1000, help="concurrent client connections")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of sustained load")
+    parser.add_argument('--endpoint', default='api_test', choices=list(ENDPOINTS))
+    parser.add_argument('--timeout', type=float, default=30.0, help="per connect/request timeout")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    limit = raise_fd_limit(args.clients + 256)
+    if limit < args.clients + 256:
+        print(f"⚠️ Open file limit is {limit}; some of the {args.clients} clients will fail to connect")
+
+    results = {}
+    for kind in args.servers:
+        if kind == 'asgi':
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError:
+                print("⚠️ Skipping asgi: uvicorn is not installed (pip install uvicorn)")
+                continue
+        results[kind] = run_server(kind, args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"\n{args.clients} clients, {args.duration:.0f}s on {ENDPOINTS[args.endpoint][1]}")
+    print(f"{'server':<6} {'connected':>9} {'dropped':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'threads':>7} {'RSS MiB':>8}")
+    for kind, stats in results.items():
+        print(f"{kind:<6} {stats['connected']:>9} {stats['dropped']:>7} {stats['rps']:>8.1f} "
+              f"{stats.get('p50_ms', float('nan')):>8.2f} {stats.get('p95_ms', float('nan')):>8.2f} "
+              f"{stats.get('p99_ms', float('nan')):>8.2f} {stats['server_peak_threads']:>7} "
+              f"{stats['server_peak_rss_mib']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Request latency with the audit log off, asynchronous, and written synchronously.
+
+Drives /predict and /api/predict_batch through the Flask test client with
+    off         no audit log
+    sqlite      AuditLog to SQLite (background writer, batched executemany)
+    jsonl       AuditLog to JSON lines (background writer, one write per flush)
+    sync        one SQLite INSERT + COMMIT inside every request, for comparison
+and reports mean/p99 latency, then how long the writer took to drain.
+
+    python benchmarks/bench_audit_log.py
+    python benchmarks/bench_audit_log.py --requests 5000 --batch-rows 1000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+import app as web  # noqa: E402
+from audit_log import AuditLog, SQLiteSink  # noqa: E402
+from features import FEATURE_NAMES, FEATURE_RANGES  # noqa: E402
+
+MODES = ['off', 'sqlite', 'jsonl', 'sync']
+
+
+class SyncAudit:
+    """The naive alternative: commit each request's rows before responding"""
+
+    def __init__(self, path):
+        self._sink = SQLiteSink(path)
+
+    def record_many(self, endpoint, model_version, X, predictions, confidence):
+        ts = time.time()
+        self._sink.write([(ts, endpoint, model_version, *map(float, row), str(p), float(c))
+                          for row, p, c in zip(X, predictions, confidence)])
+        return True
+
+    def close(self):
+        self._sink.close()
+
+
+def make_log(mode, directory):
+    if mode == 'off':
+        return None
+    if mode == 'sync':
+        return SyncAudit(os.path.join(directory, 'sync.sqlite3'))
+    return AuditLog(os.path.join(directory, f'audit.{"jsonl" if mode == "jsonl" else "sqlite3"}'))
+
+
+def measure(client, path, kwargs, n):
+    latencies = []
+    for _ in range(n):
+        started = time.perf_counter()
+        response = client.post(path, **kwargs)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    latencies_ms = np.asarray(latencies) * 1000
+    return round(float(latencies_ms.mean()), 3), round(float(np.percentile(latencies_ms, 99)), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit log overhead on request latency")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--batch-rows', type=int, default=100, help="rows per /api/predict_batch call")
+    parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    batch = np.round(rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1],
+                                 size=(args.batch_rows, len(FEATURE_NAMES))), 1).tolist()
+    form = dict(zip(FEATURE_NAMES, ['5.1', '3.5', '1.4', '0.2']))
+    client = web.app.test_client()
+    requests = {
+        'predict': ('/predict', {'data': form}),
+        'predict_batch': ('/api/predict_batch', {'json': batch}),
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes:
+            web.audit_log = make_log(mode, directory)
+            result = {"mode": mode}
+            for name, (path, kwargs) in requests.items():
+                measure(client, path, kwargs, 50)  # warm-up
+                result[f"{name}_mean_ms"], result[f"{name}_p99_ms"] = measure(client, path, kwargs,
+                                                                              args.requests)
+            if web.audit_log is not None:
+                started = time.perf_counter()
+                web.audit_log.close()
+                result["drain_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                if isinstance(web.audit_log, AuditLog):
+                    stats = web.audit_log.stats()
+                    result.update(written=stats["written"], flushes=stats["flushes"], dropped=stats["dropped"])
+            results.append(result)
+        web.audit_log = None
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.requests} requests each; /api/predict_batch with {args.batch_rows} rows")
+    print(f"{'mode':<7} {'predict mean':>12} {'p99':>7} {'batch mean':>11} {'p99':>7} "
+          f"{'drain ms':>9} {'flushes':>8} {'dropped':>8}")
+    for r in results:
+        print(f"{r['mode']:<7} {r['predict_mean_ms']:>12.3f} {r['predict_p99_ms']:>7.3f} "
+              f"{r['predict_batch_mean_ms']:>11.3f} {r['predict_batch_p99_ms']:>7.3f} "
+              f"{r.get('drain_ms', 0):>9.1f} {r.get('flushes', '-'):>8} {r.get('dropped', '-'):>8}")
+
+
+if __name__ == '__main__':
+    main()
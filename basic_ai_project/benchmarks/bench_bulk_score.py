@@ -0,0 +1,91 @@
+"""Measure how `main.py score` scales with worker processes.
+
+Writes a synthetic NPY and/or CSV file of --rows random samples to a
+temporary directory, then scores it with 1, 2, 4, ... up to --max-workers
+processes and reports rows/sec and speedup over one worker.
+
+    python benchmarks/bench_bulk_score.py
+    python benchmarks/bench_bulk_score.py --rows 20000000 --formats npy --max-workers 16
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from features import FEATURE_NAMES, FEATURE_RANGES  # noqa: E402
+
+
+def write_inputs(directory, n_rows, formats, block_rows=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    paths = {}
+    if 'npy' in formats:
+        paths['npy'] = os.path.join(directory, 'bench.npy')
+        array = np.lib.format.open_memmap(paths['npy'], mode='w+', dtype=np.float64,
+                                          shape=(n_rows, len(FEATURE_NAMES)))
+    if 'csv' in formats:
+        paths['csv'] = os.path.join(directory, 'bench.csv')
+        csv = open(paths['csv'], 'w')
+        csv.write(','.join(FEATURE_NAMES) + '\n')
+    for start in range(0, n_rows, block_rows):
+        stop = min(start + block_rows, n_rows)
+        X = np.round(rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1],
+                                 size=(stop - start, len(FEATURE_NAMES))), 1)
+        if 'npy' in formats:
+            array[start:stop] = X
+        if 'csv' in formats:
+            np.savetxt(csv, X, fmt='%.1f', delimiter=',')
+    if 'npy' in formats:
+        array.flush()
+        del array
+    if 'csv' in formats:
+        csv.close()
+    return paths
+
+
+def score(path, workers, output):
+    result = subprocess.run([sys.executable, 'main.py', 'score', path, '--workers', str(workers),
+                             '--output', output], cwd=PROJECT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    # Wall-clock rate from the summary line, including pool start-up
+    match = re.search(r'in ([\d.]+)s: ([\d,]+) rows/s', result.stdout)
+    return float(match.group(1)), int(match.group(2).replace(',', ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling of main.py score with worker processes")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--formats', nargs='+', default=['npy', 'csv'], choices=['npy', 'csv'])
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    workers = [1]
+    while workers[-1] * 2 <= args.max_workers:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != args.max_workers:
+        workers.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Writing {args.rows:,} rows...")
+        paths = write_inputs(directory, args.rows, args.formats)
+        output = os.path.join(directory, 'predictions.csv')
+        for fmt, path in paths.items():
+            size_mib = os.path.getsize(path) / 2**20
+            print(f"\n[{fmt}] {size_mib:,.0f} MiB")
+            print(f"{'workers':>7} {'seconds':>8} {'rows/s':>12} {'speedup':>8}")
+            baseline = None
+            for n in workers:
+                seconds, rate = score(path, n, output)
+                baseline = baseline or rate
+                print(f"{n:>7} {seconds:>8.2f} {rate:>12,} {rate / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
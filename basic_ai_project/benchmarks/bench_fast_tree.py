@@ -0,0 +1,60 @@
+"""Parity check and per-call microbenchmark: CompiledTree vs sklearn.
+
+Run from anywhere:
+    python benchmarks/bench_fast_tree.py
+"""
+import os
+import sys
+import timeit
+
+import joblib
+import numpy as np
+from sklearn.datasets import load_iris
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from fast_tree import CompiledTree  # noqa: E402
+
+
+def check_parity(clf, tree, X):
+    """Fail loudly if the compiled tree disagrees with sklearn on any row"""
+    expected = clf.predict_proba(X)
+    np.testing.assert_allclose(tree.predict_proba(X), expected, rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(tree.predict(X), clf.predict(X))
+    for row, expected_row in zip(X[:500], expected[:500]):
+        np.testing.assert_allclose(tree.predict_proba_one(row), expected_row, rtol=0, atol=1e-12)
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+if __name__ == '__main__':
+    clf = joblib.load(os.path.join(PROJECT_DIR, 'model.pkl'))
+    tree = CompiledTree.from_estimator(clf)
+
+    iris = load_iris()
+    rng = np.random.default_rng(0)
+    X_random = rng.uniform(iris.data.min(axis=0) - 1, iris.data.max(axis=0) + 1, size=(100000, 4))
+    # Values sitting exactly on split thresholds exercise the <= boundary
+    X_edges = np.tile(iris.data.mean(axis=0), (len(tree.threshold), 1))
+    for i, (feature, threshold) in enumerate(zip(tree.feature, tree.threshold)):
+        if feature >= 0:
+            X_edges[i, feature] = threshold
+    for X in (iris.data, X_random, X_edges):
+        check_parity(clf, tree, X)
+    print(f"✅ Parity with sklearn predict_proba on {len(iris.data) + len(X_random) + len(X_edges)} rows")
+
+    row = iris.data[0]
+    row_2d = row.reshape(1, -1)
+    print(f"\n{'case':<24} {'sklearn us':>12} {'compiled us':>12} {'speedup':>8}")
+    cases = [
+        ('single row', lambda: clf.predict_proba(row_2d), lambda: tree.predict_proba_one(row), 2000),
+        ('batch 100', lambda: clf.predict_proba(X_random[:100]), lambda: tree.predict_proba(X_random[:100]), 500),
+        ('batch 10k', lambda: clf.predict_proba(X_random[:10000]), lambda: tree.predict_proba(X_random[:10000]), 20),
+    ]
+    for name, sk_fn, fast_fn, number in cases:
+        sk_us = per_call_us(sk_fn, number)
+        fast_us = per_call_us(fast_fn, number)
+        print(f"{name:<24} {sk_us:>12.1f} {fast_us:>12.1f} {sk_us / fast_us:>7.1f}x")
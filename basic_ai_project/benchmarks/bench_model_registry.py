@@ -0,0 +1,108 @@
+"""Cost of serving registry models and of shadow scoring.
+
+Publishes the current artifacts into a temporary registry as several
+model names, then drives /api/predict_batch through the Flask test client:
+    default      no model selected
+    registry     ?model=<name>, already loaded (LRU hit)
+    cold         ?model=<name> after its cache entry was evicted (load + warm)
+    shadow       default model with every request shadowed on a registry model
+and reports mean/p99 latency, plus the shadow scorer's agreement and drops.
+
+    python benchmarks/bench_model_registry.py
+    python benchmarks/bench_model_registry.py --requests 5000 --rows 1000 --models 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+import app as web  # noqa: E402
+from features import FEATURE_NAMES, FEATURE_RANGES  # noqa: E402
+from model_registry import ModelRegistry, approximate_size, publish_artifacts  # noqa: E402
+from shadow import ShadowScorer  # noqa: E402
+
+
+def measure(client, paths, batch, n, before=None):
+    """mean and p99 ms of n POSTs, cycling through paths; before() runs untimed ahead of each"""
+    latencies = []
+    for i in range(n):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        response = client.post(paths[i % len(paths)], json=batch)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    latencies_ms = np.asarray(latencies) * 1000
+    return round(float(latencies_ms.mean()), 3), round(float(np.percentile(latencies_ms, 99)), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registry model selection and shadow scoring overhead")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=100, help="rows per /api/predict_batch call")
+    parser.add_argument('--models', type=int, default=4, help="model names to publish and rotate through")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    batch = np.round(rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1],
+                                 size=(args.rows, len(FEATURE_NAMES))), 1).tolist()
+    client = web.app.test_client()
+    names = [f'variant{i}' for i in range(args.models)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        for name in names:
+            publish_artifacts(name, 'v1', root=root)
+        registry = web.registry = ModelRegistry(root, model_filename=web.registry.model_filename,
+                                                artifact=web.registry.artifact, fast_tree=web.FAST_TREE_ENABLED,
+                                                warm_rows=web.registry.warm_rows)
+        model_bytes = approximate_size(registry.get(names[0]))
+
+        default = ['/api/predict_batch']
+        selected = [f'/api/predict_batch?model={name}' for name in names]
+
+        measure(client, default + selected, batch, 50)  # warm-up
+        results.append(("default", *measure(client, default, batch, args.requests)))
+        results.append(("registry", *measure(client, selected, batch, args.requests)))
+        # Every request finds the cache empty, so each one pays a load
+        results.append(("cold", *measure(client, selected, batch, min(args.requests, 200), before=registry.clear)))
+
+        web.shadow_scorer = ShadowScorer(lambda: registry.get(names[0]), sample_rate=1.0)
+        results.append(("shadow", *measure(client, default, batch, args.requests)))
+        deadline = time.monotonic() + 30
+        while web.shadow_scorer.stats()["queue_depth"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        shadow = web.shadow_scorer.stats()
+        web.shadow_scorer = None
+        cache = registry.stats()
+
+    summary = {
+        "requests": args.requests,
+        "rows": args.rows,
+        "model_bytes": model_bytes,
+        "modes": [{"mode": mode, "mean_ms": mean, "p99_ms": p99} for mode, mean, p99 in results],
+        "registry": {key: cache[key] for key in ("hits", "misses", "evictions")},
+        "shadow": {key: shadow[key] for key in ("sampled_requests", "rows", "agreement", "dropped", "latency")},
+    }
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"/api/predict_batch with {args.rows} rows; {args.models} registry models of ~{model_bytes:,} bytes each")
+    print(f"{'mode':<9} {'mean ms':>8} {'p99 ms':>8}")
+    for mode, mean, p99 in results:
+        print(f"{mode:<9} {mean:>8.3f} {p99:>8.3f}")
+    print(f"shadow: {shadow['sampled_requests']} requests, agreement {shadow['agreement']}, "
+          f"dropped {shadow['dropped']}, candidate mean {shadow['latency']['candidate']['mean_ms']} ms")
+
+
+if __name__ == '__main__':
+    main()
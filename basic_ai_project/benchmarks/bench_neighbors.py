@@ -0,0 +1,100 @@
+"""Measure nearest-sample lookup latency as the reference set grows.
+
+For each size, builds a NeighborIndex over that many synthetic rows drawn
+from the accepted feature ranges, then reports the index build time,
+single-row query latency (p50/p99), the per-row cost of a batched query,
+and a brute-force NumPy scan for comparison.
+
+    python benchmarks/bench_neighbors.py
+    python benchmarks/bench_neighbors.py --sizes 100000 1000000 10000000 --k 10 --json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from features import FEATURE_NAMES, FEATURE_RANGES  # noqa: E402
+from neighbors import DEFAULT_LEAF_SIZE, NeighborIndex  # noqa: E402
+
+
+def samples(rng, n):
+    return rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(n, len(FEATURE_NAMES)))
+
+
+def brute_force(X, query, k):
+    distances = np.sqrt(((X - query) ** 2).sum(axis=1))
+    nearest = np.argpartition(distances, k - 1)[:k]
+    return nearest[np.argsort(distances[nearest])]
+
+
+def measure(n_rows, args, rng):
+    X = samples(rng, n_rows)
+    y = rng.integers(0, 3, size=n_rows)
+    index = NeighborIndex(X, y, ['setosa', 'versicolor', 'virginica'], leaf_size=args.leaf_size)
+
+    queries = samples(rng, args.queries)
+    latencies = []
+    for row in queries:
+        started = time.perf_counter()
+        index.query(row, args.k)
+        latencies.append(time.perf_counter() - started)
+
+    batch = samples(rng, args.batch)
+    started = time.perf_counter()
+    index.query(batch, args.k)
+    batch_seconds = time.perf_counter() - started
+
+    brute = []
+    for row in queries[:args.brute_queries]:
+        started = time.perf_counter()
+        brute_force(X, row, args.k)
+        brute.append(time.perf_counter() - started)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "rows": n_rows,
+        "build_s": round(index.build_seconds, 3),
+        "query_p50_ms": round(float(np.percentile(latencies_ms, 50)), 4),
+        "query_p99_ms": round(float(np.percentile(latencies_ms, 99)), 4),
+        "batch_rows": args.batch,
+        "batch_ms": round(batch_seconds * 1000, 2),
+        "batch_us_per_row": round(batch_seconds / args.batch * 1e6, 2),
+        "brute_force_ms": round(float(np.median(brute)) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KD-tree nearest-sample latency vs reference set size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 4_000_000])
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--leaf-size', type=int, default=DEFAULT_LEAF_SIZE)
+    parser.add_argument('--queries', type=int, default=1000, help="single-row queries per size")
+    parser.add_argument('--batch', type=int, default=1000, help="rows in the batched query")
+    parser.add_argument('--brute-queries', type=int, default=20, help="brute-force scans per size")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = []
+    if not args.json:
+        print(f"{'rows':>10} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'batch us/row':>12} {'brute ms':>9}")
+    for n_rows in args.sizes:
+        result = measure(n_rows, args, rng)
+        results.append(result)
+        if not args.json:
+            print(f"{n_rows:>10,} {result['build_s']:>8.3f} {result['query_p50_ms']:>8.4f} "
+                  f"{result['query_p99_ms']:>8.4f} {result['batch_us_per_row']:>12.2f} "
+                  f"{result['brute_force_ms']:>9.3f}")
+    if args.json:
+        print(json.dumps({"k": args.k, "leaf_size": args.leaf_size, "results": results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Batch inference latency versus batch size and thread count.
+
+Trains each model kind from main.py (single tree, random forest, gradient
+boosting) on Iris in memory, then times ParallelPredictor.predict_proba,
+the path behind /api/predict_batch, for every batch size and
+IRIS_BATCH_THREADS value. Parallel results are checked against the
+single-threaded ones.
+
+    python benchmarks/bench_parallel_inference.py
+    python benchmarks/bench_parallel_inference.py --models forest --threads 1 2 4 8 --rows 1000 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from fast_tree import CompiledTree  # noqa: E402
+from features import FEATURE_NAMES, FEATURE_RANGES  # noqa: E402
+from main import MODEL_KINDS, build_model  # noqa: E402
+from parallel_inference import ParallelPredictor  # noqa: E402
+
+
+def time_call(predictor, engine, X, repeat):
+    predictor.predict_proba(engine, X)  # warm-up, and starts the pool
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        predictor.predict_proba(engine, X)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch inference latency by batch size and thread count")
+    parser.add_argument('--models', nargs='+', default=list(MODEL_KINDS), choices=MODEL_KINDS)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--threads', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--min-rows-per-thread', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5, help="timed calls per cell (median reported)")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    from sklearn.datasets import load_iris
+    iris = load_iris()
+    rng = np.random.default_rng(0)
+    X_all = rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(max(args.rows), len(FEATURE_NAMES)))
+
+    results = []
+    for kind in args.models:
+        clf = build_model(kind, n_estimators=args.n_estimators).fit(iris.data, iris.target)
+        if kind == 'forest':
+            clf.set_params(n_jobs=None)
+        # The single tree is served compiled, as the app does by default
+        engine = CompiledTree.from_estimator(clf) if kind == 'tree' else clf
+        for rows in args.rows:
+            X = X_all[:rows]
+            expected = engine.predict_proba(X)
+            for threads in args.threads:
+                predictor = ParallelPredictor(threads=threads, min_rows_per_thread=args.min_rows_per_thread)
+                if not np.array_equal(predictor.predict_proba(engine, X), expected):
+                    raise AssertionError(f"{kind}: {threads}-thread result differs from serial")
+                seconds = time_call(predictor, engine, X, args.repeat)
+                results.append({"model": kind, "rows": rows, "threads": threads,
+                                "chunks": len(predictor.chunk_bounds(rows)) - 1,
+                                "ms": round(seconds * 1000, 3), "us_per_row": round(seconds * 1e6 / rows, 3)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{os.cpu_count()} CPUs; {args.n_estimators} estimators; "
+          f"chunks of at least {args.min_rows_per_thread} rows; median of {args.repeat}")
+    print(f"{'model':<9} {'rows':>7} {'threads':>7} {'chunks':>6} {'ms':>10} {'us/row':>8} {'speedup':>8}")
+    serial = {(r["model"], r["rows"]): r["ms"] for r in results if r["threads"] == min(args.threads)}
+    for r in results:
+        speedup = serial[r["model"], r["rows"]] / r["ms"] if r["ms"] else float('nan')
+        print(f"{r['model']:<9} {r['rows']:>7} {r['threads']:>7} {r['chunks']:>6} {r['ms']:>10.3f} "
+              f"{r['us_per_row']:>8.3f} {speedup:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark /api/predict_batch throughput (rows/sec) for several batch sizes.
+
+Run from anywhere:
+    python benchmarks/bench_predict_batch.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from app import app, FEATURE_RANGES  # noqa: E402
+
+BATCH_SIZES = [1, 100, 10000]
+MIN_SECONDS = 1.0
+
+
+def random_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(n, len(FEATURE_RANGES)))
+    return np.round(X, 1).tolist()
+
+
+def bench_batch(client, rows):
+    """Post the same batch repeatedly for at least MIN_SECONDS; return rows/sec"""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        response = client.post('/api/predict_batch', json=rows)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return calls * len(rows) / elapsed, elapsed / calls
+
+
+def bench_single_form(client, rows):
+    """Baseline: the same rows sent one at a time through /predict"""
+    names = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+    start = time.perf_counter()
+    for row in rows:
+        client.post('/predict', data=dict(zip(names, map(str, row))))
+    return len(rows) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    client = app.test_client()
+    print(f"{'rows':>8} {'rows/sec':>12} {'ms/call':>10}")
+    for n in BATCH_SIZES:
+        rate, per_call = bench_batch(client, random_rows(n))
+        print(f"{n:>8} {rate:>12.0f} {per_call * 1000:>10.2f}")
+    print(f"\n/predict one row per request: {bench_single_form(client, random_rows(200)):.0f} rows/sec")
@@ -0,0 +1,90 @@
+"""Request latency with the request profiler off, idle, and profiling every request.
+
+Drives /predict and /api/predict_batch through the Flask test client with
+    off         no profiler (IRIS_PROFILE=0)
+    idle        profiler installed, sample rate 0: only the sampling decision runs
+    sampled     every request profiled
+and reports mean/p99 latency and the samples taken per profiled request.
+
+    python benchmarks/bench_profiler.py
+    python benchmarks/bench_profiler.py --requests 5000 --interval-ms 0.5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+import app as web  # noqa: E402
+from features import FEATURE_NAMES, FEATURE_RANGES  # noqa: E402
+from profiler import RequestProfiler  # noqa: E402
+
+MODES = {'off': None, 'idle': 0.0, 'sampled': 1.0}
+
+
+def measure(client, path, kwargs, n):
+    latencies = []
+    for _ in range(n):
+        started = time.perf_counter()
+        response = client.post(path, **kwargs)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    latencies_ms = np.asarray(latencies) * 1000
+    return round(float(latencies_ms.mean()), 3), round(float(np.percentile(latencies_ms, 99)), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request profiler overhead")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--batch-rows', type=int, default=1000, help="rows per /api/predict_batch call")
+    parser.add_argument('--interval-ms', type=float, default=1.0)
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    batch = np.round(rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1],
+                                 size=(args.batch_rows, len(FEATURE_NAMES))), 1).tolist()
+    form = dict(zip(FEATURE_NAMES, ['5.1', '3.5', '1.4', '0.2']))
+    client = web.app.test_client()
+    requests = {
+        'predict': ('/predict', {'data': form}),
+        'predict_batch': ('/api/predict_batch', {'json': batch}),
+    }
+
+    results = []
+    for mode, sample_rate in MODES.items():
+        result = {"mode": mode}
+        for name, (path, kwargs) in requests.items():
+            web.request_profiler = None
+            if sample_rate is not None:
+                web.request_profiler = RequestProfiler(sample_rate=sample_rate, interval_ms=args.interval_ms,
+                                                       max_profiles=args.requests)
+            measure(client, path, kwargs, 50)  # warm-up
+            result[f"{name}_mean_ms"], result[f"{name}_p99_ms"] = measure(client, path, kwargs, args.requests)
+            if web.request_profiler is not None:
+                stats = web.request_profiler.stats()
+                result[f"{name}_samples_per_request"] = (round(stats["samples"] / stats["profiled"], 2)
+                                                         if stats["profiled"] else 0)
+        results.append(result)
+    web.request_profiler = None
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.requests} requests each; /api/predict_batch with {args.batch_rows} rows; "
+          f"{args.interval_ms} ms sampling interval")
+    print(f"{'mode':<8} {'predict mean':>12} {'p99':>7} {'samples':>8} {'batch mean':>11} {'p99':>7} {'samples':>8}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['predict_mean_ms']:>12.3f} {r['predict_p99_ms']:>7.3f} "
+              f"{r.get('predict_samples_per_request', '-'):>8} {r['predict_batch_mean_ms']:>11.3f} "
+              f"{r['predict_batch_p99_ms']:>7.3f} {r.get('predict_batch_samples_per_request', '-'):>8}")
+
+
+if __name__ == '__main__':
+    main()
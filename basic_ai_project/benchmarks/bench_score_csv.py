@@ -0,0 +1,90 @@
+"""Check that /api/score_csv scores uploads in flat memory.
+
+Streams synthetic CSV uploads of increasing size through the WSGI app,
+generating the body on the fly and consuming the response as it
+is produced, and reports rows/sec and the peak traced allocation for
+each size. The peak should not grow with the row count.
+
+    python benchmarks/bench_score_csv.py
+    python benchmarks/bench_score_csv.py --rows 100000 1000000 5000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+from app import app, FEATURE_NAMES, FEATURE_RANGES  # noqa: E402
+
+
+class SyntheticCSV:
+    """A read()-able CSV body of n_rows random in-range rows, built block by block"""
+
+    def __init__(self, n_rows, block_rows=20000, seed=0):
+        self.remaining = n_rows
+        self.block_rows = block_rows
+        self.rng = np.random.default_rng(seed)
+        self.buffer = (','.join(FEATURE_NAMES) + '\n').encode()
+
+    def read(self, size=-1):
+        while self.remaining and (size < 0 or len(self.buffer) < size):
+            n = min(self.block_rows, self.remaining)
+            X = self.rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(n, len(FEATURE_NAMES)))
+            self.buffer += ('\n'.join(','.join(f'{v:.1f}' for v in row) for row in X) + '\n').encode()
+            self.remaining -= n
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def score(n_rows):
+    """Upload n_rows and drain the streamed response; returns (seconds, output rows)"""
+    environ = EnvironBuilder(path='/api/score_csv', method='POST', content_type='text/csv').get_environ()
+    # No Content-Length: the body is read until the stream runs dry, like a chunked upload
+    environ.pop('CONTENT_LENGTH', None)
+    environ['wsgi.input'] = SyntheticCSV(n_rows)
+    environ['wsgi.input_terminated'] = True
+
+    status = []
+    started = time.perf_counter()
+    body = app(environ, lambda code, headers: status.append(code))
+    lines = 0
+    try:
+        for chunk in body:
+            lines += chunk.count(b'\n')
+    finally:
+        body.close()
+    assert status[0].startswith('200'), status[0]
+    return time.perf_counter() - started, lines - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flat-memory check for /api/score_csv")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    score(1000)
+
+    print(f"{'rows':>10} {'rows/s':>10} {'peak MiB':>9}")
+    for n_rows in args.rows:
+        seconds, scored = score(n_rows)
+        assert scored == n_rows, f"expected {n_rows} result rows, got {scored}"
+        # A second, traced pass measures memory; tracing slows it down too much to time
+        tracemalloc.start()
+        score(n_rows)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{n_rows:>10} {n_rows / seconds:>10,.0f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
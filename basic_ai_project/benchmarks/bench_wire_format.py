@@ -0,0 +1,103 @@
+"""Compare request/response encodings for batch prediction at several batch sizes.
+
+Bodies are encoded once up front, so the numbers are the server's cost of
+decoding, predicting and encoding the response, through the Flask test
+client:
+
+    json     POST /api/predict_batch, JSON rows in, JSON out
+    form     POST /predict once per row, form fields in, HTML out
+    float32  POST /api/predict_batch, raw float32 matrix in and out
+    msgpack  POST /api/predict_batch, MessagePack with a raw matrix in and out
+
+    python benchmarks/bench_wire_format.py
+    python benchmarks/bench_wire_format.py --sizes 1 1000 100000 --formats json float32
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from app import app  # noqa: E402
+from features import FEATURE_NAMES, FEATURE_RANGES  # noqa: E402
+from wire_format import FLOAT32_MIMETYPE  # noqa: E402
+
+FORMATS = ['json', 'form', 'float32', 'msgpack']
+
+# /predict takes one row per request; larger batches would only measure the loop
+MAX_FORM_ROWS = 1000
+
+
+def random_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(n, len(FEATURE_NAMES)))
+    return np.round(X, 1)
+
+
+def requests_for(fmt, X):
+    """(path, body, headers) of the request(s) that score every row of X once"""
+    if fmt == 'json':
+        return [('/api/predict_batch', json.dumps(X.tolist()), {'Content-Type': 'application/json'})]
+    if fmt == 'form':
+        return [('/predict', dict(zip(FEATURE_NAMES, map(str, row))), {}) for row in X.tolist()]
+    if fmt == 'float32':
+        return [('/api/predict_batch', X.astype('<f4').tobytes(),
+                 {'Content-Type': FLOAT32_MIMETYPE, 'Accept': FLOAT32_MIMETYPE})]
+    import msgpack
+
+    body = msgpack.packb({"data": X.astype('<f4').tobytes(), "dtype": '<f4'})
+    return [('/api/predict_batch', body,
+             {'Content-Type': 'application/msgpack', 'Accept': 'application/msgpack'})]
+
+
+def bench(client, fmt, X, min_seconds):
+    """Repeat the requests for at least min_seconds; returns (rows/sec, ms per batch)"""
+    batches = requests_for(fmt, X)
+    # Warm-up, so lazy imports (msgpack) are not timed
+    client.post(batches[0][0], data=batches[0][1], headers=batches[0][2])
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        for path, body, headers in batches:
+            response = client.post(path, data=body, headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)[:500]
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return calls * len(X) / elapsed, elapsed / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs form vs binary prediction requests")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 10_000, 100_000])
+    parser.add_argument('--formats', nargs='+', default=FORMATS, choices=FORMATS)
+    parser.add_argument('--min-seconds', type=float, default=1.0)
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    client = app.test_client()
+    results = []
+    for n in args.sizes:
+        X = random_rows(n)
+        for fmt in args.formats:
+            if fmt == 'form' and n > MAX_FORM_ROWS:
+                continue
+            rate, ms = bench(client, fmt, X, args.min_seconds)
+            results.append({"rows": n, "format": fmt, "rows_per_sec": round(rate), "ms_per_batch": round(ms, 3)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'rows':>8} {'format':<8} {'rows/sec':>12} {'ms/batch':>10}")
+    for r in results:
+        print(f"{r['rows']:>8} {r['format']:<8} {r['rows_per_sec']:>12,} {r['ms_per_batch']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Load-test the Iris serving endpoints and compare runs against a baseline.
+
+Two modes:
+    inprocess  drives the app through Flask's test client (no network)
+    socket     serves the app on a real socket (or targets --url) and hits
+               it from --concurrency threads with keep-alive connections
+
+Examples:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --modes socket --concurrency 16 --duration 10
+    python benchmarks/load_test.py --output run.json --save-baseline baseline.json
+    python benchmarks/load_test.py --baseline baseline.json --tolerance 0.15
+
+With --baseline the exit code is 1 when any endpoint's requests/sec drops,
+or its p99 latency rises, by more than the tolerance.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORM_BODY = urllib.parse.urlencode({
+    'sepal_length': '6.3', 'sepal_width': '3.3', 'petal_length': '6.0', 'petal_width': '2.5',
+})
+
+# name -> (method, path, body, headers)
+ENDPOINTS = {
+    'predict': ('POST', '/predict', FORM_BODY, {'Content-Type': 'application/x-www-form-urlencoded'}),
+    'api_test': ('GET', '/api/test', None, {}),
+    'api_accuracy': ('GET', '/api/accuracy', None, {}),
+    'health': ('GET', '/health', None, {}),
+}
+
+
+def summarize(latencies, errors, elapsed):
+    latencies_ms = np.asarray(latencies) * 1000
+    completed = len(latencies_ms)
+    if completed == 0:
+        return {"requests": 0, "errors": errors, "rps": 0.0}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "requests": completed,
+        "errors": errors,
+        "rps": round(completed / elapsed, 1),
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(latencies_ms.max()), 3),
+    }
+
+
+def run_inprocess(app, name, duration, warmup):
+    method, path, body, headers = ENDPOINTS[name]
+    client = app.test_client()
+
+    def call():
+        return client.open(path, method=method, data=body, headers=headers).status_code
+
+    for _ in range(warmup):
+        call()
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    deadline = started + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        status = call()
+        latencies.append(time.perf_counter() - t0)
+        errors += status >= 500
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_socket(host, port, name, duration, concurrency, warmup):
+    method, path, body, headers = ENDPOINTS[name]
+    per_thread = [([], [0]) for _ in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(latencies, errors):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+
+        def call():
+            nonlocal conn
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                return response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                return 599
+
+        for _ in range(warmup):
+            call()
+        barrier.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            status = call()
+            latencies.append(time.perf_counter() - t0)
+            errors[0] += status >= 500
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=args, daemon=True) for args in per_thread]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies = [value for thread_latencies, _ in per_thread for value in thread_latencies]
+    errors = sum(thread_errors[0] for _, thread_errors in per_thread)
+    return summarize(latencies, errors, elapsed)
+
+
+def start_local_server(app):
+    """Serve app on an ephemeral port from a background thread"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against a baseline run"""
+    regressions = []
+    for mode, endpoints in results["results"].items():
+        for name, current in endpoints.items():
+            previous = baseline.get("results", {}).get(mode, {}).get(name)
+            if not previous or not previous.get("requests") or not current.get("requests"):
+                continue
+            if current["rps"] < previous["rps"] * (1 - tolerance):
+                regressions.append(f"{mode}/{name}: {current['rps']} req/s vs baseline {previous['rps']}")
+            if current["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+                regressions.append(f"{mode}/{name}: p99 {current['p99_ms']} ms vs baseline {previous['p99_ms']}")
+    return regressions
+
+
+def print_table(results):
+    for mode, endpoints in results["results"].items():
+        print(f"\n[{mode}]")
+        print(f"{'endpoint':<14} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for name, stats in endpoints.items():
+            if not stats["requests"]:
+                print(f"{name:<14} {'no successful requests':>42}")
+                continue
+            print(f"{name:<14} {stats['rps']:>9.1f} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+                  f"{stats['p99_ms']:>8.2f} {stats['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Iris serving endpoints")
+    parser.add_argument('--modes', nargs='+', default=['inprocess', 'socket'], choices=['inprocess', 'socket'])
+    parser.add_argument('--endpoints', nargs='+', default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument('--duration', type=float, default=3.0, help="seconds per endpoint")
+    parser.add_argument('--concurrency', type=int, default=8, help="client threads in socket mode")
+    parser.add_argument('--warmup', type=int, default=20, help="untimed requests per client")
+    parser.add_argument('--url', help="target a running server instead of starting one (socket mode)")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--save-baseline', help="also write results to this baseline file")
+    parser.add_argument('--baseline', help="compare against this baseline JSON")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed relative regression")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    app = None
+    if 'inprocess' in args.modes or ('socket' in args.modes and not args.url):
+        os.chdir(PROJECT_DIR)
+        sys.path.insert(0, PROJECT_DIR)
+        from app import app
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "target": args.url or "local",
+        },
+        "results": {},
+    }
+
+    if 'inprocess' in args.modes:
+        results["results"]["inprocess"] = {
+            name: run_inprocess(app, name, args.duration, args.warmup) for name in args.endpoints
+        }
+
+    if 'socket' in args.modes:
+        server = None
+        if args.url:
+            target = urllib.parse.urlsplit(args.url)
+            host, port = target.hostname, target.port or 80
+        else:
+            server = start_local_server(app)
+            host, port = '127.0.0.1', server.server_port
+        try:
+            results["results"]["socket"] = {
+                name: run_socket(host, port, name, args.duration, args.concurrency, args.warmup)
+                for name in args.endpoints
+            }
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Compare per-worker memory (RSS/PSS) across model serving modes.
+
+For each mode a fresh process forks N workers the way a prefork server
+does, lets each worker serve a few requests, then reads
+/proc/<pid>/smaps_rollup for every worker (Linux only).
+
+    python benchmarks/measure_worker_memory.py --workers 4
+
+Modes:
+    per-worker     each worker imports app.py and unpickles model.pkl (old behaviour)
+    preload        the master loads model.pkl once, then forks (gunicorn preload_app)
+    mmap           each worker memory-maps model_arrays.joblib (no sklearn import)
+    preload+mmap   the master memory-maps the array artifact, then forks
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'per-worker': {'preload': False, 'serving_mode': 'pickle'},
+    'preload': {'preload': True, 'serving_mode': 'pickle'},
+    'mmap': {'preload': False, 'serving_mode': 'mmap'},
+    'preload+mmap': {'preload': True, 'serving_mode': 'mmap'},
+}
+
+
+def smaps_rollup(pid):
+    """RSS, PSS, shared and private memory of a process, in KiB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def import_app(serving_mode):
+    os.environ['IRIS_SERVING_MODE'] = serving_mode
+    os.environ['IRIS_MODEL_PRELOAD'] = '1'
+    sys.path.insert(0, PROJECT_DIR)
+    os.chdir(PROJECT_DIR)
+    import app
+    return app
+
+
+def exercise(app_module):
+    client = app_module.app.test_client()
+    for _ in range(20):
+        client.get('/api/test')
+        client.post('/api/predict_batch', json=[[5.1, 3.5, 1.4, 0.2], [6.3, 3.3, 6.0, 2.5]])
+
+
+def run_mode(mode, workers):
+    """Runs in its own process: fork workers, measure them, print JSON"""
+    config = MODES[mode]
+    app_module = None
+    if config['preload']:
+        gc.disable()
+        app_module = import_app(config['serving_mode'])
+        gc.freeze()
+
+    ready_r, ready_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            gc.enable()
+            worker_app = app_module or import_app(config['serving_mode'])
+            exercise(worker_app)
+            os.write(ready_w, b'.')
+            time.sleep(3600)
+            os._exit(0)
+        pids.append(pid)
+
+    os.close(ready_w)
+    ready = 0
+    while ready < workers:
+        chunk = os.read(ready_r, workers)
+        if not chunk:
+            break
+        ready += len(chunk)
+
+    result = {
+        'mode': mode,
+        'master': smaps_rollup(os.getpid()),
+        'workers': [smaps_rollup(pid) for pid in pids],
+    }
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+    print('RESULT=' + json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--json', action='store_true', help="print raw results as JSON")
+    parser.add_argument('--run-mode', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.run_mode, args.workers)
+        return
+
+    if not os.path.exists(os.path.join(PROJECT_DIR, 'model_arrays.joblib')):
+        sys.exit("model_arrays.joblib not found, run main.py first")
+
+    results = []
+    for mode in args.modes:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-mode', mode,
+                                 '--workers', str(args.workers)],
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.split('RESULT=', 1)[1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Per-worker memory with {args.workers} workers (MiB, mean over workers)\n")
+    print(f"{'mode':<14} {'RSS':>8} {'PSS':>8} {'shared':>8} {'private':>8} {'total PSS':>10}")
+    for result in results:
+        workers = result['workers']
+        mean = {key: sum(w[key] for w in workers) / len(workers) / 1024 for key in workers[0]}
+        total_pss = (sum(w['pss'] for w in workers) + result['master']['pss']) / 1024
+        print(f"{result['mode']:<14} {mean['rss']:>8.1f} {mean['pss']:>8.1f} "
+              f"{mean['shared']:>8.1f} {mean['private']:>8.1f} {total_pss:>10.1f}")
+    print("\ntotal PSS includes the master process")
+
+
+if __name__ == '__main__':
+    main()
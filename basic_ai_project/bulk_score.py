@@ -0,0 +1,230 @@
+"""Offline bulk scoring: ``python main.py score`` for CSV and NPY files.
+
+Each input is cut into chunks that a process pool scores in parallel.
+Workers load the model once, then read their own slice of the input: a
+byte range of a CSV file, or a row range of a memory-mapped NPY file.
+Each chunk's results are spooled to a file next to the output, and the
+parent appends the spool files in chunk order, so neither features nor
+predictions are pickled through the pool's pipes.
+
+    python main.py score measurements.csv
+    python main.py score big.npy --workers 8 --output big_predictions.csv
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from features import FEATURE_NAMES, csv_feature_order, is_csv_header, parse_csv_block, validate_feature_ranges
+from model_store import load_snapshot
+
+# ~400k rows of a typical Iris CSV per chunk
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+DEFAULT_CHUNK_ROWS = 256 * 1024
+
+OUTPUT_HEADER = b'prediction,confidence,error\n'
+
+# Per-worker state, set up once by _init_worker
+_snapshot = None
+_check_ranges = True
+_arrays = {}
+
+
+def _init_worker(model_path, target_names_path, fast_tree, check_ranges):
+    global _snapshot, _check_ranges
+    # Forked workers inherit the parent's snapshot; spawned ones load their own
+    if _snapshot is None:
+        _snapshot = load_snapshot(model_path, target_names_path, fast_tree=fast_tree)
+    _check_ranges = check_ranges
+
+
+def _score_matrix(X, errors):
+    """Predict the rows of X that parsed and pass validation; returns (csv text, error count)"""
+    finite = np.isfinite(X).all(axis=1)
+    if _check_ranges:
+        valid, range_errors = validate_feature_ranges(X)
+        for i, messages in range_errors.items():
+            errors.setdefault(i, messages)
+    else:
+        valid = finite
+        for i in np.flatnonzero(~finite):
+            errors.setdefault(int(i), ["Missing or non-numeric value"])
+
+    lines = np.empty(len(X), dtype=object)
+    if valid.any():
+        engine = _snapshot.engine
+        probabilities = engine.predict_proba(X[valid])
+        labels = _snapshot.target_names[engine.classes_]
+        confidence, confidence_index = np.unique(probabilities.max(axis=1) * 100, return_inverse=True)
+        # A tree has only a few distinct outcomes, so format each one once rather than per row
+        outcomes, outcome_index = np.unique(
+            probabilities.argmax(axis=1) * len(confidence) + confidence_index.ravel(), return_inverse=True)
+        text = np.array([f"{labels[o // len(confidence)]},{confidence[o % len(confidence)]:.2f},\n"
+                         for o in outcomes], dtype=object)
+        lines[valid] = text[outcome_index.ravel()]
+
+    for i, messages in errors.items():
+        message = '; '.join(messages).replace('"', '""')
+        lines[i] = f',,"{message}"\n'
+    return ''.join(lines.tolist()), len(errors)
+
+
+def _spool(spool_path, text, n_errors, n_rows):
+    with open(spool_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    return spool_path, n_errors, n_rows
+
+
+def _score_csv_chunk(task):
+    spool_path, path, start, stop, order = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(stop - start).decode('utf-8', errors='replace')
+    X, errors = parse_csv_block(text, order)
+    return _spool(spool_path, *_score_matrix(X, errors), len(X))
+
+
+def _score_npy_chunk(task):
+    spool_path, path, start, stop = task
+    array = _arrays.get(path)
+    if array is None:
+        array = _arrays[path] = np.load(path, mmap_mode='r')
+    X = np.asarray(array[start:stop], dtype=float)
+    return _spool(spool_path, *_score_matrix(X, {}), len(X))
+
+
+def csv_chunks(path, chunk_bytes):
+    """Tasks covering the data rows of a CSV file in newline-aligned byte ranges"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        first_row = f.readline().decode('utf-8', errors='replace').split(',')
+        order = None
+        start = 0
+        if is_csv_header(first_row):
+            order = csv_feature_order(first_row)
+            start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            stop = min(f.tell(), size)
+            yield path, start, stop, order
+            start = stop
+
+
+def npy_chunks(path, chunk_rows):
+    array = np.load(path, mmap_mode='r')
+    if array.ndim != 2 or array.shape[1] != len(FEATURE_NAMES):
+        raise ValueError(f"{path} has shape {array.shape}, expected (n, {len(FEATURE_NAMES)})")
+    for start in range(0, len(array), chunk_rows):
+        yield path, start, min(start + chunk_rows, len(array))
+
+
+def default_output(path):
+    return os.path.splitext(path)[0] + '_predictions.csv'
+
+
+def check_outputs(inputs, outputs):
+    """Refuse a run in which one output would overwrite another output or an input.
+
+    in.csv and in.npy both default to in_predictions.csv, and the second
+    would silently replace the first.
+    """
+    seen = {}
+    input_paths = {os.path.realpath(path) for path in inputs}
+    for path, output in zip(inputs, outputs):
+        real = os.path.realpath(output)
+        if real in input_paths:
+            raise SystemExit(f"Output {output} for {path} would overwrite an input file")
+        if real in seen:
+            raise SystemExit(f"{seen[real]} and {path} would both be written to {output}; "
+                             f"score them in separate runs with --output")
+        seen[real] = path
+
+
+def score_file(path, output, imap, chunk_bytes, chunk_rows):
+    """Score one input into output; returns (rows, errors, seconds)"""
+    started = time.perf_counter()
+    spool_dir = tempfile.mkdtemp(prefix='.scoring-', dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        if path.endswith('.npy'):
+            chunks, score_chunk = npy_chunks(path, chunk_rows), _score_npy_chunk
+        else:
+            chunks, score_chunk = csv_chunks(path, chunk_bytes), _score_csv_chunk
+        tasks = ((os.path.join(spool_dir, f'{i:08d}.csv'), *chunk) for i, chunk in enumerate(chunks))
+
+        total_rows = total_errors = 0
+        with open(output, 'wb') as out:
+            out.write(OUTPUT_HEADER)
+            # imap yields in task order, so chunks are appended in input order
+            for spool_path, n_errors, n_rows in imap(score_chunk, tasks):
+                with open(spool_path, 'rb') as part:
+                    shutil.copyfileobj(part, out, 1024 * 1024)
+                os.remove(spool_path)
+                total_rows += n_rows
+                total_errors += n_errors
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+    return total_rows, total_errors, time.perf_counter() - started
+
+
+def add_arguments(parser):
+    parser.add_argument('inputs', nargs='+', help="CSV or .npy files of the four measurements")
+    parser.add_argument('--output', help="output CSV (single input only; default <input>_predictions.csv)")
+    parser.add_argument('--model', default='model.pkl', help="pickled model to score with")
+    parser.add_argument('--target-names', default='target_names.pkl')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--chunk-bytes', type=int, default=DEFAULT_CHUNK_BYTES, help="CSV bytes per chunk")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="NPY rows per chunk")
+    parser.add_argument('--no-range-check', action='store_true',
+                        help="score every numeric row, even outside the web form's ranges")
+    parser.add_argument('--no-fast-tree', action='store_true', help="predict with sklearn instead")
+
+
+def run(args):
+    if args.output and len(args.inputs) > 1:
+        raise SystemExit("--output can only be used with a single input file")
+    missing = [path for path in args.inputs if not os.path.isfile(path)]
+    if missing:
+        raise SystemExit(f"Input file(s) not found: {', '.join(missing)}")
+    outputs = [args.output or default_output(path) for path in args.inputs]
+    check_outputs(args.inputs, outputs)
+    init_args = (args.model, args.target_names, not args.no_fast_tree, not args.no_range_check)
+
+    # Load in the parent first: a bad model path fails before any worker starts
+    _init_worker(*init_args)
+    pool = None
+    imap = map
+    if args.workers > 1:
+        pool = multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=init_args)
+        imap = pool.imap
+
+    grand_rows = 0
+    grand_started = time.perf_counter()
+    try:
+        for path, output in zip(args.inputs, outputs):
+            rows, errors, seconds = score_file(path, output, imap, args.chunk_bytes, args.chunk_rows)
+            grand_rows += rows
+            print(f"✅ {path}: {rows:,} rows in {seconds:.2f}s "
+                  f"({rows / max(seconds, 1e-9):,.0f} rows/s, {errors:,} errors) -> {output}")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - grand_started
+    print(f"📊 {grand_rows:,} rows with {args.workers} worker(s) in {elapsed:.2f}s: "
+          f"{grand_rows / max(elapsed, 1e-9):,.0f} rows/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-score CSV/NPY files with the trained model")
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
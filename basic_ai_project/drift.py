@@ -0,0 +1,243 @@
+"""Streaming feature-drift monitor over fixed-bin histograms.
+
+main.py writes ``drift_baseline.json``: for each feature, counts of the
+training rows in equal-width bins across FEATURE_RANGES, plus one
+underflow and one overflow bin. The app counts live inputs into the same
+bins and scores each feature with the population stability index (PSI)
+against the baseline.
+
+Memory does not depend on the request count. The monitor keeps two
+count tables: the window being filled and the last full one. Scores cover
+both, so they always reflect the most recent window_rows to
+2 * window_rows inputs. Recording a row costs four bin lookups and
+increments under a lock.
+"""
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from features import FEATURE_NAMES, FEATURE_RANGES
+
+DRIFT_BASELINE_PATH = 'drift_baseline.json'
+DEFAULT_BINS = 20
+
+# Common PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant shift
+PSI_MODERATE = 0.1
+PSI_DRIFTED = 0.25
+
+# Floor for empty bins, so PSI stays finite
+_EPSILON = 1e-4
+
+
+def bin_indices(X, ranges, bins):
+    """Histogram column per value: 0 underflow, 1..bins in range, bins + 1 overflow"""
+    X = np.asarray(X, dtype=float)
+    low, high = ranges[:, 0], ranges[:, 1]
+    index = np.floor((X - low) / (high - low) * bins).astype(np.intp) + 1
+    # The top edge belongs to the last bin, not to overflow
+    index = np.where(X == high, bins, index)
+    return np.clip(index, 0, bins + 1)
+
+
+def histogram(X, ranges=FEATURE_RANGES, bins=DEFAULT_BINS):
+    """(n_features, bins + 2) counts of the finite rows of X"""
+    X = np.asarray(X, dtype=float).reshape(-1, len(ranges))
+    X = X[np.isfinite(X).all(axis=1)]
+    counts = np.zeros((len(ranges), bins + 2), dtype=np.int64)
+    for feature, column in enumerate(bin_indices(X, ranges, bins).T):
+        counts[feature] = np.bincount(column, minlength=bins + 2)
+    return counts
+
+
+def save_baseline(X, path=DRIFT_BASELINE_PATH, bins=DEFAULT_BINS):
+    """Write the training distribution that live inputs are compared to"""
+    X = np.asarray(X, dtype=float)
+    baseline = {
+        "features": FEATURE_NAMES,
+        "ranges": FEATURE_RANGES.tolist(),
+        "bins": bins,
+        "rows": len(X),
+        "mean": X.mean(axis=0).round(6).tolist(),
+        "counts": histogram(X, FEATURE_RANGES, bins).tolist(),
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f)
+
+
+def load_baseline(path=DRIFT_BASELINE_PATH):
+    with open(path) as f:
+        baseline = json.load(f)
+    missing = {"features", "ranges", "bins", "rows", "mean", "counts"} - baseline.keys()
+    if missing:
+        raise ValueError(f"{path} is missing {sorted(missing)}")
+    if baseline["features"] != FEATURE_NAMES:
+        raise ValueError(f"{path} describes features {baseline['features']}, expected {FEATURE_NAMES}")
+    return baseline
+
+
+def psi(expected, actual):
+    """Population stability index between two count vectors"""
+    p = np.maximum(np.asarray(actual, dtype=float) / max(sum(actual), 1), _EPSILON)
+    q = np.maximum(np.asarray(expected, dtype=float) / max(sum(expected), 1), _EPSILON)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+class DriftMonitor:
+    def __init__(self, baseline_path=DRIFT_BASELINE_PATH, window_rows=10000, min_rows=100):
+        self.baseline_path = baseline_path
+        self.window_rows = window_rows
+        self.min_rows = min_rows
+        self._baseline_mtime = None
+        self._load_baseline()
+        self._reset()
+        # The lock may be held at fork time; each worker process counts its own inputs
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _load_baseline(self):
+        mtime = os.stat(self.baseline_path).st_mtime_ns
+        self.baseline = load_baseline(self.baseline_path)
+        self._baseline_mtime = mtime
+        self._ranges = np.asarray(self.baseline["ranges"], dtype=float)
+        self._bins = self.baseline["bins"]
+        self._baseline_counts = np.asarray(self.baseline["counts"], dtype=np.int64)
+        # Plain floats for the single-row path, which avoids NumPy call overhead
+        self._low = self._ranges[:, 0].tolist()
+        self._high = self._ranges[:, 1].tolist()
+        self._width = (self._ranges[:, 1] - self._ranges[:, 0]).tolist()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        # The window being filled is a flat Python list, indexed feature * (bins + 2) + column:
+        # incrementing list items is several times cheaper than NumPy scalar indexing
+        self._current = [0] * (len(FEATURE_NAMES) * (self._bins + 2))
+        self._current_sums = [0.0] * len(FEATURE_NAMES)
+        self._current_rows = 0
+        self._previous = np.zeros((len(FEATURE_NAMES), self._bins + 2), dtype=np.int64)
+        self._previous_sums = np.zeros(len(FEATURE_NAMES))
+        self._previous_rows = 0
+        self.observed = 0
+        self.windows = 0
+
+    def _rotate(self):
+        self._previous = np.array(self._current, dtype=np.int64).reshape(self._previous.shape)
+        self._previous_sums = np.array(self._current_sums)
+        self._previous_rows = self._current_rows
+        self._current = [0] * len(self._current)
+        self._current_sums = [0.0] * len(self._current_sums)
+        self._current_rows = 0
+        self.windows += 1
+
+    def observe_one(self, features):
+        """Count one input row (four floats); non-finite rows are ignored"""
+        bins = self._bins
+        stride = bins + 2
+        slots = []
+        for feature, (value, low, high, width) in enumerate(
+                zip(features, self._low, self._high, self._width)):
+            if not math.isfinite(value):
+                return
+            if value < low:
+                column = 0
+            elif value >= high:
+                column = bins if value == high else bins + 1
+            else:
+                # Same arithmetic as bin_indices, so values on a bin edge land where the baseline's did
+                column = int((value - low) / width * bins) + 1
+            slots.append(feature * stride + column)
+        with self._lock:
+            if bins != self._bins:
+                return  # the baseline's bins changed under us; drop this row
+            if self._current_rows >= self.window_rows:
+                self._rotate()
+            current, sums = self._current, self._current_sums
+            for feature, slot in enumerate(slots):
+                current[slot] += 1
+                sums[feature] += features[feature]
+            self._current_rows += 1
+            self.observed += 1
+
+    def observe(self, X):
+        """Count the finite rows of an (n, 4) matrix"""
+        X = np.asarray(X, dtype=float)
+        X = X[np.isfinite(X).all(axis=1)]
+        if not len(X):
+            return
+        bins = self._bins
+        counts = histogram(X, self._ranges, bins).ravel().tolist()
+        column_sums = X.sum(axis=0).tolist()
+        with self._lock:
+            if bins != self._bins:
+                return
+            # A batch lands in a single window, so a window may overshoot window_rows by one batch
+            if self._current_rows >= self.window_rows:
+                self._rotate()
+            self._current = [a + b for a, b in zip(self._current, counts)]
+            self._current_sums = [a + b for a, b in zip(self._current_sums, column_sums)]
+            self._current_rows += len(X)
+            self.observed += len(X)
+
+    def _refresh_baseline(self):
+        """Pick up a baseline rewritten by main.py; live counts restart if the bins changed"""
+        try:
+            mtime = os.stat(self.baseline_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._baseline_mtime:
+            with self._lock:
+                bins, ranges = self._bins, self._ranges
+                try:
+                    self._load_baseline()
+                except (OSError, ValueError, KeyError) as e:
+                    # Keep scoring against the old baseline rather than failing every report
+                    print(f"⚠️ Could not reload {self.baseline_path}: {e}")
+                    self._baseline_mtime = mtime
+                    return
+                if self._bins != bins or not np.array_equal(self._ranges, ranges):
+                    self._clear()
+
+    def report(self, histograms=False):
+        """Per-feature PSI of recent inputs against the training baseline"""
+        self._refresh_baseline()
+        with self._lock:
+            live = np.array(self._current, dtype=np.int64).reshape(self._previous.shape) + self._previous
+            rows = self._current_rows + self._previous_rows
+            sums = np.array(self._current_sums) + self._previous_sums
+            observed, windows = self.observed, self.windows
+            baseline_counts = self._baseline_counts
+
+        features = {}
+        for i, name in enumerate(FEATURE_NAMES):
+            entry = {"baseline_mean": self.baseline["mean"][i]}
+            if rows >= self.min_rows:
+                score = psi(baseline_counts[i], live[i])
+                entry["psi"] = round(score, 4)
+                entry["status"] = ('drifted' if score > PSI_DRIFTED else
+                                   'moderate' if score > PSI_MODERATE else 'stable')
+                entry["out_of_range_fraction"] = round(float(live[i, 0] + live[i, -1]) / rows, 4)
+            if rows:
+                entry["live_mean"] = round(float(sums[i] / rows), 4)
+            if histograms:
+                entry["baseline_counts"] = baseline_counts[i].tolist()
+                entry["live_counts"] = live[i].tolist()
+            features[name] = entry
+
+        scores = [entry["psi"] for entry in features.values() if "psi" in entry]
+        return {
+            "baseline_rows": self.baseline["rows"],
+            "bins": self._bins,
+            "window_rows": self.window_rows,
+            "scored_rows": int(rows),
+            "observed_rows": observed,
+            "completed_windows": windows,
+            "status": ('insufficient_data' if not scores else
+                       'drifted' if max(scores) > PSI_DRIFTED else
+                       'moderate' if max(scores) > PSI_MODERATE else 'stable'),
+            "max_psi": round(max(scores), 4) if scores else None,
+            "features": features,
+        }
@@ -0,0 +1,90 @@
+"""Evaluation report for the trained model, cached per model artifact.
+
+The report is computed once for a given model file (identified by its
+mtime, size and content hash) and reused until the artifact changes.
+sklearn's dataset and metrics modules are only imported when a report is
+actually computed, so they stay off the app's startup path.
+"""
+import collections
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+# Must match the split used by main.py
+TEST_SIZE = 0.3
+RANDOM_STATE = 42
+
+
+def model_fingerprint(path):
+    """Identify a model artifact by (mtime_ns, size, sha256)"""
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return stat.st_mtime_ns, stat.st_size, digest.hexdigest()
+
+
+def model_type_name(model):
+    """'DecisionTreeClassifier' -> 'Decision Tree Classifier'"""
+    if hasattr(model, 'model_type'):
+        return model.model_type
+    return re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', type(model).__name__)
+
+
+def evaluate_model(model, target_names):
+    """Accuracy, confusion matrix and per-class precision/recall on the held-out split"""
+    from sklearn.datasets import load_iris
+    from sklearn.metrics import accuracy_score, confusion_matrix, precision_recall_fscore_support
+    from sklearn.model_selection import train_test_split
+
+    iris = load_iris()
+    _, X_test, _, y_test = train_test_split(iris.data, iris.target,
+                                            test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    y_pred = model.predict(X_test)
+    labels = np.arange(len(target_names))
+    precision, recall, f1, support = precision_recall_fscore_support(
+        y_test, y_pred, labels=labels, zero_division=0)
+
+    return {
+        "accuracy": round(accuracy_score(y_test, y_pred) * 100, 2),
+        "test_samples": int(len(X_test)),
+        "correct_predictions": int(np.sum(y_pred == y_test)),
+        "model_type": model_type_name(model),
+        "classes": [str(name) for name in target_names],
+        "confusion_matrix": confusion_matrix(y_test, y_pred, labels=labels).tolist(),
+        "per_class": {
+            str(name): {
+                "precision": round(float(precision[i]), 4),
+                "recall": round(float(recall[i]), 4),
+                "f1": round(float(f1[i]), 4),
+                "support": int(support[i]),
+            }
+            for i, name in enumerate(target_names)
+        },
+    }
+
+
+class EvaluationCache:
+    """Reports for recently loaded model artifacts, keyed by fingerprint"""
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._reports = collections.OrderedDict()
+
+    def get(self, model, target_names, fingerprint):
+        """Return (report, etag), computing the report only for an unseen artifact"""
+        with self._lock:
+            report = self._reports.get(fingerprint)
+            if report is None:
+                report = evaluate_model(model, target_names)
+                self._reports[fingerprint] = report
+                while len(self._reports) > self.max_entries:
+                    self._reports.popitem(last=False)
+            else:
+                self._reports.move_to_end(fingerprint)
+            return report, fingerprint[2][:32]
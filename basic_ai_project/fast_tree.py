@@ -0,0 +1,289 @@
+"""Fast-path inference for a fitted DecisionTreeClassifier.
+
+The sklearn ``tree_`` is flattened into compact NumPy arrays once, so
+predictions skip sklearn's per-call input validation entirely. Single
+rows walk plain Python lists. Batches evaluate every split at once and
+pick each row's leaf with a small matrix product; trees too large for
+that walk level by level with vectorized indexing instead.
+
+The flattened arrays can also be saved as an uncompressed joblib
+artifact and loaded with ``mmap_mode='r'``, so prefork workers share the
+model's pages instead of each unpickling a private copy, or as a compact
+binary artifact (a JSON header followed by raw arrays) that loads with
+nothing but NumPy: no sklearn, joblib or pickle.
+"""
+import json
+import re
+import struct
+import zlib
+
+import numpy as np
+
+TREE_LEAF = -1
+
+ARRAY_ARTIFACT_FORMAT = 'iris-tree-arrays'
+ARRAY_ARTIFACT_VERSION = 1
+
+# Binary artifact layout: magic, uint32 header length, JSON header, then
+# each array's raw little-endian bytes at a 64-byte aligned offset
+BINARY_MAGIC = b'IRISTREE'
+BINARY_VERSION = 1
+BINARY_ALIGN = 64
+
+# Above this many split nodes the leaf-matching matrix gets too big
+GEMM_MAX_SPLITS = 256
+
+
+def _float32_thresholds(threshold):
+    """Largest float32 <= each threshold, so float32 compares match sklearn exactly"""
+    t32 = threshold.astype(np.float32)
+    too_big = t32.astype(np.float64) > threshold
+    t32[too_big] = np.nextafter(t32[too_big], np.float32(-np.inf))
+    return t32
+
+
+class CompiledTree:
+    def __init__(self, feature, threshold, children_left, children_right, proba, classes,
+                 model_type='Decision Tree Classifier'):
+        self.model_type = model_type
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.children_left = np.asarray(children_left, dtype=np.int32)
+        self.children_right = np.asarray(children_right, dtype=np.int32)
+        self.proba = np.asarray(proba, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+
+        # Python lists are much faster than NumPy scalars for one-row traversal
+        self._feature = self.feature.tolist()
+        self._threshold = self.threshold.tolist()
+        self._left = self.children_left.tolist()
+        self._right = self.children_right.tolist()
+
+        is_leaf = self.children_left == TREE_LEAF
+        self._splits = np.flatnonzero(~is_leaf)
+        self._leaves = np.flatnonzero(is_leaf)
+        self._split_feature = self.feature[self._splits].astype(np.intp)
+        self._split_threshold = _float32_thresholds(self.threshold[self._splits])
+        self._leaf_paths = None
+        if len(self._splits) <= GEMM_MAX_SPLITS:
+            self._build_leaf_matrix()
+        else:
+            self._build_level_tables(is_leaf)
+
+    def _build_leaf_matrix(self):
+        """Encode each leaf's root path as +1 (went left) / -1 (went right) per split.
+
+        With D[i, s] = 1 when row i goes left at split s, (D @ paths)[i, l]
+        equals the number of left turns on leaf l's path only for the one
+        leaf that row i lands in.
+        """
+        column = {int(node): j for j, node in enumerate(self._splits)}
+        leaf_number = {int(node): j for j, node in enumerate(self._leaves)}
+        self._leaf_paths = np.zeros((len(self._splits), len(self._leaves)), dtype=np.float32)
+        self._leaf_left_turns = np.zeros(len(self._leaves), dtype=np.float32)
+        self._leaf_ids = self._leaves.astype(np.float32)
+        stack = [(0, [])]
+        while stack:
+            node, path = stack.pop()
+            if self._left[node] == TREE_LEAF:
+                j = leaf_number[node]
+                for split, went_left in path:
+                    self._leaf_paths[column[split], j] = 1.0 if went_left else -1.0
+                    self._leaf_left_turns[j] += went_left
+                continue
+            stack.append((self._left[node], path + [(node, True)]))
+            stack.append((self._right[node], path + [(node, False)]))
+
+    def _build_level_tables(self, is_leaf):
+        # Leaves loop back to themselves, so every row can take max_depth steps
+        nodes = np.arange(len(self.feature), dtype=np.intp)
+        self._step_feature = np.where(is_leaf, 0, self.feature).astype(np.intp)
+        self._step_threshold = np.where(is_leaf, np.inf, _float32_thresholds(self.threshold))
+        self._step_children = np.stack([
+            np.where(is_leaf, nodes, self.children_right),
+            np.where(is_leaf, nodes, self.children_left),
+        ], axis=1).astype(np.intp).ravel()
+        self._max_depth = self._depth()
+
+    def _depth(self):
+        depth = 0
+        frontier = [0]
+        while True:
+            frontier = [child for node in frontier if self._left[node] != TREE_LEAF
+                        for child in (self._left[node], self._right[node])]
+            if not frontier:
+                return depth
+            depth += 1
+
+    @classmethod
+    def from_estimator(cls, clf):
+        """Flatten a fitted DecisionTreeClassifier"""
+        tree = getattr(clf, 'tree_', None)
+        if tree is None or getattr(tree, 'n_outputs', 1) != 1:
+            raise TypeError(f"Cannot compile {type(clf).__name__}: expected a single-output decision tree")
+        value = tree.value[:, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        model_type = re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', type(clf).__name__)
+        return cls(tree.feature, tree.threshold, tree.children_left, tree.children_right,
+                   value / totals, clf.classes_, model_type=model_type)
+
+    @classmethod
+    def load(cls, path='model.pkl'):
+        """Load a pickled DecisionTreeClassifier and compile it"""
+        import joblib
+        return cls.from_estimator(joblib.load(path))
+
+    def to_arrays(self):
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children_left": self.children_left,
+            "children_right": self.children_right,
+            "proba": self.proba,
+            "classes": self.classes_,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, model_type='Decision Tree Classifier'):
+        return cls(arrays['feature'], arrays['threshold'], arrays['children_left'],
+                   arrays['children_right'], arrays['proba'], arrays['classes'],
+                   model_type=model_type)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def _leaf_one(self, row):
+        # sklearn compares float32 inputs against float64 thresholds
+        row = np.asarray(row, dtype=np.float32).tolist()
+        feature, threshold, left, right = self._feature, self._threshold, self._left, self._right
+        node = 0
+        while left[node] != TREE_LEAF:
+            if row[feature[node]] <= threshold[node]:
+                node = left[node]
+            else:
+                node = right[node]
+        return node
+
+    def predict_proba_one(self, row):
+        """Class probabilities for a single feature row"""
+        return self.proba[self._leaf_one(row)]
+
+    def predict_one(self, row):
+        """Class label for a single feature row"""
+        return self.classes_[self.proba[self._leaf_one(row)].argmax()]
+
+    def apply(self, X):
+        """Leaf index for every row of X"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if not len(self._splits):
+            return np.zeros(len(X), dtype=np.intp)
+        if self._leaf_paths is not None:
+            went_left = (X[:, self._split_feature] <= self._split_threshold).astype(np.float32)
+            matches = (went_left @ self._leaf_paths) == self._leaf_left_turns
+            return (matches.astype(np.float32) @ self._leaf_ids).astype(np.intp)
+
+        flat = X.ravel()
+        offsets = np.arange(len(X)) * X.shape[1]
+        node = np.zeros(len(X), dtype=np.intp)
+        for _ in range(self._max_depth):
+            went_left = flat[offsets + self._step_feature[node]] <= self._step_threshold[node]
+            node = self._step_children[2 * node + went_left]
+        return node
+
+    def predict_proba(self, X):
+        return self.proba[self.apply(X)]
+
+    def predict(self, X):
+        return self.classes_[self.proba[self.apply(X)].argmax(axis=1)]
+
+
+def save_array_artifact(tree, target_names, path):
+    """Write the flattened tree uncompressed, so it can be memory-mapped on load"""
+    import joblib
+    joblib.dump({
+        "format": ARRAY_ARTIFACT_FORMAT,
+        "version": ARRAY_ARTIFACT_VERSION,
+        "model_type": tree.model_type,
+        "arrays": tree.to_arrays(),
+        "target_names": np.asarray(target_names),
+    }, path)
+
+
+def load_array_artifact(path, mmap_mode='r'):
+    """Load (CompiledTree, target_names); arrays stay memory-mapped when mmap_mode is set"""
+    import joblib
+    artifact = joblib.load(path, mmap_mode=mmap_mode)
+    if not isinstance(artifact, dict) or artifact.get("format") != ARRAY_ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a tree array artifact")
+    if artifact["version"] > ARRAY_ARTIFACT_VERSION:
+        raise ValueError(f"{path} has artifact version {artifact['version']}, "
+                         f"this loader supports up to {ARRAY_ARTIFACT_VERSION}")
+    tree = CompiledTree.from_arrays(artifact["arrays"], model_type=artifact["model_type"])
+    return tree, np.asarray(artifact["target_names"])
+
+
+def _aligned(offset):
+    return -(-offset // BINARY_ALIGN) * BINARY_ALIGN
+
+
+def save_binary_artifact(tree, target_names, path):
+    """Write the flattened tree as a versioned header plus raw arrays; returns the size in bytes"""
+    arrays = {name: np.ascontiguousarray(value) for name, value in tree.to_arrays().items()}
+    if arrays["classes"].dtype.kind not in 'biu':
+        raise TypeError(f"Binary artifacts need integer class labels, got {arrays['classes'].dtype}")
+
+    specs, chunks, offset = {}, [], 0
+    for name, array in arrays.items():
+        array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+        padding = _aligned(offset) - offset
+        chunks.append(b'\0' * padding + array.tobytes())
+        offset += padding
+        specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    data = b''.join(chunks)
+
+    header = json.dumps({
+        "version": BINARY_VERSION,
+        "model_type": tree.model_type,
+        "target_names": [str(name) for name in target_names],
+        "arrays": specs,
+        "data_bytes": len(data),
+        "crc32": zlib.crc32(data),
+    }, separators=(',', ':')).encode()
+    prefix = BINARY_MAGIC + struct.pack('<I', len(header)) + header
+    prefix += b'\0' * (_aligned(len(prefix)) - len(prefix))
+    with open(path, 'wb') as f:
+        f.write(prefix)
+        f.write(data)
+    return len(prefix) + len(data)
+
+
+def load_binary_artifact(path):
+    """Load (CompiledTree, target_names) from a binary artifact using only NumPy"""
+    with open(path, 'rb') as f:
+        blob = f.read()
+    if blob[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError(f"{path} is not a binary tree artifact")
+    (header_length,) = struct.unpack_from('<I', blob, len(BINARY_MAGIC))
+    header_start = len(BINARY_MAGIC) + 4
+    if len(blob) < header_start + header_length:
+        raise ValueError(f"{path} is truncated or corrupt")
+    header = json.loads(blob[header_start:header_start + header_length])
+    if header["version"] > BINARY_VERSION:
+        raise ValueError(f"{path} has binary artifact version {header['version']}, "
+                         f"this loader supports up to {BINARY_VERSION}")
+
+    data = memoryview(blob)[_aligned(header_start + header_length):]
+    if len(data) != header["data_bytes"] or zlib.crc32(data) != header["crc32"]:
+        raise ValueError(f"{path} is truncated or corrupt")
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        count = int(np.prod(spec["shape"]))
+        arrays[name] = np.frombuffer(data, dtype=spec["dtype"], count=count,
+                                     offset=spec["offset"]).reshape(spec["shape"])
+    tree = CompiledTree.from_arrays(arrays, model_type=header["model_type"])
+    return tree, np.asarray(header["target_names"])
@@ -0,0 +1,151 @@
+"""The four Iris measurements: schema, parsing and range validation.
+
+Shared by the web app and offline scoring, so it imports nothing heavier
+than NumPy.
+"""
+import io
+import itertools
+
+import numpy as np
+
+FEATURE_NAMES = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+
+# Accepted (min, max) range per feature, in the same order as FEATURE_NAMES
+FEATURE_RANGES = np.array([
+    [4.0, 8.0],
+    [2.0, 4.5],
+    [1.0, 7.0],
+    [0.1, 2.5],
+])
+
+
+# np.asarray(..., dtype=float) would quietly read JSON null as NaN and true as 1.0
+_NOT_NUMBERS = frozenset((type(None), bool))
+
+
+def _to_float(value):
+    if value is None:
+        raise ValueError("Missing value")
+    if isinstance(value, bool):
+        raise TypeError(f"Expected a number, got {str(value).lower()}")
+    return float(value)
+
+
+def parse_feature_rows(rows):
+    """Convert rows (lists or dicts) into an (N, 4) float matrix.
+
+    Malformed rows are left as NaN and reported in the returned dict,
+    keyed by row index.
+    """
+    try:
+        X = np.asarray(rows, dtype=float)
+        if (X.ndim == 2 and X.shape[1] == len(FEATURE_NAMES)
+                and (isinstance(rows, np.ndarray)
+                     or _NOT_NUMBERS.isdisjoint(map(type, itertools.chain.from_iterable(rows))))):
+            return X, {}
+    except (TypeError, ValueError):
+        pass
+
+    # Slow path: only taken when at least one row is malformed
+    X = np.full((len(rows), len(FEATURE_NAMES)), np.nan)
+    errors = {}
+    for i, row in enumerate(rows):
+        try:
+            if isinstance(row, dict):
+                row = [row[name] for name in FEATURE_NAMES]
+            values = [_to_float(value) for value in row]
+            if len(values) != len(FEATURE_NAMES):
+                raise ValueError(f"Expected {len(FEATURE_NAMES)} values, got {len(values)}")
+            X[i] = values
+        except KeyError as e:
+            errors[i] = [f"Missing feature {e}"]
+        except (TypeError, ValueError) as e:
+            errors[i] = [str(e)]
+    return X, errors
+
+
+def parse_csv_rows(text):
+    """Split a CSV body into rows, honouring an optional header line"""
+    rows = [line.split(',') for line in text.splitlines() if line.strip()]
+    if not rows:
+        return rows
+    if is_csv_header(rows[0]):
+        order = csv_feature_order(rows.pop(0))
+        if order is not None:
+            rows = reorder_csv_rows(rows, order)
+    return rows
+
+
+def is_csv_header(row):
+    """True when row names at least one FEATURE_NAMES column.
+
+    A data row with a blank or garbled field is still data, so it gets an
+    error row of its own instead of being swallowed as a header.
+    """
+    return any(field.strip() in FEATURE_NAMES for field in row)
+
+
+def csv_feature_order(header):
+    """Column index of each FEATURE_NAMES entry in a header row, or None to keep the column order"""
+    header = [name.strip() for name in header]
+    if header != FEATURE_NAMES and set(FEATURE_NAMES) <= set(header):
+        return [header.index(name) for name in FEATURE_NAMES]
+    return None
+
+
+def reorder_csv_rows(rows, order):
+    return [[row[j] if j < len(row) else '' for j in order] for row in rows]
+
+
+def parse_csv_block(text, order=None):
+    """Parse headerless CSV text into (X, errors) like parse_feature_rows.
+
+    Every line gives one row, so row i of the result is line i of text.
+    Blank lines become error rows instead of being skipped. Well-formed
+    blocks go through NumPy's C parser; a block with any malformed or
+    blank line is re-parsed row by row so each error is reported.
+    order is a csv_feature_order result for reordered columns.
+    """
+    if not text:
+        return np.empty((0, len(FEATURE_NAMES))), {}
+    # A final newline ends the last line; it does not start another
+    body = text[:-1] if text.endswith('\n') else text
+    if body and not body.isspace():
+        try:
+            X = np.loadtxt(io.StringIO(text), delimiter=',', ndmin=2, comments=None)
+            # loadtxt drops blank lines; a row per line means there were none
+            if len(X) == body.count('\n') + 1:
+                if order is not None and X.shape[1] > max(order):
+                    return X[:, order], {}
+                if order is None and X.shape[1] == len(FEATURE_NAMES):
+                    return X, {}
+        except ValueError:
+            pass
+    rows = [line.split(',') for line in body.split('\n')]
+    blank = [i for i, row in enumerate(rows) if not ''.join(row).strip()]
+    if order is not None:
+        rows = reorder_csv_rows(rows, order)
+    X, errors = parse_feature_rows(rows)
+    for i in blank:
+        errors[i] = ["Empty line"]
+    return X, errors
+
+
+def validate_feature_ranges(X):
+    """Check every row against FEATURE_RANGES using vectorized masks.
+
+    Returns a boolean mask of valid rows and per-row error messages.
+    NaN values are always reported as out of range.
+    """
+    low, high = FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1]
+    with np.errstate(invalid='ignore'):
+        out_of_range = ~((X >= low) & (X <= high))
+    valid = ~out_of_range.any(axis=1)
+
+    errors = {}
+    for i in np.flatnonzero(~valid):
+        errors[int(i)] = [
+            f"{FEATURE_NAMES[j].replace('_', ' ').capitalize()} should be between {low[j]} and {high[j]} cm"
+            for j in np.flatnonzero(out_of_range[i])
+        ]
+    return valid, errors
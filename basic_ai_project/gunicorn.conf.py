@@ -0,0 +1,30 @@
+"""Gunicorn settings for copy-on-write friendly prefork serving.
+
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py app:app
+    IRIS_SERVING_MODE=mmap gunicorn -c gunicorn.conf.py app:app
+
+With preload_app the master imports app.py (and loads the model) once
+before forking, so workers share those pages instead of each importing
+sklearn and unpickling its own copy of model.pkl.
+"""
+import gc
+import os
+
+bind = os.environ.get('IRIS_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('IRIS_WORKERS', '4'))
+threads = int(os.environ.get('IRIS_THREADS', '1'))
+preload_app = os.environ.get('IRIS_PRELOAD_APP', '1') == '1'
+
+# Keep the cyclic GC from running in the master while the app loads, so
+# the objects it creates are not scattered across freshly dirtied pages
+gc.disable()
+
+
+def when_ready(server):
+    # Runs once in the master, after the app is loaded and before the first
+    # fork. Loaded objects go to the permanent generation, so GC passes in
+    # the workers never write to (and un-share) their pages. The master then
+    # collects as usual; workers inherit both the frozen set and the GC.
+    gc.freeze()
+    gc.enable()
@@ -1,34 +1,168 @@
-from sklearn.datasets import load_iris
-from sklearn.model_selection import train_test_split
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.metrics import accuracy_score
-import joblib
-
-# Load the Iris dataset
-iris = load_iris()
-X = iris.data
-y = iris.target
-
-# Split the data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-
-# Create and train the Decision Tree Classifier
-clf = DecisionTreeClassifier(random_state=42)
-clf.fit(X_train, y_train)
-
-# Save the trained model
-joblib.dump(clf, 'model.pkl')
-joblib.dump(iris.target_names, 'target_names.pkl')
-
-# Make predictions on the test set
-y_pred = clf.predict(X_test)
-
-# Calculate and print accuracy
-accuracy = accuracy_score(y_test, y_pred)
-print(f"Model Accuracy: {accuracy:.2f}")
-
-# Make a prediction on a sample input (first test sample)
-sample = X_test[0].reshape(1, -1)
-prediction = clf.predict(sample)
-predicted_class = iris.target_names[prediction[0]]
-print(f"Sample Prediction: {predicted_class}")
+"""Train or tune the Iris model, or bulk-score files with it.
+
+    python main.py                      # train and save the model (same as `main.py train`)
+    python main.py train --model forest --n-estimators 200   # or boosting; see build_model
+    python main.py tune                 # cross-validated hyperparameter search, see tuning.py
+    python main.py export               # rewrite the serving artifacts from model.pkl
+    python main.py publish NAME         # copy the current artifacts into models/NAME/<version>/
+    python main.py score data.csv       # score CSV/NPY files offline, see bulk_score.py
+"""
+import argparse
+
+import bulk_score
+import tuning
+
+MODEL_KINDS = ('tree', 'forest', 'boosting')
+
+# Serving artifacts that only exist for a single decision tree
+TREE_ARTIFACTS = ('model_arrays.joblib', 'model.iristree')
+
+
+def save_artifacts(clf, target_names, X_train, y_train):
+    import joblib
+    from drift import save_baseline
+    from neighbors import save_reference_set
+
+    # Save the trained model
+    joblib.dump(clf, 'model.pkl')
+    joblib.dump(target_names, 'target_names.pkl')
+    try:
+        export_artifacts(clf, target_names)
+    except TypeError:
+        # Ensembles are served from model.pkl; drop tree artifacts an earlier model left behind
+        remove_tree_artifacts()
+        print(f"ℹ️ {type(clf).__name__} is served from model.pkl only (IRIS_SERVING_MODE=pickle)")
+    # And the rows it was trained on, for the app's nearest-sample lookup
+    save_reference_set(X_train, y_train, target_names)
+    # And their per-feature histograms, which the app's drift monitor compares live inputs to
+    save_baseline(X_train)
+
+
+def export_artifacts(clf, target_names):
+    """Write the serving artifacts derived from a fitted tree; returns their sizes in bytes"""
+    import os
+    from fast_tree import CompiledTree, save_array_artifact, save_binary_artifact
+
+    tree = CompiledTree.from_estimator(clf)
+    # Save the flattened tree uncompressed so serving workers can memory-map it
+    save_array_artifact(tree, target_names, 'model_arrays.joblib')
+    # And as the compact binary artifact, which loads without sklearn, joblib or pickle
+    save_binary_artifact(tree, target_names, 'model.iristree')
+    return {path: os.path.getsize(path) for path in ('model.pkl', 'model_arrays.joblib', 'model.iristree')}
+
+
+def remove_tree_artifacts():
+    import os
+
+    for path in TREE_ARTIFACTS:
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"🗑️ Removed stale {path}")
+
+
+def export():
+    """Regenerate the serving artifacts from the existing model.pkl"""
+    import joblib
+
+    clf = joblib.load('model.pkl')
+    try:
+        sizes = export_artifacts(clf, joblib.load('target_names.pkl'))
+    except TypeError as e:
+        raise SystemExit(f"❌ {e}; only a single decision tree has tree artifacts") from None
+    for path, size in sizes.items():
+        print(f"📦 {path}: {size:,} bytes")
+
+
+def publish(args):
+    """Copy the current artifacts into the app's model registry as a new version"""
+    from model_registry import publish_artifacts
+
+    path = publish_artifacts(args.name, args.version, root=args.registry)
+    print(f"📦 Published {args.name} to {path}")
+
+
+def build_model(kind='tree', n_estimators=100, max_depth=None):
+    """An unfitted classifier: a single tree, a random forest or gradient-boosted trees"""
+    if kind == 'forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=42, n_jobs=-1)
+    if kind == 'boosting':
+        # Not HistGradientBoosting: it predicts on its own OpenMP threads, which would
+        # oversubscribe the cores the app's batch inference pool already splits work across
+        from sklearn.ensemble import GradientBoostingClassifier
+        return GradientBoostingClassifier(n_estimators=n_estimators, max_depth=max_depth or 3, random_state=42)
+    from sklearn.tree import DecisionTreeClassifier
+    return DecisionTreeClassifier(max_depth=max_depth, random_state=42)
+
+
+def train(kind='tree', n_estimators=100, max_depth=None):
+    # Imported here so `main.py score` workers do not pay for sklearn's training modules
+    from sklearn.datasets import load_iris
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score
+
+    # Load the Iris dataset
+    iris = load_iris()
+    X = iris.data
+    y = iris.target
+
+    # Split the data into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
+
+    # Create and train the classifier (a Decision Tree unless --model says otherwise)
+    clf = build_model(kind, n_estimators, max_depth)
+    clf.fit(X_train, y_train)
+    if kind == 'forest':
+        # Fitted on every core, but served single-threaded per call: the app splits
+        # large batches across its own pool instead (IRIS_BATCH_THREADS)
+        clf.set_params(n_jobs=None)
+
+    save_artifacts(clf, iris.target_names, X_train, y_train)
+
+    # Make predictions on the test set
+    y_pred = clf.predict(X_test)
+
+    # Calculate and print accuracy
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"Model Accuracy: {accuracy:.2f}")
+
+    # Make a prediction on a sample input (first test sample)
+    sample = X_test[0].reshape(1, -1)
+    prediction = clf.predict(sample)
+    predicted_class = iris.target_names[prediction[0]]
+    print(f"Sample Prediction: {predicted_class}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or tune the Iris classifier, or bulk-score files with it")
+    commands = parser.add_subparsers(dest='command')
+    train_parser = commands.add_parser('train', help="train and save model.pkl (the default)")
+    train_parser.add_argument('--model', choices=MODEL_KINDS, default='tree',
+                              help="decision tree (default), random forest or gradient boosting")
+    train_parser.add_argument('--n-estimators', type=int, default=100, help="trees in a forest or boosting stages")
+    train_parser.add_argument('--max-depth', type=int, help="tree depth limit (boosting defaults to 3)")
+    tuning.add_arguments(commands.add_parser('tune', help="search hyperparameters and save the best model"))
+    commands.add_parser('export', help="rewrite model_arrays.joblib and model.iristree from model.pkl")
+    bulk_score.add_arguments(commands.add_parser('score', help="score CSV/NPY files with the saved model"))
+    publish_parser = commands.add_parser('publish', help="add the current artifacts to the model registry")
+    publish_parser.add_argument('name', help="model name, served as ?model=NAME")
+    publish_parser.add_argument('--version', help="version label (default: UTC timestamp)")
+    publish_parser.add_argument('--registry', default='models', help="registry directory (default: models)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'score':
+        bulk_score.run(args)
+    elif args.command == 'tune':
+        save_artifacts(*tuning.run(args))
+    elif args.command == 'export':
+        export()
+    elif args.command == 'publish':
+        publish(args)
+    elif args.command == 'train':
+        train(args.model, args.n_estimators, args.max_depth)
+    else:
+        train()
+
+
+if __name__ == '__main__':
+    main()
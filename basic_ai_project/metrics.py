@@ -0,0 +1,147 @@
+"""Low-overhead request and inference metrics in Prometheus text format.
+
+Every thread writes to its own shard of counters and histograms, so the
+hot path takes no locks. A scrape sums the live shards; when a thread
+exits, its shard is folded into a retired total, so thread-per-request
+servers do not accumulate shards.
+"""
+import bisect
+import os
+import threading
+import weakref
+
+# Seconds; inference is sub-millisecond, HTTP requests a few milliseconds
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Shard:
+    __slots__ = ('counters', 'histograms', '__weakref__')
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+
+class _ThreadToken:
+    """Lives in the thread-local; its collection marks the thread as finished"""
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = set()
+        self._retired = _Shard()
+        self._metadata = {}
+        # A forked worker starts from zero rather than inheriting the master's counts
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = set()
+        self._retired = _Shard()
+
+    def describe(self, name, kind, help_text):
+        """Register HELP/TYPE metadata; kind is 'counter', 'gauge' or 'histogram'"""
+        self._metadata[name] = (kind, help_text)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            token = self._local.token = _ThreadToken()
+            with self._lock:
+                self._shards.add(shard)
+            weakref.finalize(token, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._shards.discard(shard)
+            self._merge(self._retired, shard)
+
+    @staticmethod
+    def _merge(into, shard):
+        for key, value in dict(shard.counters).items():
+            into.counters[key] = into.counters.get(key, 0) + value
+        for key, (counts, total) in dict(shard.histograms).items():
+            merged = into.histograms.get(key)
+            if merged is None:
+                into.histograms[key] = [list(counts), total]
+            else:
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+
+    def inc(self, name, labels=(), amount=1):
+        """Add to a counter (or a gauge, with a negative amount)"""
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        """Record one histogram observation"""
+        histograms = self._shard().histograms
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+        histogram[1] += value
+
+    def snapshot(self):
+        """Sum of all shards as a single _Shard"""
+        total = _Shard()
+        with self._lock:
+            self._merge(total, self._retired)
+            shards = list(self._shards)
+        for shard in shards:
+            self._merge(total, shard)
+        return total
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        total = self.snapshot()
+        series = {}
+        for (name, labels), value in total.counters.items():
+            series.setdefault(name, []).append((labels, value))
+        for (name, labels), histogram in total.histograms.items():
+            series.setdefault(name, []).append((labels, histogram))
+
+        lines = []
+        for name in sorted(series):
+            kind, help_text = self._metadata.get(name, ('untyped', ''))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series[name], key=lambda item: item[0]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                counts, total_seconds = value
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total_seconds)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
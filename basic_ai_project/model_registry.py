@@ -0,0 +1,296 @@
+"""Named, versioned models served side by side from a registry directory.
+
+Each published model is a directory of the artifacts main.py writes:
+
+    models/<name>/<version>/model.pkl, target_names.pkl, model.iristree, ...
+
+A request selects one as ``name`` (its newest version) or ``name@version``.
+Loaded snapshots are kept in an LRU bounded by their approximate memory
+footprint rather than by count, since one large ensemble can outweigh
+dozens of small trees. Versions are ordered naturally, so v10 is newer
+than v9.
+"""
+import collections
+import mmap
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+
+from model_store import load_snapshot
+
+MODEL_REGISTRY_PATH = 'models'
+
+# Files copied into a version directory by publish_artifacts, when they exist
+PUBLISHED_FILES = ('model.pkl', 'target_names.pkl', 'model_arrays.joblib', 'model.iristree',
+                   'reference_set.npz')
+
+# Names and versions become path components, so nothing that could escape the registry
+_VALID_PART = re.compile(r'[A-Za-z0-9][A-Za-z0-9._-]*')
+
+
+class UnknownModel(LookupError):
+    """The requested model or version is not in the registry"""
+
+
+def parse_model_spec(spec):
+    """'name' or 'name@version' -> (name, version or None)"""
+    name, _, version = spec.partition('@')
+    for part in (name, version) if version else (name,):
+        if not _VALID_PART.fullmatch(part):
+            raise UnknownModel(f"Invalid model name or version {part!r}")
+    return name, version or None
+
+
+def version_key(version):
+    """Natural sort key: runs of digits compare as numbers"""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part)
+            for part in re.findall(r'\d+|\D+', version)]
+
+
+def publish_artifacts(name, version=None, root=MODEL_REGISTRY_PATH, source_dir='.'):
+    """Copy the current training artifacts into root/name/version; returns that directory.
+
+    The version defaults to a UTC timestamp. Files are copied into a
+    temporary directory that is renamed into place, so a running app
+    never sees a half-published version.
+    """
+    version = version or time.strftime('%Y%m%d%H%M%S', time.gmtime())
+    parse_model_spec(f'{name}@{version}')
+    target = os.path.join(root, name, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"{target} already exists")
+    staging = os.path.join(root, name, f'.{version}.tmp')
+    os.makedirs(staging)
+    try:
+        for filename in PUBLISHED_FILES:
+            path = os.path.join(source_dir, filename)
+            if os.path.exists(path):
+                shutil.copy2(path, staging)
+        os.rename(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return target
+
+
+def approximate_size(obj, _seen=None):
+    """Bytes held by obj and everything it references.
+
+    Array buffers count at their nbytes; memory-mapped arrays count as
+    zero because their pages belong to the shared page cache. Other
+    objects count sys.getsizeof plus their attributes or pickled state.
+    """
+    # id -> object; holding the objects keeps temporaries such as pickled state from being
+    # freed mid-walk and their ids reused by objects not yet counted
+    seen = {} if _seen is None else _seen
+    if id(obj) in seen or isinstance(obj, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        return 0
+    seen[id(obj)] = obj
+    if isinstance(obj, np.ndarray):
+        base = obj.base
+        if isinstance(obj, np.memmap) or isinstance(base, mmap.mmap):
+            return 0
+        if isinstance(base, np.ndarray):
+            return approximate_size(base, seen)
+        if base is not None:
+            # A buffer the array wraps; count it once, as the array
+            seen[id(base)] = base
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(approximate_size(item, seen) for item in obj.flat)
+        return size
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, memoryview, int, float, complex, bool, np.generic)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(approximate_size(k, seen) + approximate_size(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+        return size + sum(approximate_size(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        return size + approximate_size(vars(obj), seen)
+    # Extension types such as sklearn's Tree and KDTree expose their arrays through pickling
+    try:
+        state = obj.__getstate__()
+    except Exception:
+        return size
+    return size + approximate_size(state, seen)
+
+
+class _Entry:
+    __slots__ = ('snapshot', 'nbytes', 'load_seconds', 'hits')
+
+    def __init__(self, snapshot, nbytes, load_seconds):
+        self.snapshot = snapshot
+        self.nbytes = nbytes
+        self.load_seconds = load_seconds
+        self.hits = 0
+
+
+class ModelRegistry:
+    def __init__(self, root=MODEL_REGISTRY_PATH, max_bytes=256 * 1024 * 1024, model_filename='model.pkl',
+                 target_names_filename='target_names.pkl', artifact='pickle', fast_tree=True,
+                 warm_rows=None, neighbors=False):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.model_filename = model_filename
+        self.target_names_filename = target_names_filename
+        self.artifact = artifact
+        self.fast_tree = fast_tree
+        self.warm_rows = warm_rows
+        self.neighbors = neighbors
+        self._reset()
+        # Held locks do not survive fork(); loaded snapshots do and stay valid
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._loading = {}
+        self._versions = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_errors = 0
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def versions(self, name):
+        """Published versions of a model, oldest first"""
+        path = os.path.join(self.root, name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        # Publishing renames a new version in, which changes the directory's mtime
+        cached = self._versions.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        versions = sorted((entry.name for entry in os.scandir(path)
+                           if entry.is_dir() and _VALID_PART.fullmatch(entry.name)), key=version_key)
+        self._versions[name] = (mtime, versions)
+        return versions
+
+    def models(self):
+        """{name: [versions]} for everything published"""
+        try:
+            names = sorted(entry.name for entry in os.scandir(self.root)
+                           if entry.is_dir() and _VALID_PART.fullmatch(entry.name))
+        except FileNotFoundError:
+            return {}
+        return {name: self.versions(name) for name in names}
+
+    def resolve(self, spec):
+        """'name' or 'name@version' -> (name, version), raising UnknownModel"""
+        name, version = parse_model_spec(spec)
+        versions = self.versions(name)
+        if not versions:
+            raise UnknownModel(f"No model named {name!r} in {self.root}")
+        if version is None:
+            return name, versions[-1]
+        if version not in versions:
+            raise UnknownModel(f"Model {name!r} has no version {version!r}")
+        return name, version
+
+    def get(self, spec):
+        """The loaded snapshot for spec, loading and caching it on first use"""
+        key = self.resolve(spec)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.hits += 1
+                self.hits += 1
+                return entry.snapshot
+            # Concurrent requests for the same model wait for one load instead of each loading it
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry.hits += 1
+                    self.hits += 1
+                    return entry.snapshot
+                self.misses += 1
+            try:
+                started = time.perf_counter()
+                snapshot = self._load(*key)
+                entry = _Entry(snapshot, approximate_size(snapshot), time.perf_counter() - started)
+            except Exception:
+                with self._lock:
+                    self.load_errors += 1
+                raise
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+            with self._lock:
+                self._entries[key] = entry
+                self.nbytes += entry.nbytes
+                self._evict()
+            # The neighbour index is built on first use, after the size above was taken
+            snapshot.on_neighbors_built = lambda built, key=key: self._remeasure(key, built)
+            return snapshot
+
+    def _evict(self):
+        """Drop least recently used entries until within max_bytes; the caller holds _lock"""
+        # The newest entry always stays, even if it alone is over budget
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _remeasure(self, key, snapshot):
+        """Count memory a cached snapshot gained after loading, evicting others to make room"""
+        nbytes = approximate_size(snapshot)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.snapshot is not snapshot:
+                return  # evicted or replaced meanwhile
+            self.nbytes += nbytes - entry.nbytes
+            entry.nbytes = nbytes
+            # It was just queried, so it is the most recently used
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _load(self, name, version):
+        directory = os.path.join(self.root, name, version)
+        reference_path = os.path.join(directory, 'reference_set.npz') if self.neighbors else None
+        return load_snapshot(os.path.join(directory, self.model_filename),
+                             os.path.join(directory, self.target_names_filename),
+                             fast_tree=self.fast_tree, warm_rows=self.warm_rows,
+                             artifact=self.artifact, reference_path=reference_path)
+
+    def clear(self):
+        """Drop every loaded model; the next request for each loads it again"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "root": self.root,
+                "max_bytes": self.max_bytes,
+                "cached_bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "load_errors": self.load_errors,
+                "cached": [
+                    {"model": f"{name}@{version}", "model_version": entry.snapshot.version,
+                     "bytes": entry.nbytes, "load_ms": round(entry.load_seconds * 1000, 2), "hits": entry.hits}
+                    for (name, version), entry in reversed(self._entries.items())
+                ],
+            }
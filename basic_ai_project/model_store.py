@@ -0,0 +1,307 @@
+"""Versioned model snapshots with background reload, atomic swap and rollback.
+
+Request handlers read ``store.current`` once and use that snapshot for the
+whole request, so a reload never changes the model under an in-flight
+request: it keeps its reference to the old snapshot until it finishes.
+"""
+import collections
+import os
+import threading
+import time
+
+import numpy as np
+
+from evaluation import model_fingerprint
+from fast_tree import CompiledTree, load_array_artifact, load_binary_artifact
+from neighbors import NeighborIndex
+
+# Model artifact formats ModelStore can serve from
+ARTIFACT_FORMATS = ('pickle', 'mmap', 'binary')
+
+
+class LoadedModel:
+    """An immutable, fully warmed model snapshot"""
+
+    def __init__(self, model, target_names, engine, fingerprint, model_path, reference_path=None):
+        self.model = model
+        self.target_names = target_names
+        self.engine = engine
+        self.fingerprint = fingerprint
+        self.model_path = model_path
+        self.reference_path = reference_path
+        self._neighbors = None
+        self._neighbors_lock = threading.Lock()
+        # Called with the snapshot once the index is built, so an owner
+        # that accounts for its memory (ModelRegistry) can measure it again
+        self.on_neighbors_built = None
+        self.loaded_at = time.time()
+
+    @property
+    def neighbors(self):
+        """Nearest-neighbour index over the reference set, or None without one.
+
+        Built on first use and then kept with the snapshot. Building it
+        imports sklearn.neighbors, so model loads, including the 'mmap' and
+        'binary' ones that otherwise avoid sklearn, do not pay for it.
+        """
+        if self._neighbors is None and self.reference_path is not None:
+            with self._neighbors_lock:
+                if self._neighbors is not None:
+                    return self._neighbors
+                self._neighbors = NeighborIndex.from_file(self.reference_path)
+            if self.on_neighbors_built is not None:
+                self.on_neighbors_built(self)
+        return self._neighbors
+
+    @property
+    def version(self):
+        return self.fingerprint[2][:12]
+
+    def describe(self):
+        mtime_ns, size, sha256 = self.fingerprint
+        return {
+            "version": self.version,
+            "sha256": sha256,
+            "path": self.model_path,
+            "size_bytes": size,
+            "artifact_mtime": mtime_ns / 1e9,
+            "loaded_at": self.loaded_at,
+            "fast_tree": isinstance(self.engine, CompiledTree),
+            "neighbors": (self._neighbors.describe() if self._neighbors is not None
+                          else {"path": self.reference_path, "built": False} if self.reference_path else None),
+        }
+
+
+def load_snapshot(model_path, target_names_path, fast_tree=True, warm_rows=None, warm=None,
+                  artifact='pickle', reference_path=None):
+    """Load, compile and warm a model; raises if the artifact is unusable.
+
+    artifact='mmap' reads a tree array artifact whose arrays are
+    memory-mapped read-only, so processes serving it share the pages;
+    artifact='binary' reads the compact binary artifact. Neither imports
+    sklearn, and target_names_path is unused since both embed the names.
+
+    When reference_path names an existing reference set, the snapshot builds
+    a nearest-neighbour index over it the first time the index is used.
+    """
+    if artifact not in ARTIFACT_FORMATS:
+        raise ValueError(f"Unknown artifact format {artifact!r}, expected one of {ARTIFACT_FORMATS}")
+    fingerprint = model_fingerprint(model_path)
+    if artifact == 'mmap':
+        model, target_names = load_array_artifact(model_path, mmap_mode='r')
+        engine = model
+    elif artifact == 'binary':
+        model, target_names = load_binary_artifact(model_path)
+        engine = model
+    else:
+        # Imported here so a deferred store does not pay for joblib/sklearn at startup
+        import joblib
+
+        model = joblib.load(model_path)
+        target_names = joblib.load(target_names_path)
+        engine = model
+        if fast_tree:
+            try:
+                engine = CompiledTree.from_estimator(model)
+            except TypeError as e:
+                print(f"⚠️ Fast-path inference disabled: {e}")
+
+    if reference_path is not None and not os.path.exists(reference_path):
+        reference_path = None
+
+    snapshot = LoadedModel(model, target_names, engine, fingerprint, model_path, reference_path)
+    if warm_rows is not None:
+        rows = np.asarray(warm_rows, dtype=float)
+        probabilities = engine.predict_proba(rows)
+        if probabilities.shape != (len(rows), len(target_names)):
+            raise ValueError(f"Model returned probabilities of shape {probabilities.shape}, "
+                             f"expected {(len(rows), len(target_names))}")
+        if isinstance(engine, CompiledTree):
+            engine.predict_proba_one(rows[0])
+    if warm is not None:
+        warm(snapshot)
+    return snapshot
+
+
+class ModelStore:
+    def __init__(self, model_path, target_names_path, fast_tree=True, warm_rows=None,
+                 warm=None, history=3, artifact='pickle', reference_path=None):
+        self.model_path = model_path
+        self.artifact = artifact
+        self.reference_path = reference_path
+        self.target_names_path = target_names_path
+        self.fast_tree = fast_tree
+        self.warm_rows = warm_rows
+        self.warm = warm
+        self._current = None
+        self._deferred = False
+        self._previous = collections.deque(maxlen=history)
+        self._reload_lock = threading.Lock()
+        self.reloading = False
+        self.last_error = None
+        self.reloads = 0
+        self.rollbacks = 0
+        self._watcher = None
+        self._watch_interval = None
+        # Threads and held locks do not survive fork(); recreate them in the child
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._reload_lock = threading.Lock()
+        self.reloading = False
+        self._watcher = None
+        if self._watch_interval is not None:
+            self.watch(self._watch_interval)
+
+    def _load(self):
+        return load_snapshot(self.model_path, self.target_names_path, fast_tree=self.fast_tree,
+                             warm_rows=self.warm_rows, warm=self.warm, artifact=self.artifact,
+                             reference_path=self.reference_path)
+
+    @property
+    def current(self):
+        snapshot = self._current
+        if snapshot is None and self._deferred:
+            snapshot = self._load_deferred()
+        return snapshot
+
+    @property
+    def deferred(self):
+        """True while a deferred store has not loaded its first model yet"""
+        return self._deferred and self._current is None
+
+    def load_initial(self):
+        """Synchronous first load; returns False if no artifact exists yet"""
+        try:
+            self._current = self._load()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def defer(self):
+        """Skip loading now; the first access to ``current`` loads the model"""
+        self._deferred = True
+
+    def _load_deferred(self):
+        with self._reload_lock:
+            if self._current is None:
+                try:
+                    self._current = self._load()
+                except FileNotFoundError:
+                    return None
+                self._deferred = False
+                print(f"✅ Model loaded on first use (version {self._current.version})")
+            return self._current
+
+    def reload(self):
+        """Load the artifact from disk, warm it, then swap it in.
+
+        Returns the new snapshot, or None when the artifact is unchanged.
+        On failure the active model stays in place and the error is kept
+        in ``last_error``.
+        """
+        with self._reload_lock:
+            return self._reload_locked()
+
+    def _reload_locked(self):
+        self.reloading = True
+        try:
+            snapshot = self._load()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.reloading = False
+        active = self._current
+        if active is not None and active.fingerprint[2] == snapshot.fingerprint[2]:
+            return None
+        if active is not None:
+            self._previous.append(active)
+        # A single reference assignment: readers see either snapshot, never a mix
+        self._current = snapshot
+        self._deferred = False
+        self.last_error = None
+        self.reloads += 1
+        return snapshot
+
+    def reload_in_background(self):
+        """Start a reload on a worker thread; False if one is already running"""
+        # Taken here rather than in the thread, so two callers cannot both start one
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                snapshot = self._reload_locked()
+                if snapshot is not None:
+                    print(f"🔄 Model {snapshot.version} is now active")
+            except Exception as e:
+                print(f"❌ Model reload failed, keeping current model: {e}")
+            finally:
+                self._reload_lock.release()
+
+        try:
+            threading.Thread(target=run, name='model-reload', daemon=True).start()
+        except BaseException:
+            self._reload_lock.release()
+            raise
+        return True
+
+    def rollback(self):
+        """Reactivate the previously active snapshot; None if there is none"""
+        with self._reload_lock:
+            if not self._previous:
+                return None
+            self._current = self._previous.pop()
+            self.rollbacks += 1
+            return self._current
+
+    def status(self):
+        active = self._current
+        return {
+            "active": active.describe() if active is not None else None,
+            "deferred": self.deferred,
+            "previous_versions": [snapshot.version for snapshot in reversed(self._previous)],
+            "reloading": self.reloading,
+            "reloads": self.reloads,
+            "rollbacks": self.rollbacks,
+            "last_error": self.last_error,
+            "watching": self._watcher is not None,
+            "artifact": self.artifact,
+            "memory_mapped": self.artifact == 'mmap',
+        }
+
+    def watch(self, interval):
+        """Poll the artifact and reload once a change has settled for one interval"""
+        self._watch_interval = interval
+
+        def stat():
+            try:
+                st = os.stat(self.model_path)
+                return st.st_mtime_ns, st.st_size
+            except FileNotFoundError:
+                return None
+
+        def run():
+            seen = stat()
+            pending = None
+            while True:
+                time.sleep(interval)
+                current = stat()
+                if current is None or current == seen:
+                    pending = None
+                    continue
+                if current != pending:
+                    # Wait one more interval so we never load a half-written file
+                    pending = current
+                    continue
+                seen, pending = current, None
+                try:
+                    snapshot = self.reload()
+                    if snapshot is not None:
+                        print(f"🔄 Model {snapshot.version} is now active")
+                except Exception as e:
+                    print(f"❌ Model reload failed, keeping current model: {e}")
+
+        self._watcher = threading.Thread(target=run, name='model-watcher', daemon=True)
+        self._watcher.start()
@@ -0,0 +1,81 @@
+"""Nearest-training-sample lookup over a KD-tree built once per model snapshot.
+
+main.py saves the training rows the model was fitted on to
+``reference_set.npz``: plain arrays, so they load without pickle. The
+first neighbour query against a model snapshot builds a
+``sklearn.neighbors.KDTree`` over them, and queries then cost O(k log n)
+per row instead of a scan of every reference row. Because the index is
+kept with the snapshot, it is swapped in together with the model it was
+trained with.
+"""
+import time
+
+import numpy as np
+
+REFERENCE_SET_PATH = 'reference_set.npz'
+
+# KDTree's default; larger leaves build faster, smaller ones query faster
+DEFAULT_LEAF_SIZE = 40
+
+
+def save_reference_set(X, y, target_names, path=REFERENCE_SET_PATH):
+    """Write the reference rows, their class labels and the class names"""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    if X.ndim != 2 or len(X) != len(y):
+        raise ValueError(f"Expected an (n, d) matrix and n labels, got {X.shape} and {y.shape}")
+    if not np.issubdtype(y.dtype, np.integer):
+        raise TypeError("Reference labels must be integer class indices")
+    # np.savez appends .npz unless the name already ends with it
+    with open(path, 'wb') as f:
+        np.savez(f, X=X, y=y.astype(np.int64), target_names=np.asarray(target_names, dtype=str))
+
+
+def load_reference_set(path=REFERENCE_SET_PATH):
+    """Returns (X, y, target_names) as saved by save_reference_set"""
+    with np.load(path, allow_pickle=False) as data:
+        return data['X'], data['y'], data['target_names']
+
+
+class NeighborIndex:
+    """A KD-tree over labelled reference rows"""
+
+    def __init__(self, X, y, target_names, leaf_size=DEFAULT_LEAF_SIZE, path=None):
+        from sklearn.neighbors import KDTree
+
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+        self.y = np.asarray(y)
+        self.target_names = np.asarray(target_names)
+        self.leaf_size = leaf_size
+        self.path = path
+        started = time.perf_counter()
+        self._tree = KDTree(self.X, leaf_size=leaf_size)
+        self.build_seconds = time.perf_counter() - started
+
+    @classmethod
+    def from_file(cls, path=REFERENCE_SET_PATH, leaf_size=DEFAULT_LEAF_SIZE):
+        X, y, target_names = load_reference_set(path)
+        return cls(X, y, target_names, leaf_size=leaf_size, path=path)
+
+    def __len__(self):
+        return len(self.X)
+
+    def query(self, X, k):
+        """(distances, indices) of the k nearest reference rows, nearest first.
+
+        Both are (n_queries, k) arrays; k is capped at the reference size.
+        """
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.X.shape[1])
+        return self._tree.query(X, k=min(k, len(self.X)), return_distance=True, sort_results=True)
+
+    def labels(self, indices):
+        """Class names of the given reference rows"""
+        return self.target_names[self.y[indices]]
+
+    def describe(self):
+        return {
+            "path": self.path,
+            "rows": len(self.X),
+            "leaf_size": self.leaf_size,
+            "build_ms": round(self.build_seconds * 1000, 2),
+        }
@@ -0,0 +1,79 @@
+"""Row-parallel predict_proba for large batches on a shared thread pool.
+
+A batch of at least 2 * min_rows_per_thread rows is cut into contiguous
+row chunks of at least min_rows_per_thread rows, up to one per thread.
+The request thread scores the first chunk itself while the pool scores
+the rest. sklearn's tree and forest predictors, and the NumPy kernels
+behind CompiledTree, release the GIL, so the chunks run on separate cores.
+Each call still has a fixed cost that holds the GIL: a forest loops over
+its trees in Python, about 0.1 ms per tree. Chunks need enough rows for
+the GIL-free part to dominate, hence the large min_rows_per_thread.
+
+The pool is shared by all requests, so at most ``threads`` chunks run at
+once however many batches arrive together. Smaller batches, and every
+batch when threads is 1, are scored on the request thread as before.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class ParallelPredictor:
+    def __init__(self, threads=None, min_rows_per_thread=5000):
+        self.threads = max(1, threads or os.cpu_count() or 1)
+        self.min_rows_per_thread = min_rows_per_thread
+        self._reset()
+        # Pool threads do not survive fork(); the first parallel batch in a worker starts a new pool
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self.calls = 0
+        self.parallel_calls = 0
+        self.chunks = 0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # The request thread scores one chunk, so the pool needs one thread fewer
+                self._pool = ThreadPoolExecutor(max_workers=self.threads - 1,
+                                                thread_name_prefix='iris-batch-inference')
+            return self._pool
+
+    def chunk_bounds(self, n_rows):
+        """Row offsets of the chunks a batch of n_rows is split into"""
+        n_chunks = min(self.threads, n_rows // max(self.min_rows_per_thread, 1))
+        return np.linspace(0, n_rows, max(n_chunks, 1) + 1).astype(int)
+
+    def predict_proba(self, engine, X):
+        bounds = self.chunk_bounds(len(X))
+        with self._lock:
+            self.calls += 1
+            if len(bounds) > 2:
+                self.parallel_calls += 1
+                self.chunks += len(bounds) - 1
+        if len(bounds) <= 2:
+            return engine.predict_proba(X)
+
+        pool = self._executor()
+        futures = [pool.submit(engine.predict_proba, X[start:stop])
+                   for start, stop in zip(bounds[1:-1], bounds[2:])]
+        try:
+            first = engine.predict_proba(X[:bounds[1]])
+        finally:
+            # Collect every chunk even if ours failed, so none outlives the request
+            parts = [future.result() for future in futures]
+        return np.concatenate([first] + parts)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threads": self.threads,
+                "min_rows_per_thread": self.min_rows_per_thread,
+                "calls": self.calls,
+                "parallel_calls": self.parallel_calls,
+                "mean_chunks": round(self.chunks / self.parallel_calls, 2) if self.parallel_calls else 0,
+            }
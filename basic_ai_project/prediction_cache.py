@@ -0,0 +1,88 @@
+"""Bounded LRU cache of prediction probabilities with TTL eviction.
+
+Keys are feature vectors rounded to a fixed number of decimals, so the
+repeated slider values sent by the web form hit the same entry. Entries
+belong to one model version; the first lookup for a different version
+drops everything cached for the old one.
+"""
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+class PredictionCache:
+    def __init__(self, max_entries=10000, ttl_seconds=300.0, precision=2):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def quantize(self, features):
+        """Round features to the cache precision; predictions are made on this vector"""
+        return np.round(np.asarray(features, dtype=float), self.precision)
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, features):
+        """Cached probabilities for quantized features, or None"""
+        key = tuple(features.tolist())
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, version, features, probabilities):
+        key = tuple(features.tolist())
+        value = np.array(probabilities, dtype=float)
+        value.flags.writeable = False
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "precision": self.precision,
+                "model_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
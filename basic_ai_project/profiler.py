@@ -0,0 +1,215 @@
+"""Sampling profiler for individual requests, keeping the most recent profiles.
+
+A profiled request registers its thread with the sampler for as long as
+it runs. A background thread wakes every interval_ms, reads the stacks of
+registered threads from ``sys._current_frames()`` and charges the time
+since its previous sample to each stack. Requests that are not profiled
+cost nothing beyond the sampling decision, and the sampler thread sleeps
+whenever no profiled request is in flight.
+
+Each sample is weighted by the time that actually passed, not by the
+nominal interval. The sampler needs the GIL to run, so on a busy
+interpreter samples arrive less often, but each one carries more time.
+Requests much shorter than the interval may get no samples at all. Merge
+many profiles to see where they spend their time.
+
+Finished profiles go into a ring buffer and can be exported as collapsed
+stacks (flamegraph.pl, speedscope) or as a pstats file (``python -m pstats``,
+snakeviz). In the pstats view, call counts are sample counts.
+"""
+import collections
+import itertools
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+
+
+def _frame_label(code):
+    path = code.co_filename
+    cwd = os.getcwd() + os.sep
+    if path.startswith(cwd):
+        path = path[len(cwd):]
+    elif 'site-packages' + os.sep in path:
+        path = path.split('site-packages' + os.sep, 1)[1]
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class Profile:
+    def __init__(self, profile_id, method, path, endpoint, reason):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.reason = reason
+        self.status = None
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        # Stack (tuple of code objects, outermost first) -> seconds charged to it
+        self.stacks = collections.Counter()
+        self.samples = 0
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "endpoint": self.endpoint,
+            "reason": self.reason,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "samples": self.samples,
+            "sampled_ms": round(sum(self.stacks.values()) * 1000, 3),
+        }
+
+
+def merge_stacks(profiles):
+    """Combined stack -> seconds of several profiles"""
+    merged = collections.Counter()
+    for profile in profiles:
+        merged.update(profile.stacks)
+    return merged
+
+
+def collapsed_stacks(stacks):
+    """'outer;inner;leaf microseconds' lines, heaviest first"""
+    lines = []
+    for stack, seconds in sorted(stacks.items(), key=lambda item: -item[1]):
+        weight = round(seconds * 1e6)
+        if weight:
+            lines.append(';'.join(_frame_label(code) for code in stack) + f' {weight}\n')
+    return ''.join(lines)
+
+
+def pstats_dump(stacks):
+    """Bytes loadable by pstats.Stats, built from sampled stacks.
+
+    Own time is charged to the innermost frame and cumulative time to
+    every distinct function on the stack, so recursion is not counted twice.
+    """
+    def key(code):
+        return code.co_filename, code.co_firstlineno, code.co_name
+
+    # function -> [samples, own seconds, cumulative seconds, {caller: [samples, own, cumulative]}]
+    entries = {}
+    for stack, seconds in stacks.items():
+        keys = [key(code) for code in stack]
+        for i, function in enumerate(keys):
+            entry = entries.setdefault(function, [0, 0.0, 0.0, {}])
+            innermost = i == len(keys) - 1
+            if function not in keys[i + 1:]:
+                entry[0] += 1
+                entry[2] += seconds
+            if innermost:
+                entry[1] += seconds
+            if i:
+                caller = entry[3].setdefault(keys[i - 1], [0, 0.0, 0.0])
+                caller[0] += 1
+                caller[1] += seconds if innermost else 0.0
+                caller[2] += seconds
+    stats = {
+        function: (count, count, own, cumulative,
+                   {caller: (n, n, caller_own, caller_cumulative)
+                    for caller, (n, caller_own, caller_cumulative) in callers.items()})
+        for function, (count, own, cumulative, callers) in entries.items()
+    }
+    return marshal.dumps(stats)
+
+
+class RequestProfiler:
+    def __init__(self, sample_rate=0.01, interval_ms=1.0, max_profiles=50, max_depth=128):
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000.0
+        self.max_profiles = max_profiles
+        self.max_depth = max_depth
+        self._reset()
+        # The sampler thread does not survive fork(); each worker profiles its own requests
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        self._active = {}
+        self._profiles = collections.deque(maxlen=self.max_profiles)
+        self._ids = itertools.count(1)
+        self._sampler = None
+        self.profiled = 0
+        self.samples = 0
+
+    def sample(self):
+        """Whether to profile a request that did not ask for it"""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, method, path, endpoint, reason='sampled'):
+        """Profile the calling thread until stop(); returns the Profile"""
+        with self._cond:
+            profile = Profile(next(self._ids), method, path, endpoint, reason)
+            self._active[threading.get_ident()] = profile
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._sampler.start()
+            self._cond.notify()
+            return profile
+
+    def stop(self, profile, status=None):
+        with self._cond:
+            self._active.pop(threading.get_ident(), None)
+            profile.duration = time.perf_counter() - profile.started
+            profile.status = status
+            self._profiles.append(profile)
+            self.profiled += 1
+
+    def _run(self):
+        last = time.perf_counter()
+        while True:
+            with self._cond:
+                while not self._active:
+                    self._cond.wait()
+                    last = time.perf_counter()
+            time.sleep(self.interval)
+            with self._cond:
+                # Under the lock, so a profile cannot stop between reading its stack and charging it
+                now = time.perf_counter()
+                elapsed = now - last
+                last = now
+                frames = sys._current_frames()
+                for ident, profile in self._active.items():
+                    frame = frames.get(ident)
+                    stack = []
+                    while frame is not None and len(stack) < self.max_depth:
+                        stack.append(frame.f_code)
+                        frame = frame.f_back
+                    if stack:
+                        # A profile that started mid-interval only gets the time since it started
+                        profile.stacks[tuple(reversed(stack))] += min(elapsed, now - profile.started)
+                        profile.samples += 1
+                        self.samples += 1
+                del frames
+
+    def profiles(self, endpoint=None):
+        """Finished profiles, newest first"""
+        with self._cond:
+            return [profile for profile in reversed(self._profiles)
+                    if endpoint is None or profile.endpoint == endpoint]
+
+    def get(self, profile_id):
+        with self._cond:
+            for profile in self._profiles:
+                if profile.id == profile_id:
+                    return profile
+        return None
+
+    def stats(self):
+        with self._cond:
+            return {
+                "sample_rate": self.sample_rate,
+                "interval_ms": self.interval * 1000,
+                "max_profiles": self.max_profiles,
+                "kept": len(self._profiles),
+                "in_flight": len(self._active),
+                "profiled": self.profiled,
+                "samples": self.samples,
+            }
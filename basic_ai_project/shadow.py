@@ -0,0 +1,128 @@
+"""Shadow scoring: replay a sample of live traffic on a candidate model.
+
+A sampled request hands its already-validated input rows and the
+predictions it served to a bounded queue and returns immediately. A
+background thread scores the rows on the candidate and records how often
+the two models agree, which labels they disagree on, and each model's
+inference latency. The candidate's answers are never returned to
+clients, and a full queue drops the sample rather than slowing a request.
+"""
+import collections
+import os
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+from fast_tree import CompiledTree
+
+# Latency samples kept per model for the percentiles
+LATENCY_SAMPLES = 2048
+
+
+class ShadowScorer:
+    def __init__(self, candidate, sample_rate=0.1, max_queue=1000, on_score=None):
+        """candidate() returns the LoadedModel to compare against; it is called per sample"""
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.max_queue = max_queue
+        self.on_score = on_score
+        self._start()
+        # The worker thread does not survive fork(); each worker process shadows its own traffic
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(self.max_queue)
+        self.sampled = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.rows = 0
+        self.agreed = 0
+        self.disagreements = collections.Counter()
+        self.candidate_version = None
+        self._latency = {"primary": collections.deque(maxlen=LATENCY_SAMPLES),
+                         "candidate": collections.deque(maxlen=LATENCY_SAMPLES)}
+        self._worker = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+        self._worker.start()
+
+    def sample(self):
+        """Whether this request should be shadowed"""
+        return random.random() < self.sample_rate
+
+    def submit(self, X, predictions, primary_seconds):
+        """Queue served rows for the candidate; False if the queue was full"""
+        try:
+            self._queue.put_nowait((X, predictions, primary_seconds))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            X, predictions, primary_seconds = self._queue.get()
+            try:
+                candidate = self.candidate()
+                X = np.asarray(X, dtype=float).reshape(len(predictions), -1)
+                engine = candidate.engine
+                started = time.perf_counter()
+                # Single rows take the same path as /predict, so the latencies compare like for like
+                if len(X) == 1 and isinstance(engine, CompiledTree):
+                    probabilities = engine.predict_proba_one(X[0]).reshape(1, -1)
+                else:
+                    probabilities = engine.predict_proba(X)
+                seconds = time.perf_counter() - started
+                labels = candidate.target_names[engine.classes_[probabilities.argmax(axis=1)]]
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                continue
+            served = [str(label) for label in predictions]
+            shadowed = [str(label) for label in labels]
+            agreed = sum(a == b for a, b in zip(served, shadowed))
+            with self._lock:
+                self.sampled += 1
+                self.rows += len(served)
+                self.agreed += agreed
+                if agreed < len(served):
+                    self.disagreements.update(f"{a} -> {b}" for a, b in zip(served, shadowed) if a != b)
+                self.candidate_version = candidate.version
+                self._latency["primary"].append(primary_seconds)
+                self._latency["candidate"].append(seconds)
+            if self.on_score is not None:
+                self.on_score(seconds, len(served), agreed)
+
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return {"mean_ms": None, "p50_ms": None, "p99_ms": None}
+        ms = np.asarray(samples) * 1000
+        p50, p99 = np.percentile(ms, [50, 99])
+        return {"mean_ms": round(float(ms.mean()), 4), "p50_ms": round(float(p50), 4),
+                "p99_ms": round(float(p99), 4)}
+
+    def stats(self):
+        with self._lock:
+            latency = {name: list(samples) for name, samples in self._latency.items()}
+            return {
+                "sample_rate": self.sample_rate,
+                "candidate_version": self.candidate_version,
+                "sampled_requests": self.sampled,
+                "rows": self.rows,
+                "agreed_rows": self.agreed,
+                "agreement": round(self.agreed / self.rows, 4) if self.rows else None,
+                # Served label -> candidate label
+                "disagreements": dict(self.disagreements.most_common(20)),
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "latency": {name: self._summary(samples) for name, samples in latency.items()},
+            }
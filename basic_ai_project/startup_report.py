@@ -0,0 +1,125 @@
+"""Measure the web app's cold start in fresh interpreters.
+
+Each run spawns ``python -X importtime -c "import app"`` from the project
+directory, times it from spawn to ready, and parses the import log into
+a per-module breakdown. The app's own environment variables apply, so
+compare configurations like this:
+
+    python startup_report.py
+    IRIS_MODEL_PRELOAD=0 python startup_report.py
+    flask --app app startup-report --runs 5 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHILD_SCRIPT = (
+    "import json, sys, app; "
+    "sys.stdout.write('STARTUP_TIMINGS=' + json.dumps(app.STARTUP_TIMINGS) + '\\n')"
+)
+
+
+def parse_importtime(stderr):
+    """Return [(module, self_us, cumulative_us, depth)] in -X importtime order"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def direct_imports(modules, parent='app'):
+    """Modules imported directly by parent; importtime lists children just before it"""
+    names = [name for name, _, _, _ in modules]
+    if parent not in names:
+        return {}
+    children = {}
+    for name, _, cumulative_us, depth in reversed(modules[:names.index(parent)]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children[name] = cumulative_us
+    return children
+
+
+def measure_once(env=None):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+                            cwd=PROJECT_DIR, env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app failed:\n{result.stderr[-2000:]}")
+    timings = {}
+    for line in result.stdout.splitlines():
+        if line.startswith('STARTUP_TIMINGS='):
+            timings = json.loads(line.split('=', 1)[1])
+    return wall_ms, timings, parse_importtime(result.stderr)
+
+
+def measure_cold_start(runs=3, top=20, env=None):
+    """Median wall-clock cold start plus the slowest modules from the fastest run"""
+    samples = [measure_once(env) for _ in range(runs)]
+    wall = [wall_ms for wall_ms, _, _ in samples]
+    _, timings, modules = min(samples, key=lambda sample: sample[0])
+
+    direct = direct_imports(modules)
+    slowest = sorted(modules, key=lambda module: module[2], reverse=True)
+    return {
+        "runs": runs,
+        "cold_start_ms": {
+            "median": round(statistics.median(wall), 1),
+            "min": round(min(wall), 1),
+            "max": round(max(wall), 1),
+        },
+        "app_phases": timings,
+        "app_imports_ms": {name: round(us / 1000, 1) for name, us in
+                           sorted(direct.items(), key=lambda item: item[1], reverse=True)},
+        "slowest_modules_ms": [
+            {"module": name, "cumulative": round(cumulative / 1000, 1), "self": round(self_us / 1000, 1)}
+            for name, self_us, cumulative, _ in slowest[:top]
+        ],
+    }
+
+
+def print_report(report):
+    cold = report["cold_start_ms"]
+    print(f"🚀 Cold start over {report['runs']} runs: median {cold['median']} ms "
+          f"(min {cold['min']}, max {cold['max']})")
+    phases = report["app_phases"]
+    if phases:
+        print(f"   imports {phases['imports_ms']} ms, model load {phases['model_load_ms']} ms, "
+              f"ready {phases['ready_ms']} ms "
+              f"(model preload={phases['model_preload']}, evaluation preload={phases['evaluation_preload']})")
+    print("\n📦 Imports made by app.py (cumulative ms):")
+    for name, ms in report["app_imports_ms"].items():
+        print(f"   {ms:>8.1f}  {name}")
+    print("\n🐢 Slowest modules overall (cumulative / self ms):")
+    for entry in report["slowest_modules_ms"]:
+        print(f"   {entry['cumulative']:>8.1f} {entry['self']:>8.1f}  {entry['module']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the Iris app's cold start")
+    parser.add_argument('--runs', type=int, default=3, help="fresh processes to spawn")
+    parser.add_argument('--top', type=int, default=20, help="number of slowest modules to list")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = measure_cold_start(runs=args.runs, top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
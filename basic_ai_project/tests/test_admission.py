@@ -0,0 +1,90 @@
+"""Queueing, shedding and slot hand-off of AdmissionController."""
+import threading
+import time
+
+import pytest
+
+import admission
+from admission import AdmissionController, Overloaded
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_full_queue_is_shed_at_once():
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    controller.acquire()
+    with pytest.raises(Overloaded) as excinfo:
+        controller.acquire()
+    assert excinfo.value.reason == 'queue_full'
+    controller.release()
+    stats = controller.stats()
+    assert stats['shed_queue_full'] == 1 and stats['in_flight'] == 0
+
+
+def test_waiter_is_shed_when_its_deadline_passes():
+    controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout_ms=20)
+    controller.acquire()
+    started = time.perf_counter()
+    with pytest.raises(Overloaded) as excinfo:
+        controller.acquire()
+    assert excinfo.value.reason == 'timeout'
+    assert time.perf_counter() - started >= 0.02
+    controller.release()
+    stats = controller.stats()
+    assert stats['shed_timeout'] == 1 and stats['queue_depth'] == 0 and stats['in_flight'] == 0
+
+
+def test_freed_slots_go_to_waiters_in_arrival_order():
+    controller = AdmissionController(max_in_flight=1, max_queue=8, queue_timeout_ms=5000)
+    controller.acquire()
+    admitted = []
+
+    def request(name):
+        controller.acquire()
+        admitted.append(name)
+        controller.release()
+
+    threads = []
+    for name in 'abcde':
+        thread = threading.Thread(target=request, args=(name,))
+        thread.start()
+        threads.append(thread)
+        # Queue them one at a time so the arrival order is known
+        wait_for(lambda: controller.stats()['queue_depth'] == len(threads))
+
+    controller.release()
+    for thread in threads:
+        thread.join()
+    assert admitted == list('abcde')
+    stats = controller.stats()
+    assert stats['in_flight'] == 0 and stats['admitted'] == 6 and stats['shed'] == 0
+
+
+def test_slot_granted_as_the_deadline_passes_is_kept(monkeypatch):
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout_ms=10)
+
+    class LateEvent(threading.Event):
+        def wait(self, timeout=None):
+            # The running request finishes just as this waiter's deadline passes
+            controller.release()
+            return False
+
+    class LateWaiter(admission._Waiter):
+        __slots__ = ()
+
+        def __init__(self):
+            super().__init__()
+            self.event = LateEvent()
+
+    monkeypatch.setattr(admission, '_Waiter', LateWaiter)
+    controller.acquire()
+    controller.acquire()
+    stats = controller.stats()
+    assert stats['in_flight'] == 1 and stats['shed'] == 0 and stats['admitted'] == 2
+    controller.release()
+    assert controller.stats()['in_flight'] == 0
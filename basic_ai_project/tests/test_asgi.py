@@ -0,0 +1,61 @@
+"""Routes of the ASGI entry point, called directly without a server.
+
+The app is imported in a fresh interpreter, like the other app tests.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PROJECT_DIR
+
+CHECK = """
+import asyncio, json, sys
+import asgi
+
+async def call(path, method='GET'):
+    sent = []
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+    async def send(message):
+        sent.append(message)
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': [(b'host', b'localhost')]}
+    await asgi.application(scope, receive, send)
+    headers = dict(sent[0]['headers'])
+    return [sent[0]['status'], headers.get(b'content-type', b'').decode(), sent[1]['body'].decode('latin-1')]
+
+async def main():
+    paths = sys.argv[1:]
+    print(json.dumps(dict(zip(paths, await asyncio.gather(*(call(path) for path in paths))))))
+
+asyncio.run(main())
+"""
+
+
+def get(*paths):
+    if not os.path.exists(os.path.join(PROJECT_DIR, 'model.iristree')):
+        pytest.skip("model.iristree not built; run main.py")
+    pytest.importorskip('werkzeug')
+    env = dict(os.environ, IRIS_SERVING_MODE='binary')
+    result = subprocess.run([sys.executable, '-c', CHECK, *paths], cwd=PROJECT_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_pages_and_their_stylesheet_are_served():
+    responses = get('/', '/static/css/style.css')
+    status, _, page = responses['/']
+    assert status == 200 and '/static/css/style.css' in page
+    status, content_type, stylesheet = responses['/static/css/style.css']
+    assert status == 200 and content_type.startswith('text/css')
+    with open(os.path.join(PROJECT_DIR, 'static', 'css', 'style.css'), encoding='utf-8') as f:
+        assert stylesheet.encode('latin-1') == f.read().encode('utf-8')
+
+
+def test_static_paths_cannot_leave_the_static_folder():
+    responses = get('/static/../app.py', '/static/css', '/static/missing.css')
+    assert [response[0] for response in responses.values()] == [404, 404, 404]
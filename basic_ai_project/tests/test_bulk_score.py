@@ -0,0 +1,21 @@
+"""Output planning of the offline bulk scorer."""
+import pytest
+
+from bulk_score import check_outputs, default_output
+
+
+def test_csv_and_npy_inputs_with_the_same_stem_are_refused(tmp_path):
+    inputs = [str(tmp_path / 'in.csv'), str(tmp_path / 'in.npy')]
+    with pytest.raises(SystemExit, match="both be written"):
+        check_outputs(inputs, [default_output(path) for path in inputs])
+
+
+def test_output_may_not_overwrite_an_input(tmp_path):
+    inputs = [str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')]
+    with pytest.raises(SystemExit, match="overwrite an input"):
+        check_outputs(inputs, [inputs[1], default_output(inputs[1])])
+
+
+def test_distinct_outputs_are_accepted(tmp_path):
+    inputs = [str(tmp_path / 'a.csv'), str(tmp_path / 'b.npy')]
+    check_outputs(inputs, [default_output(path) for path in inputs])
@@ -0,0 +1,89 @@
+"""CompiledTree must predict exactly what the DecisionTreeClassifier it was built from does."""
+import numpy as np
+import pytest
+from sklearn.datasets import load_iris
+from sklearn.tree import DecisionTreeClassifier
+
+from fast_tree import GEMM_MAX_SPLITS, CompiledTree, load_binary_artifact, save_binary_artifact
+
+
+def iris_tree(seed=0):
+    iris = load_iris()
+    return DecisionTreeClassifier(random_state=seed).fit(iris.data, iris.target)
+
+
+def large_tree():
+    """A tree with more splits than the leaf-matching matrix allows, to cover the level walk"""
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(4000, 4))
+    y = rng.integers(0, 3, size=len(X))
+    return DecisionTreeClassifier(random_state=0).fit(X, y)
+
+
+def boundary_rows(clf, base):
+    """Rows sitting exactly on, and one float32 step either side of, every split threshold"""
+    tree = clf.tree_
+    rows = []
+    for feature, threshold in zip(tree.feature, tree.threshold):
+        if feature < 0:
+            continue
+        t32 = np.float32(threshold)
+        for value in (threshold, t32, np.nextafter(t32, np.float32(-np.inf)),
+                      np.nextafter(t32, np.float32(np.inf))):
+            row = base.copy()
+            row[feature] = value
+            rows.append(row)
+    return np.asarray(rows, dtype=np.float64)
+
+
+def random_rows(n, seed=0):
+    iris = load_iris()
+    rng = np.random.default_rng(seed)
+    return rng.uniform(iris.data.min(axis=0) - 1, iris.data.max(axis=0) + 1, size=(n, 4))
+
+
+def assert_parity(clf, compiled, X):
+    expected = clf.predict_proba(X)
+    np.testing.assert_array_equal(compiled.predict(X), clf.predict(X))
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(compiled.apply(X), clf.apply(X))
+    for row, expected_row in zip(X[:200], expected[:200]):
+        assert compiled.predict_one(row) == clf.predict(row.reshape(1, -1))[0]
+        np.testing.assert_allclose(compiled.predict_proba_one(row), expected_row, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_matches_sklearn_on_iris_and_random_rows(seed):
+    clf = iris_tree(seed)
+    compiled = CompiledTree.from_estimator(clf)
+    assert_parity(clf, compiled, load_iris().data)
+    assert_parity(clf, compiled, random_rows(20000, seed))
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_matches_sklearn_at_float32_thresholds(seed):
+    clf = iris_tree(seed)
+    X = boundary_rows(clf, load_iris().data.mean(axis=0))
+    assert_parity(clf, CompiledTree.from_estimator(clf), X)
+
+
+def test_matches_sklearn_on_a_tree_too_large_for_the_leaf_matrix():
+    clf = large_tree()
+    compiled = CompiledTree.from_estimator(clf)
+    assert len(compiled._splits) > GEMM_MAX_SPLITS
+    X = np.vstack([np.random.default_rng(2).normal(size=(5000, 4)), boundary_rows(clf, np.zeros(4))])
+    assert_parity(clf, compiled, X)
+
+
+def test_binary_artifact_round_trip(tmp_path):
+    clf = iris_tree()
+    path = tmp_path / 'model.iristree'
+    save_binary_artifact(CompiledTree.from_estimator(clf), load_iris().target_names, str(path))
+    loaded, target_names = load_binary_artifact(str(path))
+    assert list(target_names) == list(load_iris().target_names)
+    assert_parity(clf, loaded, random_rows(5000))
+
+
+def test_rejects_models_that_are_not_single_trees():
+    with pytest.raises(TypeError):
+        CompiledTree.from_estimator(object())
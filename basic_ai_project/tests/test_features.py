@@ -0,0 +1,64 @@
+"""Parsing of the JSON rows and CSV bodies accepted by the API and bulk_score."""
+import numpy as np
+import pytest
+
+from features import (FEATURE_NAMES, csv_feature_order, is_csv_header, parse_csv_block, parse_csv_rows,
+                      parse_feature_rows)
+
+
+def test_csv_block_keeps_one_row_per_line():
+    X, errors = parse_csv_block('5.1,3.5,1.4,0.2\n\n6.2,2.9,4.3,1.3\r\n \n')
+    assert X.shape == (4, 4)
+    np.testing.assert_array_equal(X[[0, 2]], [[5.1, 3.5, 1.4, 0.2], [6.2, 2.9, 4.3, 1.3]])
+    assert errors == {1: ["Empty line"], 3: ["Empty line"]}
+
+
+def test_csv_block_reports_malformed_lines_in_place():
+    X, errors = parse_csv_block('x,1,2,3\n5.1,3.5,1.4,0.2')
+    assert list(errors) == [0]
+    np.testing.assert_array_equal(X[1], [5.1, 3.5, 1.4, 0.2])
+
+
+def test_csv_block_reorders_columns():
+    X, errors = parse_csv_block('0.2,1.4,3.5,5.1\n', order=[3, 2, 1, 0])
+    assert errors == {}
+    np.testing.assert_array_equal(X, [[5.1, 3.5, 1.4, 0.2]])
+
+
+@pytest.mark.parametrize('row', [
+    FEATURE_NAMES,
+    [' petal_width', 'petal_length', 'sepal_width', 'sepal_length\r'],
+    ['id', 'sepal_length', 'sepal_width', 'petal_length', 'petal_width'],
+])
+def test_header_names_a_feature(row):
+    assert is_csv_header(row)
+
+
+@pytest.mark.parametrize('row', [
+    ['5.1', '3.5', '1.4', '0.2'],
+    ['', '3.5', '1.4', '0.2'],
+    ['n/a', '3.5', '1.4', '0.2'],
+    [''],
+])
+def test_data_row_with_a_bad_first_field_is_not_a_header(row):
+    assert not is_csv_header(row)
+
+
+def test_headerless_body_keeps_a_first_row_missing_a_value():
+    rows = parse_csv_rows(',3.5,1.4,0.2\n6.2,2.9,4.3,1.3\n')
+    assert rows == [['', '3.5', '1.4', '0.2'], ['6.2', '2.9', '4.3', '1.3']]
+
+
+def test_header_order_is_applied():
+    header = ['petal_width', 'petal_length', 'sepal_width', 'sepal_length']
+    assert csv_feature_order(header) == [3, 2, 1, 0]
+    assert parse_csv_rows(','.join(header) + '\n0.2,1.4,3.5,5.1\n') == [['5.1', '3.5', '1.4', '0.2']]
+
+
+def test_json_null_and_booleans_are_not_numbers():
+    X, errors = parse_feature_rows([[None, 3.5, 1.4, 0.2], [5.1, True, 1.4, 0.2], [5.1, 3.5, 1.4, 0.2],
+                                    {'sepal_length': 5.1, 'sepal_width': 3.5, 'petal_length': None,
+                                     'petal_width': 0.2}])
+    assert errors == {0: ["Missing value"], 1: ["Expected a number, got true"], 3: ["Missing value"]}
+    np.testing.assert_array_equal(X[2], [5.1, 3.5, 1.4, 0.2])
+    assert np.isnan(X[[0, 1, 3]]).all()
@@ -0,0 +1,50 @@
+"""Memory accounting of the registry's loaded-model LRU."""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from conftest import PROJECT_DIR
+from model_registry import ModelRegistry
+from neighbors import save_reference_set
+
+
+@pytest.fixture
+def registry_root(tmp_path):
+    if not os.path.exists(os.path.join(PROJECT_DIR, 'model.iristree')):
+        pytest.skip("run main.py to train the model first")
+    rng = np.random.default_rng(0)
+    for name, rows in (('small', 10), ('large', 50_000)):
+        directory = tmp_path / name / 'v1'
+        directory.mkdir(parents=True)
+        shutil.copy(os.path.join(PROJECT_DIR, 'model.iristree'), directory)
+        save_reference_set(rng.random((rows, 4)), rng.integers(0, 3, rows), ['a', 'b', 'c'],
+                           str(directory / 'reference_set.npz'))
+    return str(tmp_path)
+
+
+def test_neighbour_index_is_counted_once_built(registry_root):
+    pytest.importorskip('sklearn')
+    registry = ModelRegistry(registry_root, max_bytes=1024 * 1024, model_filename='model.iristree',
+                             artifact='binary', neighbors=True)
+    registry.get('small')
+    snapshot = registry.get('large')
+    before = registry.nbytes
+    assert before < registry.max_bytes
+
+    assert snapshot.neighbors is not None
+    stats = registry.stats()
+    # 50k float64 rows alone are 1.6 MB, so the small model has to make room
+    assert stats['cached_bytes'] > before + 50_000 * 4 * 8
+    assert [entry['model'] for entry in stats['cached']] == ['large@v1']
+    assert stats['evictions'] == 1
+
+
+def test_index_built_after_eviction_is_not_counted(registry_root):
+    pytest.importorskip('sklearn')
+    registry = ModelRegistry(registry_root, model_filename='model.iristree', artifact='binary', neighbors=True)
+    snapshot = registry.get('large')
+    registry.clear()
+    assert snapshot.neighbors is not None
+    assert registry.nbytes == 0
@@ -0,0 +1,52 @@
+"""Hot reload bookkeeping of ModelStore."""
+import threading
+import types
+
+import model_store
+from model_store import ModelStore
+
+
+class BlockingStore(ModelStore):
+    """A store whose loads wait for release and produce a new version each time"""
+
+    def __init__(self):
+        super().__init__('model.pkl', 'target_names.pkl')
+        self.release = threading.Event()
+        self.loads = 0
+
+    def _load(self):
+        self.loads += 1
+        self.release.wait(5)
+        return types.SimpleNamespace(fingerprint=(0, 0, str(self.loads)), version=str(self.loads))
+
+
+def test_only_one_background_reload_runs_at_a_time(monkeypatch):
+    store = BlockingStore()
+    started = []
+    start_thread = threading.Thread.start
+
+    class DeferredThread(threading.Thread):
+        """Holds back the reload threads until every caller has asked for one"""
+
+        def start(self):
+            started.append(self)
+
+    monkeypatch.setattr(model_store.threading, 'Thread', DeferredThread)
+    results = [store.reload_in_background() for _ in range(8)]
+    assert results == [True] + [False] * 7
+
+    store.release.set()
+    for thread in started:
+        start_thread(thread)
+        thread.join()
+    assert store.loads == 1 and store.reloads == 1
+    assert not store._reload_lock.locked()
+
+
+def test_failed_background_reload_releases_the_lock():
+    store = BlockingStore()
+    store._load = lambda: 1 / 0
+    assert store.reload_in_background()
+    with store._reload_lock:
+        assert store.last_error.startswith('ZeroDivisionError')
+    assert store.reload_in_background()
@@ -0,0 +1,71 @@
+"""Row numbering and admission of the streamed /api/score_csv endpoint.
+
+The app is imported in a fresh interpreter so its environment-driven
+settings (a two-line chunk here) apply.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PROJECT_DIR
+
+CHECK = """
+import sys
+import app
+body = sys.stdin.read()
+print(app.app.test_client().post('/api/score_csv', data=body, content_type='text/csv').get_data(as_text=True),
+      end='')
+"""
+
+ADMISSION_CHECK = """
+import app
+client = app.app.test_client()
+response = client.post('/api/score_csv', data='5.1,3.5,1.4,0.2\\n' * 5, content_type='text/csv', buffered=False)
+chunks = iter(response.response)
+next(chunks)
+print('streaming', app.admission.stats()['in_flight'],
+      client.post('/api/predict_batch', json=[[5.1, 3.5, 1.4, 0.2]]).status_code)
+list(chunks)
+response.close()
+print('closed', app.admission.stats()['in_flight'],
+      client.post('/api/predict_batch', json=[[5.1, 3.5, 1.4, 0.2]]).status_code)
+"""
+
+
+def run_app(script, body='', **settings):
+    if not os.path.exists(os.path.join(PROJECT_DIR, 'model.iristree')):
+        pytest.skip("model.iristree not built; run main.py")
+    env = dict(os.environ, IRIS_SERVING_MODE='binary', IRIS_STREAM_CHUNK_ROWS='2', **settings)
+    result = subprocess.run([sys.executable, '-c', script], cwd=PROJECT_DIR, env=env, input=body,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def score_csv(body):
+    lines = run_app(CHECK, body).splitlines()
+    # Startup messages come first
+    start = lines.index('row,prediction,confidence,error')
+    return [line.split(',', 3) for line in lines[start + 1:]]
+
+
+def test_rows_match_data_lines_across_blank_and_bad_lines():
+    rows = score_csv('petal_width,petal_length,sepal_width,sepal_length\r\n'
+                     '0.2,1.4,3.5,5.1\r\n\r\nfoo,1,2,3\r\n \r\n1.5,4.5,2.9,6')
+    assert [row[0] for row in rows] == ['0', '1', '2', '3', '4']
+    assert rows[0][1] == 'setosa' and rows[4][1] == 'versicolor'
+    assert rows[1][3] == '"Empty line"' and rows[3][3] == '"Empty line"'
+    assert 'foo' in rows[2][3]
+
+
+def test_trailing_newline_adds_no_row():
+    assert len(score_csv('5.1,3.5,1.4,0.2\n6,2.9,4.5,1.5\n')) == 2
+
+
+def test_streamed_upload_holds_its_admission_slot_until_sent():
+    output = run_app(ADMISSION_CHECK, IRIS_ADMISSION='1', IRIS_ADMISSION_MAX_IN_FLIGHT='1',
+                     IRIS_ADMISSION_MAX_QUEUE='0')
+    assert 'streaming 1 503' in output
+    assert 'closed 0 200' in output
@@ -0,0 +1,39 @@
+"""The 'binary' and 'mmap' serving modes answer predictions without sklearn.
+
+Each check imports the app in a fresh interpreter, because this test
+process may already have imported sklearn.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PROJECT_DIR
+
+CHECK = """
+import json, sys
+import app
+client = app.app.test_client()
+response = client.post('/api/predict_batch', json=[[5.1, 3.5, 1.4, 0.2]])
+print(json.dumps({
+    "loaded": app.store.current is not None,
+    "status": response.status_code,
+    "sklearn": sorted(name for name in sys.modules if name.split('.')[0] == 'sklearn'),
+}))
+"""
+
+
+@pytest.mark.parametrize('mode, artifact', [('binary', 'model.iristree'), ('mmap', 'model_arrays.joblib')])
+def test_serving_mode_does_not_import_sklearn(mode, artifact):
+    if not os.path.exists(os.path.join(PROJECT_DIR, artifact)):
+        pytest.skip(f"{artifact} not built; run main.py")
+    env = dict(os.environ, IRIS_SERVING_MODE=mode, IRIS_MODEL_PRELOAD='1')
+    result = subprocess.run([sys.executable, '-c', CHECK], cwd=PROJECT_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report["loaded"]
+    assert report["status"] == 200
+    assert report["sklearn"] == []
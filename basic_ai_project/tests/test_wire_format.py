@@ -0,0 +1,51 @@
+"""Decoding of the binary request bodies accepted by /api/predict_batch."""
+import numpy as np
+import pytest
+
+from wire_format import (FLOAT32_MIMETYPE, MSGPACK_MIMETYPES, WireFormatError, decode_matrix,
+                         decode_request, encode_probabilities)
+
+
+def test_float32_body_is_viewed_without_copying():
+    X = np.arange(8, dtype='<f4').reshape(2, 4)
+    body = X.tobytes()
+    decoded, rows = decode_request(FLOAT32_MIMETYPE, body, 4)
+    assert rows is None
+    np.testing.assert_array_equal(decoded, X)
+    assert not decoded.flags.owndata
+
+
+def test_partial_rows_are_rejected():
+    with pytest.raises(WireFormatError, match="whole number"):
+        decode_matrix(b'\0' * 12, 4)
+
+
+def test_unknown_dtype_is_rejected():
+    with pytest.raises(WireFormatError, match="Unsupported dtype"):
+        decode_matrix(b'\0' * 16, 4, dtype='<i4')
+
+
+def test_msgpack_matrix_and_rows():
+    msgpack = pytest.importorskip('msgpack')
+    X = np.arange(8, dtype='<f8').reshape(2, 4)
+    decoded, rows = decode_request(MSGPACK_MIMETYPES[0], msgpack.packb({'data': X.tobytes(), 'dtype': '<f8'}), 4)
+    np.testing.assert_array_equal(decoded, X)
+    decoded, rows = decode_request(MSGPACK_MIMETYPES[0], msgpack.packb({'instances': X.tolist()}), 4)
+    assert decoded is None and rows == X.tolist()
+
+
+@pytest.mark.parametrize('body', [b'', b'\xc1', b'\x01\x02'])
+def test_invalid_msgpack_error_always_names_the_problem(body):
+    pytest.importorskip('msgpack')
+    with pytest.raises(WireFormatError) as excinfo:
+        decode_request(MSGPACK_MIMETYPES[0], body, 4)
+    detail = str(excinfo.value).split('Invalid MessagePack body:', 1)[1]
+    assert detail.strip()
+
+
+def test_float32_response_round_trips():
+    probabilities = np.array([[0.25, 0.75, 0.0], [np.nan, np.nan, np.nan]])
+    body = encode_probabilities(probabilities, FLOAT32_MIMETYPE, ['a', 'b', 'c'],
+                                np.array([True, False]), {1: ['bad']})
+    np.testing.assert_array_equal(np.frombuffer(body, dtype='<f4').reshape(2, 3),
+                                  probabilities.astype('<f4'))
@@ -0,0 +1,162 @@
+"""Hyperparameter search for the decision tree with on-disk cross-validation cache.
+
+``python main.py tune`` grid- or random-searches max_depth,
+min_samples_leaf and criterion with stratified k-fold cross-validation.
+Dataset loading and every (parameters, fold) fit go through
+``joblib.Memory``, so a re-run with an overlapping grid only fits the
+configurations it has not seen; the remaining folds run in parallel
+across all cores with ``joblib.Parallel``.
+
+    python main.py tune
+    python main.py tune --search random --n-iter 20 --max-depth 3 4 5 none
+"""
+import json
+import time
+
+import numpy as np
+
+from evaluation import RANDOM_STATE, TEST_SIZE
+
+DEFAULT_CACHE_DIR = '.tuning_cache'
+DEFAULT_REPORT = 'tuning_report.json'
+
+DEFAULT_GRID = {
+    'max_depth': [None, 2, 3, 4, 5, 6, 8],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'criterion': ['gini', 'entropy', 'log_loss'],
+}
+
+
+def load_dataset():
+    """Iris split into train/test exactly as main.py's default training splits it"""
+    from sklearn.datasets import load_iris
+    from sklearn.model_selection import train_test_split
+
+    iris = load_iris()
+    X_train, X_test, y_train, y_test = train_test_split(iris.data, iris.target,
+                                                        test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    return X_train, X_test, y_train, y_test, iris.target_names
+
+
+def fit_fold(X, y, params, n_splits, fold):
+    """Fit and score one cross-validation fold; returns (tree, accuracy, fit seconds)"""
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.tree import DecisionTreeClassifier
+
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=RANDOM_STATE)
+    train_index, test_index = list(folds.split(X, y))[fold]
+    started = time.perf_counter()
+    clf = DecisionTreeClassifier(random_state=RANDOM_STATE, **params).fit(X[train_index], y[train_index])
+    fit_seconds = time.perf_counter() - started
+    return clf, float(clf.score(X[test_index], y[test_index])), fit_seconds
+
+
+def candidates(grid, search='grid', n_iter=20):
+    """Parameter dicts to evaluate: the full grid, or n_iter distinct samples from it"""
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+    if search == 'random':
+        n_iter = min(n_iter, len(ParameterGrid(grid)))
+        return list(ParameterSampler(grid, n_iter=n_iter, random_state=RANDOM_STATE))
+    return list(ParameterGrid(grid))
+
+
+def search(X, y, configs, n_splits=5, n_jobs=-1, cache_dir=DEFAULT_CACHE_DIR):
+    """Cross-validate every config; returns per-config results ranked best first"""
+    from joblib import Memory, Parallel, delayed
+
+    fit = Memory(cache_dir, verbose=0).cache(fit_fold)
+    jobs = [(i, fold) for i in range(len(configs)) for fold in range(n_splits)]
+    cached = {job for job in jobs if fit.check_call_in_cache(X, y, configs[job[0]], n_splits, job[1])}
+    missing = [job for job in jobs if job not in cached]
+
+    fitted = dict(zip(missing, Parallel(n_jobs=n_jobs)(
+        delayed(fit)(X, y, configs[i], n_splits, fold) for i, fold in missing)))
+    for i, fold in cached:
+        fitted[i, fold] = fit(X, y, configs[i], n_splits, fold)
+
+    results = []
+    for i, params in enumerate(configs):
+        scores = [fitted[i, fold][1] for fold in range(n_splits)]
+        results.append({
+            "params": params,
+            "mean_score": round(float(np.mean(scores)), 4),
+            "std_score": round(float(np.std(scores)), 4),
+            "fold_scores": [round(score, 4) for score in scores],
+            "fit_seconds": round(sum(fitted[i, fold][2] for fold in range(n_splits)), 4),
+            "cached_folds": sum((i, fold) in cached for fold in range(n_splits)),
+        })
+    # Ties go to the steadier config, then to the earlier one in grid order
+    order = sorted(range(len(results)), key=lambda i: (-results[i]["mean_score"], results[i]["std_score"], i))
+    ranked = [results[i] for i in order]
+    for rank, result in enumerate(ranked, start=1):
+        result["rank"] = rank
+    return ranked, len(cached)
+
+
+def add_arguments(parser):
+    def depth(value):
+        return None if value.lower() == 'none' else int(value)
+
+    parser.add_argument('--search', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--n-iter', type=int, default=20, help="configurations to sample with --search random")
+    parser.add_argument('--cv', type=int, default=5, help="cross-validation folds")
+    parser.add_argument('--jobs', type=int, default=-1, help="parallel fits (-1 = all cores)")
+    parser.add_argument('--max-depth', type=depth, nargs='+', default=DEFAULT_GRID['max_depth'],
+                        help="depths to try ('none' for unlimited)")
+    parser.add_argument('--min-samples-leaf', type=int, nargs='+', default=DEFAULT_GRID['min_samples_leaf'])
+    parser.add_argument('--criterion', nargs='+', default=DEFAULT_GRID['criterion'],
+                        choices=DEFAULT_GRID['criterion'])
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="joblib.Memory cache location")
+    parser.add_argument('--report', default=DEFAULT_REPORT, help="where to write the JSON report")
+    parser.add_argument('--top', type=int, default=10, help="configurations to print")
+
+
+def run(args):
+    """Search, refit the best config on the training split and report.
+
+    Returns (model, target_names, X_train, y_train).
+    """
+    from joblib import Memory
+    from sklearn.tree import DecisionTreeClassifier
+
+    started = time.perf_counter()
+    load = Memory(args.cache_dir, verbose=0).cache(load_dataset)
+    X_train, X_test, y_train, y_test, target_names = load()
+
+    grid = {'max_depth': args.max_depth, 'min_samples_leaf': args.min_samples_leaf,
+            'criterion': args.criterion}
+    configs = candidates(grid, args.search, args.n_iter)
+    ranked, cached_fits = search(X_train, y_train, configs, n_splits=args.cv, n_jobs=args.jobs,
+                                 cache_dir=args.cache_dir)
+
+    best = ranked[0]
+    clf = DecisionTreeClassifier(random_state=RANDOM_STATE, **best["params"]).fit(X_train, y_train)
+    test_accuracy = float(clf.score(X_test, y_test))
+    wall_seconds = time.perf_counter() - started
+
+    report = {
+        "search": args.search,
+        "cv_folds": args.cv,
+        "grid": grid,
+        "configurations": len(configs),
+        "fits": len(configs) * args.cv,
+        "cached_fits": cached_fits,
+        "wall_seconds": round(wall_seconds, 3),
+        "best": {"params": best["params"], "mean_score": best["mean_score"],
+                 "test_accuracy": round(test_accuracy, 4)},
+        "results": ranked,
+    }
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"🔎 {len(configs)} configurations x {args.cv} folds: "
+          f"{report['fits'] - cached_fits} fitted, {cached_fits} from cache, {wall_seconds:.2f}s")
+    print(f"{'rank':>4} {'cv score':>9} {'std':>7} {'fit ms':>8} {'cached':>6}  params")
+    for result in ranked[:args.top]:
+        print(f"{result['rank']:>4} {result['mean_score']:>9.4f} {result['std_score']:>7.4f} "
+              f"{result['fit_seconds'] * 1000:>8.2f} {result['cached_folds']:>3}/{args.cv}  {result['params']}")
+    print(f"🏆 Best: {best['params']} (cv {best['mean_score']:.4f})")
+    print(f"Model Accuracy: {test_accuracy:.2f}")
+    print(f"📝 Report written to {args.report}")
+    return clf, target_names, X_train, y_train
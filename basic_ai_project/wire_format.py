@@ -0,0 +1,87 @@
+"""Binary request and response encodings for the batch prediction API.
+
+Machine clients can skip JSON by sending either
+
+* ``application/octet-stream``: a raw row-major matrix of little-endian
+  float32, four values per row, or
+* ``application/msgpack``: ``{"data": <bin>, "dtype": "<f4"}`` with the
+  same raw matrix (``"<f8"`` is accepted too), or a plain list of rows.
+
+Raw matrices are wrapped with ``np.frombuffer`` rather than copied, and
+responses in either format carry the class probabilities as a raw
+float32 matrix. msgpack is optional and only imported when used.
+"""
+import numpy as np
+
+FLOAT32_MIMETYPE = 'application/octet-stream'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+JSON_MIMETYPE = 'application/json'
+
+# Response types in order of preference when the client accepts several equally
+RESPONSE_MIMETYPES = (JSON_MIMETYPE, FLOAT32_MIMETYPE) + MSGPACK_MIMETYPES
+
+MATRIX_DTYPES = ('<f4', '<f8')
+
+
+class WireFormatError(ValueError):
+    """The request body could not be decoded"""
+
+
+def is_binary_mimetype(mimetype):
+    return mimetype == FLOAT32_MIMETYPE or mimetype in MSGPACK_MIMETYPES
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise WireFormatError("MessagePack support requires the msgpack package (pip install msgpack)")
+    return msgpack
+
+
+def decode_matrix(body, n_features, dtype='<f4'):
+    """View a raw little-endian matrix as an (n, n_features) array without copying"""
+    if dtype not in MATRIX_DTYPES:
+        raise WireFormatError(f"Unsupported dtype {dtype!r}, expected one of {MATRIX_DTYPES}")
+    row_bytes = np.dtype(dtype).itemsize * n_features
+    if len(body) % row_bytes:
+        raise WireFormatError(f"Body of {len(body)} bytes is not a whole number of "
+                              f"{n_features}-value {dtype} rows")
+    return np.frombuffer(body, dtype=dtype).reshape(-1, n_features)
+
+
+def decode_request(mimetype, body, n_features):
+    """Decode a binary request body.
+
+    Returns (X, None) for raw matrices, or (None, rows) when a msgpack
+    body holds ordinary rows, which still need parse_feature_rows.
+    """
+    if mimetype == FLOAT32_MIMETYPE:
+        return decode_matrix(body, n_features), None
+    msgpack = _msgpack()
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except (ValueError, TypeError) as e:
+        raise WireFormatError(f"Invalid MessagePack body: {str(e) or type(e).__name__}")
+    if isinstance(payload, dict) and isinstance(payload.get('data'), bytes):
+        return decode_matrix(payload['data'], n_features, payload.get('dtype', '<f4')), None
+    rows = payload.get('instances') if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        raise WireFormatError("Expected {\"data\": <bin>}, a list of rows or {\"instances\": [...]}")
+    return None, rows
+
+
+def encode_probabilities(probabilities, mimetype, classes, valid, errors):
+    """Response body for a (n, n_classes) probability matrix; NaN rows were not scored"""
+    data = np.ascontiguousarray(probabilities, dtype='<f4')
+    if mimetype == FLOAT32_MIMETYPE:
+        return data.tobytes()
+    return _msgpack().packb({
+        "count": len(data),
+        "valid": int(valid.sum()),
+        "classes": [str(name) for name in classes],
+        "shape": list(data.shape),
+        "dtype": '<f4',
+        "probabilities": data.tobytes(),
+        "errors": [{"row": i, "errors": errors[i]} for i in sorted(errors)],
+    })
@@ -4,6 +4,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import pandas as pd
 from ortools.sat.python import cp_model
 import os
+from workbook_cache import WorkbookCache, write_excel_atomic
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your_secret_key_here'
@@ -14,6 +15,12 @@ login_manager.login_view = 'login'
 
 EXCEL_DATA_FILE = 'data.xlsx'
 EXCEL_TIMETABLE_FILE = 'timetable.xlsx'
+# Columnar copy of data.xlsx for cold starts: '', 'parquet', 'feather' or 'pickle'
+EXCEL_SIDECAR_FORMAT = os.environ.get('EXCEL_SIDECAR_FORMAT', '')
+# Journaled rows that trigger a background merge into data.xlsx (0: only on demand)
+EXCEL_JOURNAL_COMPACT_ROWS = int(os.environ.get('EXCEL_JOURNAL_COMPACT_ROWS', '500'))
+
+workbook = WorkbookCache(EXCEL_DATA_FILE, EXCEL_SIDECAR_FORMAT, compact_rows=EXCEL_JOURNAL_COMPACT_ROWS)
 
 USERS = {
     'admin': {'password': generate_password_hash('admin123'), 'role': 'admin'},
@@ -35,24 +42,19 @@ def load_user(user_id):
     return None
 
 def load_excel_sheets():
-    if not os.path.exists(EXCEL_DATA_FILE):
+    dfs = workbook.load()
+    if dfs is None:
         dfs = {
             'Faculty': pd.DataFrame(columns=['ID', 'Name', 'Department', 'Availability', 'Max_Load']),
             'Classroom': pd.DataFrame(columns=['ID', 'Name', 'Capacity', 'Type']),
             'Subject': pd.DataFrame(columns=['ID', 'Name', 'Department', 'Credits', 'Weekly_Classes']),
             'Batch': pd.DataFrame(columns=['ID', 'Program', 'Semester', 'Students'])
         }
-        with pd.ExcelWriter(EXCEL_DATA_FILE) as writer:
-            for sheet, df in dfs.items():
-                df.to_excel(writer, sheet_name=sheet, index=False)
-        return dfs
-    xls = pd.ExcelFile(EXCEL_DATA_FILE)
-    return {sheet: xls.parse(sheet) for sheet in xls.sheet_names}
+        save_excel_sheets(dfs)
+    return dfs
 
 def save_excel_sheets(dfs):
-    with pd.ExcelWriter(EXCEL_DATA_FILE) as writer:
-        for sheet, df in dfs.items():
-            df.to_excel(writer, sheet_name=sheet, index=False)
+    workbook.store(dfs)
 
 BASE_TEMPLATE = '''
 <!DOCTYPE html>
@@ -153,6 +155,7 @@ def dashboard():
         <p><a href="/add_entity/classroom">Add Classroom</a></p>
         <p><a href="/add_entity/subject">Add Subject</a></p>
         <p><a href="/add_entity/batch">Add Batch</a></p>
+        <form method="post" action="/compact_data"><button type="submit">Merge Pending Rows into data.xlsx</button></form>
         '''
     content += '''
     <p><a href="/view_data">View All Data</a></p>
@@ -173,10 +176,8 @@ def add_entity(entity):
         flash('Unknown entity')
         return redirect(url_for('dashboard'))
     if request.method == 'POST':
-        new_id = int(df['ID'].max() or 0) + 1 if not df.empty else 1
         if entity == 'faculty':
             row = {
-                'ID': new_id,
                 'Name': request.form['name'],
                 'Department': request.form['department'],
                 'Availability': request.form.get('availability', ''),
@@ -184,14 +185,12 @@ def add_entity(entity):
             }
         elif entity == 'classroom':
             row = {
-                'ID': new_id,
                 'Name': request.form['name'],
                 'Capacity': int(request.form['capacity']),
                 'Type': request.form['type']
             }
         elif entity == 'subject':
             row = {
-                'ID': new_id,
                 'Name': request.form['name'],
                 'Department': request.form['department'],
                 'Credits': int(request.form['credits']),
@@ -199,7 +198,6 @@ def add_entity(entity):
             }
         elif entity == 'batch':
             row = {
-                'ID': new_id,
                 'Program': request.form['program'],
                 'Semester': int(request.form['semester']),
                 'Students': int(request.form['students'])
@@ -207,9 +205,8 @@ def add_entity(entity):
         else:
             flash('Entity not supported')
             return redirect(url_for('dashboard'))
-        df.loc[len(df)] = row
-        dfs[entity.capitalize()] = df
-        save_excel_sheets(dfs)
+        # Journaled, not a rewrite of data.xlsx; the ID is assigned under the journal lock
+        workbook.append(entity.capitalize(), row)
         flash(f'{entity.capitalize()} added successfully')
         return redirect(url_for('add_entity', entity=entity))
     fields = {
@@ -228,6 +225,19 @@ def add_entity(entity):
     '''
     return render_template_string(BASE_TEMPLATE, title=f'Add {entity.capitalize()}', content=content)
 
+@app.route('/compact_data', methods=['POST'])
+@login_required
+def compact_data():
+    if current_user.role != 'admin':
+        flash('Access denied')
+        return redirect(url_for('dashboard'))
+    merged = workbook.compact()
+    if merged is None:
+        flash('A merge is already running')
+    else:
+        flash(f'Merged {merged} pending rows into {EXCEL_DATA_FILE}')
+    return redirect(url_for('dashboard'))
+
 @app.route('/view_data')
 @login_required
 def view_data():
@@ -288,7 +298,7 @@ def generate_timetable():
                             'Classroom_ID': classrooms['ID'].iloc[0] if not classrooms.empty else 1
                         })
         timetable_df = pd.DataFrame(timetable_rows)
-        timetable_df.to_excel(EXCEL_TIMETABLE_FILE, index=False)
+        write_excel_atomic(EXCEL_TIMETABLE_FILE, {'Sheet1': timetable_df})
         flash('Timetable generated and saved to Excel')
     else:
         flash('No feasible timetable found')
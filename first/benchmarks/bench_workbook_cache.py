@@ -0,0 +1,116 @@
+"""Sheet loading time with and without the workbook cache.
+
+Writes a data.xlsx with --rows rows in each of the four sheets to a
+temporary directory, then times
+    xlsx        a full openpyxl parse, what every page did before the cache
+    cached      WorkbookCache.load() with the sheets in memory (stat + copy)
+    <format>    a cold WorkbookCache.load() served from that sidecar format
+    store       WorkbookCache.store(), a full atomic rewrite of the workbook
+    append      WorkbookCache.append(), the journaled insert behind add_entity
+    compact     merging --appends journaled rows into the workbook
+Sidecar formats whose library is not installed are skipped.
+
+    python benchmarks/bench_workbook_cache.py
+    python benchmarks/bench_workbook_cache.py --rows 50000 --formats pickle parquet
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from workbook_cache import SIDECAR_FORMATS, WorkbookCache  # noqa: E402
+
+
+def make_sheets(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+    departments = np.array(['CSE', 'ECE', 'ME', 'CE', 'EEE'])
+    return {
+        'Faculty': pd.DataFrame({'ID': ids, 'Name': [f'Faculty {i}' for i in ids],
+                                 'Department': rng.choice(departments, rows),
+                                 'Availability': rng.choice(['Mon-Fri', 'Mon-Wed', 'Thu-Fri'], rows),
+                                 'Max_Load': rng.integers(10, 24, rows)}),
+        'Classroom': pd.DataFrame({'ID': ids, 'Name': [f'Room {i}' for i in ids],
+                                   'Capacity': rng.integers(20, 200, rows),
+                                   'Type': rng.choice(['Lecture', 'Lab'], rows)}),
+        'Subject': pd.DataFrame({'ID': ids, 'Name': [f'Subject {i}' for i in ids],
+                                 'Department': rng.choice(departments, rows),
+                                 'Credits': rng.integers(1, 5, rows),
+                                 'Weekly_Classes': rng.integers(1, 6, rows)}),
+        'Batch': pd.DataFrame({'ID': ids, 'Program': rng.choice(['BTech', 'MTech', 'MBA'], rows),
+                               'Semester': rng.integers(1, 9, rows), 'Students': rng.integers(20, 120, rows)}),
+    }
+
+
+def time_call(fn, repeat, before=None):
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return round(float(np.median(timings)) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workbook cache and sidecar load times")
+    parser.add_argument('--rows', type=int, default=10000, help="rows per sheet")
+    parser.add_argument('--formats', nargs='+', default=list(SIDECAR_FORMATS), choices=list(SIDECAR_FORMATS))
+    parser.add_argument('--repeat', type=int, default=3, help="timed calls per mode (median reported)")
+    parser.add_argument('--appends', type=int, default=200, help="journaled rows timed, then compacted")
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    sheets = make_sheets(args.rows)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.xlsx')
+        cache = WorkbookCache(path, compact_rows=0)
+        results.append(("store", time_call(lambda: cache.store(sheets), args.repeat)))
+        size = os.path.getsize(path)
+        results.append(("xlsx", time_call(cache.load, args.repeat, before=cache.invalidate)))
+        cache.load()
+        results.append(("cached", time_call(cache.load, max(args.repeat, 100))))
+
+        rows = iter(range(args.appends))
+        results.append(("append", time_call(lambda: cache.append('Faculty', {'Name': f'New {next(rows)}'}),
+                                            args.appends)))
+        started = time.perf_counter()
+        merged = cache.compact()
+        results.append(("compact", round((time.perf_counter() - started) * 1000, 3)))
+        if merged != args.appends or len(WorkbookCache(path).load()['Faculty']) != args.rows + args.appends:
+            raise AssertionError("compaction lost journaled rows")
+
+        expected = cache.load()
+        for fmt in args.formats:
+            writer = WorkbookCache(path, fmt)
+            writer.load()  # parses the xlsx and writes the sidecar
+            if writer.sidecar_format is None:
+                results.append((fmt, None))
+                continue
+            reader = WorkbookCache(path, fmt)
+            if any(not reader.load()[sheet].equals(df) for sheet, df in expected.items()):
+                raise AssertionError(f"{fmt} sidecar does not round-trip the sheets")
+            results.append((fmt, time_call(reader.load, args.repeat, before=reader.invalidate)))
+
+    if args.json:
+        print(json.dumps({"rows_per_sheet": args.rows, "xlsx_bytes": size,
+                          "modes": [{"mode": mode, "ms": ms} for mode, ms in results]}, indent=2))
+        return
+    print(f"4 sheets x {args.rows} rows; data.xlsx {size / 1e6:.1f} MB; median of {args.repeat}")
+    print(f"{'mode':<8} {'ms':>10}")
+    for mode, ms in results:
+        print(f"{mode:<8} {ms:>10.3f}" if ms is not None else f"{mode:<8} {'skipped':>10}")
+
+
+if __name__ == '__main__':
+    main()
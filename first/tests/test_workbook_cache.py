@@ -0,0 +1,92 @@
+"""Journal, compaction and cross-worker behaviour of WorkbookCache."""
+import multiprocessing
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from workbook_cache import WorkbookCache, write_excel_atomic
+
+COLUMNS = ['ID', 'Name', 'Department', 'Availability', 'Max_Load']
+
+
+def faculty(i, availability=''):
+    return {'Name': f'Faculty {i}', 'Department': 'CSE', 'Availability': availability, 'Max_Load': 18}
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'data.xlsx')
+    WorkbookCache(path).store({'Faculty': pd.DataFrame(columns=COLUMNS)})
+    return path
+
+
+def _append_from_worker(path, count, ids):
+    cache = WorkbookCache(path, compact_rows=0)
+    threads = [threading.Thread(target=lambda: [ids.append(cache.append('Faculty', faculty(i)))
+                                                for i in range(count)])
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_appends_never_share_an_id(path):
+    if not hasattr(os, 'fork'):
+        pytest.skip("needs fork")
+    context = multiprocessing.get_context('fork')
+    with context.Manager() as manager:
+        ids = manager.list()
+        workers = [context.Process(target=_append_from_worker, args=(path, 5, ids)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0
+        ids = list(ids)
+    assert sorted(ids) == list(range(1, 21))
+    assert sorted(WorkbookCache(path).load()['Faculty']['ID']) == list(range(1, 21))
+
+
+def test_load_sees_rows_appended_by_another_instance(path):
+    reader = WorkbookCache(path, compact_rows=0)
+    assert reader.load()['Faculty'].empty
+    writer = WorkbookCache(path, compact_rows=0)
+    new_id = writer.append('Faculty', faculty(1))
+    assert list(reader.load()['Faculty']['ID']) == [new_id]
+    writer.compact()
+    assert list(reader.load()['Faculty']['ID']) == [new_id]
+
+
+def test_journal_left_by_a_crashed_compaction_is_replayed_once(path):
+    cache = WorkbookCache(path, compact_rows=0)
+    for i in range(3):
+        cache.append('Faculty', faculty(i))
+    # Crash after the merged workbook was written but before the journal was removed
+    os.rename(cache.journal_path, cache.compacting_path)
+    write_excel_atomic(path, cache.load())
+
+    restarted = WorkbookCache(path, compact_rows=0)
+    assert list(restarted.load()['Faculty']['ID']) == [1, 2, 3]
+    assert restarted.append('Faculty', faculty(3)) == 4
+    assert restarted.compact() == 4
+    assert not os.path.exists(restarted.compacting_path)
+    assert list(WorkbookCache(path).load()['Faculty']['ID']) == [1, 2, 3, 4]
+
+
+def test_dtypes_match_before_and_after_compaction(path):
+    cache = WorkbookCache(path, compact_rows=0)
+    cache.append('Faculty', faculty(0))
+    cache.append('Faculty', faculty(1))
+    journaled = cache.load()['Faculty']
+    cache.compact()
+    pd.testing.assert_frame_equal(journaled, WorkbookCache(path).load()['Faculty'])
+
+    # A text value in a column that was all blanks turns it into a text column either way
+    cache.append('Faculty', faculty(2, availability='Mon-Fri'))
+    journaled = cache.load()['Faculty']
+    cache.compact()
+    pd.testing.assert_frame_equal(journaled, WorkbookCache(path).load()['Faculty'])
+    assert journaled['Availability'].iloc[-1] == 'Mon-Fri'
@@ -0,0 +1,439 @@
+"""Process-level cache of the sheets parsed from the data workbook.
+
+Parsing data.xlsx with openpyxl takes seconds once the sheets hold tens
+of thousands of rows, and every page used to do it. The parsed DataFrames
+are now kept in memory, keyed by the workbook's (mtime_ns, size, inode).
+A stat() per request is enough to notice that another worker, or a person
+with Excel, changed the file. store() writes the workbook and refreshes
+the cache in the same step. Callers get copies, so editing a returned
+DataFrame never changes the cached one.
+
+An optional columnar sidecar (EXCEL_SIDECAR_FORMAT: parquet, feather or
+pickle) keeps a copy of the sheets next to the workbook in
+<workbook>.cache/. A cold process or another worker reads it instead of
+the xlsx, provided its manifest carries the workbook's current stamp.
+Parquet and feather need pyarrow. pickle needs only pandas.
+
+New rows do not rewrite the workbook. append() writes one JSON line to
+<workbook>.journal, and readers serve the workbook plus the journal.
+compact() merges the journal into the workbook in the background once
+compact_rows rows are pending, or when called directly. It first renames
+the journal to .compacting, so appends carry on in a fresh journal while
+the merge runs. Every row carries its ID, and replaying skips IDs the
+sheet already has. After a crash, rows merged into the workbook but
+still in a journal therefore appear only once. Merged rows get the dtypes
+a reload from the workbook would give them. The workbook is always
+replaced by a rename, so readers in other workers never see a
+half-written file. flock() keeps workers from taking the same ID or
+compacting at the same time.
+"""
+import contextlib
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: the locks below only cover threads of one process
+    fcntl = None
+
+SIDECAR_FORMATS = {
+    'parquet': ('parquet', lambda df, path: df.to_parquet(path, index=False), pd.read_parquet),
+    'feather': ('feather', lambda df, path: df.to_feather(path), pd.read_feather),
+    'pickle': ('pkl', lambda df, path: df.to_pickle(path), pd.read_pickle),
+}
+
+
+@contextlib.contextmanager
+def _file_lock(path, blocking=True):
+    """Exclusive flock on path; yields whether it was acquired (always True when blocking)"""
+    if fcntl is None:
+        yield True
+        return
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            acquired = False
+        else:
+            acquired = True
+        # Closing the file releases the lock
+        yield acquired
+
+
+def write_excel_atomic(path, sheets):
+    """Write sheets to a temporary file next to path, then rename it over path.
+
+    Readers see the old workbook or the new one, never a half-written file.
+    Returns the (mtime_ns, size, inode) stamp of the new file.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    # pandas picks the Excel writer from the extension, so keep it last
+    base, extension = os.path.splitext(name)
+    tmp = os.path.join(directory, f'.{base}.{os.getpid()}.{threading.get_ident()}.tmp{extension}')
+    try:
+        with pd.ExcelWriter(tmp) as writer:
+            for sheet, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet, index=False)
+        with open(tmp, 'rb') as f:
+            os.fsync(f.fileno())
+        # rename() keeps the inode and mtime, so this is also the stamp of path afterwards
+        st = os.stat(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def like_workbook(df, columns=None):
+    """df with the dtypes read_excel gives it once saved to the workbook.
+
+    Journaled rows arrive as JSON, with '' for an empty field and numbers
+    as ints. read_excel turns an empty cell into NaN and a column whose
+    cells are all numbers into a numeric column. Merging without this
+    would give callers different dtypes before and after a reload.
+    columns limits the conversion to those columns.
+    """
+    df = df.copy()
+    for column in df.columns if columns is None else columns:
+        values = df[column]
+        if values.empty or pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+            continue
+        values = values.replace('', np.nan)
+        try:
+            df[column] = pd.to_numeric(values)
+        except (TypeError, ValueError):
+            df[column] = values.infer_objects()
+    return df
+
+
+class WorkbookCache:
+    def __init__(self, path, sidecar_format=None, compact_rows=500):
+        if sidecar_format and sidecar_format not in SIDECAR_FORMATS:
+            raise ValueError(f"Unknown sidecar format {sidecar_format!r}; "
+                             f"expected one of {', '.join(SIDECAR_FORMATS)}")
+        self.path = path
+        self.sidecar_format = sidecar_format or None
+        self.sidecar_dir = path + '.cache'
+        self.journal_path = path + '.journal'
+        self.compacting_path = path + '.journal.compacting'
+        self.compact_rows = compact_rows
+        self._lock = threading.Lock()
+        # One thread parses a changed workbook while the others keep serving the cached sheets
+        self._parse_lock = threading.Lock()
+        self._append_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        self._stamp = None
+        self._sheets = None
+        # Journal id (from its header line) -> bytes applied, rows read
+        self._offsets = {}
+        self._journal_rows = {}
+        self.hits = 0
+        self.sidecar_loads = 0
+        self.workbook_loads = 0
+        self.appends = 0
+        self.compactions = 0
+
+    def stamp(self):
+        """(mtime_ns, size, inode) of the workbook, or None if it does not exist"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def load(self):
+        """Copies of the workbook's sheets plus journaled rows, or None if there is no workbook"""
+        reloaded = self._refresh(wait=False)
+        with self._lock:
+            if not reloaded:
+                self.hits += 1
+            if self._sheets is None:
+                return None
+            return {sheet: df.copy() for sheet, df in self._sheets.items()}
+
+    def store(self, dfs):
+        """Replace the workbook with these sheets and make them the cached version.
+
+        Journaled rows are kept and still served on top; their IDs are
+        skipped if dfs already contains them.
+        """
+        with self._compact_lock, _file_lock(self.path + '.compact.lock'):
+            stamp = write_excel_atomic(self.path, dfs)
+            sheets = {sheet: like_workbook(df) for sheet, df in dfs.items()}
+            with self._lock:
+                self._stamp, self._sheets = stamp, dict(sheets)
+                self._offsets, self._journal_rows = {}, {}
+            self._refresh()
+            self._write_sidecar(stamp, sheets)
+
+    def append(self, sheet, row):
+        """Journal a row for sheet, numbered one past the sheet's highest ID; returns the ID.
+
+        Costs one fsync'd line in the journal instead of a workbook rewrite.
+        """
+        with self._append_lock, _file_lock(self.path + '.lock'):
+            # Under the file lock no other worker can take the same ID
+            self._refresh()
+            with self._lock:
+                df = (self._sheets or {}).get(sheet)
+                ids = pd.to_numeric(df['ID'], errors='coerce') if df is not None and 'ID' in df else None
+                new_id = int(ids.max()) + 1 if ids is not None and ids.notna().any() else 1
+            line = json.dumps({'sheet': sheet, 'row': {'ID': new_id, **row}}, default=str) + '\n'
+            with open(self.journal_path, 'a+b') as f:
+                if f.seek(0, os.SEEK_END) == 0:
+                    line = json.dumps({'journal': uuid.uuid4().hex}) + '\n' + line
+                else:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        # Terminate a line torn by a crash so it cannot swallow this one
+                        line = '\n' + line
+                f.write(line.encode())
+                f.flush()
+                os.fsync(f.fileno())
+        self._refresh()
+        with self._lock:
+            self.appends += 1
+            pending = sum(self._journal_rows.values())
+        if self.compact_rows and pending >= self.compact_rows:
+            self.compact_in_background()
+        return new_id
+
+    def compact(self):
+        """Merge journaled rows into the workbook.
+
+        Returns the number of journal rows merged, or None if another thread
+        or worker is already compacting. Appends are not blocked meanwhile.
+        """
+        if not self._compact_lock.acquire(blocking=False):
+            return None
+        try:
+            with _file_lock(self.path + '.compact.lock', blocking=False) as acquired:
+                if not acquired:
+                    return None
+                with _file_lock(self.path + '.lock'):
+                    # New appends go to a fresh journal while this one is merged.
+                    # A .compacting file left by a crash is merged first.
+                    if not os.path.exists(self.compacting_path) and os.path.exists(self.journal_path):
+                        os.rename(self.journal_path, self.compacting_path)
+                if not os.path.exists(self.compacting_path):
+                    return 0
+                self._refresh()
+                with self._lock:
+                    if self._sheets is None:
+                        return 0
+                    base_stamp = self._stamp
+                    merged = sum(self._journal_rows.values())
+                    sheets = dict(self._sheets)
+                stamp = write_excel_atomic(self.path, sheets)
+                os.remove(self.compacting_path)
+                with self._lock:
+                    # The cached sheets already hold everything written, so only the stamp moves
+                    if self._stamp == base_stamp:
+                        self._stamp = stamp
+                    self.compactions += 1
+                self._write_sidecar(stamp, sheets)
+                return merged
+        finally:
+            self._compact_lock.release()
+
+    def compact_in_background(self):
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, name='workbook-compactor', daemon=True)
+            self._compactor.start()
+
+    def invalidate(self):
+        with self._lock:
+            self._stamp = self._sheets = None
+            self._offsets, self._journal_rows = {}, {}
+
+    def _refresh(self, wait=True):
+        """Bring the cached sheets up to date with the workbook and journals; returns whether it reparsed.
+
+        Called without _lock. A changed workbook is parsed outside _lock and
+        swapped in under it. Unless wait is set, a caller that finds another
+        thread parsing keeps the cached sheets instead of waiting. The
+        journals are read before the workbook is checked again. If the
+        workbook stayed the same throughout, no compaction finished in
+        between, so every row is either in the workbook or in a journal
+        that was read.
+        """
+        reloaded = False
+        while True:
+            stamp = self.stamp()
+            if stamp is not None and stamp != self._stamp:
+                parsed = self._reload(stamp, wait)
+                if parsed is None:
+                    return reloaded
+                reloaded = parsed or reloaded
+            with self._lock:
+                if stamp is None:
+                    self._stamp = self._sheets = None
+                    self._offsets, self._journal_rows = {}, {}
+                    return reloaded
+                if self._stamp != stamp:
+                    # Another thread swapped in a different version meanwhile
+                    continue
+                # Compaction renames the journal to .compacting, so read them in that order
+                seen = {self._read_journal(path) for path in (self.journal_path, self.compacting_path)}
+                if self.stamp() != stamp:
+                    continue
+                for journal_id in set(self._offsets) - seen:
+                    del self._offsets[journal_id]
+                    del self._journal_rows[journal_id]
+                return reloaded
+
+    def _reload(self, stamp, wait):
+        """Parse the workbook version with this stamp and make it the cached one.
+
+        Returns whether it parsed, or None when another thread is parsing,
+        wait is not set and there are cached sheets to serve meanwhile.
+        """
+        if not self._parse_lock.acquire(blocking=wait or self._sheets is None):
+            return None
+        try:
+            if self._stamp == stamp:
+                return False  # another thread parsed it while this one waited
+            # Stamped before reading, so a write during the parse is caught by the next stat()
+            sheets = self._read_sidecar(stamp)
+            from_sidecar = sheets is not None
+            if sheets is None:
+                xls = pd.ExcelFile(self.path)
+                sheets = {sheet: xls.parse(sheet) for sheet in xls.sheet_names}
+                self._write_sidecar(stamp, dict(sheets))
+            with self._lock:
+                if from_sidecar:
+                    self.sidecar_loads += 1
+                else:
+                    self.workbook_loads += 1
+                if self.stamp() != stamp:
+                    return False  # replaced while parsing; the caller stats again
+                self._stamp, self._sheets = stamp, sheets
+                self._offsets, self._journal_rows = {}, {}
+            return True
+        finally:
+            self._parse_lock.release()
+
+    def _read_journal(self, path):
+        """Apply the rows appended to a journal since the last read; returns its id"""
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            header = f.readline()
+            if not header.endswith(b'\n'):
+                return None
+            journal_id = json.loads(header)['journal']
+            offset = self._offsets.get(journal_id, len(header))
+            f.seek(offset)
+            data = f.read()
+        # A line still being written is picked up on a later read
+        end = data.rfind(b'\n') + 1
+        entries = []
+        for line in data[:end].splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                pass  # torn by a crash
+        self._apply(entries)
+        self._offsets[journal_id] = offset + end
+        self._journal_rows[journal_id] = self._journal_rows.get(journal_id, 0) + len(entries)
+        return journal_id
+
+    def _apply(self, entries):
+        rows = {}
+        for entry in entries:
+            rows.setdefault(entry['sheet'], []).append(entry['row'])
+        for sheet, new in rows.items():
+            df = self._sheets.get(sheet)
+            if df is None:
+                df = pd.DataFrame(columns=list(new[0]))
+            # Replaying is idempotent: rows already merged into the workbook are skipped by ID
+            known = set(df['ID']) if 'ID' in df else set()
+            new = pd.DataFrame([row for row in new if row.get('ID') not in known])
+            if new.empty:
+                continue
+            new = like_workbook(new)
+            if df.empty:
+                self._sheets[sheet] = like_workbook(new.reindex(columns=df.columns.union(new.columns, sort=False)))
+                continue
+            merged = pd.concat([df, new], ignore_index=True)
+            # Only a column whose dtype the merge changed (text meeting numbers) needs another look
+            changed = [column for column in merged.columns
+                       if column not in df or merged[column].dtype != df[column].dtype]
+            self._sheets[sheet] = like_workbook(merged, changed) if changed else merged
+
+    def _manifest_path(self):
+        return os.path.join(self.sidecar_dir, 'manifest.json')
+
+    def _read_sidecar(self, stamp):
+        if self.sidecar_format is None:
+            return None
+        try:
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+            if manifest['format'] != self.sidecar_format or tuple(manifest['stamp']) != stamp:
+                return None
+            read = SIDECAR_FORMATS[self.sidecar_format][2]
+            return {sheet: read(os.path.join(self.sidecar_dir, filename))
+                    for sheet, filename in manifest['sheets']}
+        except Exception:
+            # Missing, stale or half-pruned sidecar: the workbook is the source of truth
+            return None
+
+    def _write_sidecar(self, stamp, sheets):
+        if self.sidecar_format is None:
+            return
+        extension, write, _ = SIDECAR_FORMATS[self.sidecar_format]
+        # Files are named after the stamp, so workers writing the same version write identical files
+        token = '-'.join(str(part) for part in stamp)
+        try:
+            os.makedirs(self.sidecar_dir, exist_ok=True)
+            files = []
+            for i, (sheet, df) in enumerate(sheets.items()):
+                filename = f'{token}-{i}.{extension}'
+                tmp = os.path.join(self.sidecar_dir, f'.{filename}.{os.getpid()}.tmp')
+                write(df, tmp)
+                os.replace(tmp, os.path.join(self.sidecar_dir, filename))
+                files.append([sheet, filename])
+            manifest = {'format': self.sidecar_format, 'stamp': list(stamp), 'sheets': files}
+            tmp = self._manifest_path() + f'.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self._manifest_path())
+        except Exception as e:
+            reason = str(e).splitlines()[0]
+            print(f"Workbook sidecar disabled: could not write {self.sidecar_format} files ({reason})")
+            self.sidecar_format = None
+            return
+        current = {filename for _, filename in files} | {'manifest.json'}
+        for name in os.listdir(self.sidecar_dir):
+            if name not in current and not name.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(self.sidecar_dir, name))
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sidecar_format": self.sidecar_format,
+                "cached": self._sheets is not None,
+                "hits": self.hits,
+                "sidecar_loads": self.sidecar_loads,
+                "workbook_loads": self.workbook_loads,
+                "appends": self.appends,
+                "pending_rows": sum(self._journal_rows.values()),
+                "compact_rows": self.compact_rows,
+                "compactions": self.compactions,
+            }